@@ -0,0 +1,55 @@
+"""add post_count columns to categories, tags and authors
+
+Revision ID: 3f1a9c2d7b44
+Revises: c849f56c5e83
+Create Date: 2026-10-19 09:00:12.418305
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "3f1a9c2d7b44"
+down_revision: Union[str, None] = "c849f56c5e83"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "categories",
+        sa.Column("post_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "tags",
+        sa.Column("post_count", sa.Integer(), server_default="0", nullable=False),
+    )
+    op.add_column(
+        "authors",
+        sa.Column("post_count", sa.Integer(), server_default="0", nullable=False),
+    )
+
+    # Backfill the counters from the existing rows
+    op.execute(
+        "UPDATE categories SET post_count = "
+        "(SELECT count(*) FROM posts WHERE posts.category_id = categories.id)"
+    )
+    op.execute(
+        "UPDATE tags SET post_count = "
+        "(SELECT count(*) FROM post_tag_association "
+        "WHERE post_tag_association.tag_id = tags.id)"
+    )
+    op.execute(
+        "UPDATE authors SET post_count = "
+        "(SELECT count(*) FROM posts WHERE posts.author_id = authors.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("authors", "post_count")
+    op.drop_column("tags", "post_count")
+    op.drop_column("categories", "post_count")
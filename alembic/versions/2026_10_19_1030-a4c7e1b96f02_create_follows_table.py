@@ -0,0 +1,43 @@
+"""create follows table
+
+Revision ID: a4c7e1b96f02
+Revises: 3f1a9c2d7b44
+Create Date: 2026-10-19 10:30:41.502917
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "a4c7e1b96f02"
+down_revision: Union[str, None] = "3f1a9c2d7b44"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "follows",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("follower_id", sa.Integer(), nullable=False),
+        sa.Column("author_id", sa.Integer(), nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.ForeignKeyConstraint(["follower_id"], ["authors.id"], ondelete="CASCADE"),
+        sa.ForeignKeyConstraint(["author_id"], ["authors.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint(
+            "follower_id", "author_id", name="idx_unique_follower_author"
+        ),
+    )
+    op.create_index(op.f("ix_follows_author_id"), "follows", ["author_id"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_follows_author_id"), table_name="follows")
+    op.drop_table("follows")
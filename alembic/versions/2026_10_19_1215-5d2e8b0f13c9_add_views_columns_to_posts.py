@@ -0,0 +1,34 @@
+"""add views columns to posts table
+
+Revision ID: 5d2e8b0f13c9
+Revises: a4c7e1b96f02
+Create Date: 2026-10-19 12:15:07.336194
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "5d2e8b0f13c9"
+down_revision: Union[str, None] = "a4c7e1b96f02"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "posts", sa.Column("views", sa.Integer(), server_default="0", nullable=False)
+    )
+    op.add_column(
+        "posts",
+        sa.Column("unique_views", sa.Integer(), server_default="0", nullable=False),
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("posts", "unique_views")
+    op.drop_column("posts", "views")
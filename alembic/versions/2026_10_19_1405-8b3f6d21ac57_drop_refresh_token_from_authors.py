@@ -0,0 +1,31 @@
+"""drop refresh_token from authors table
+
+Revision ID: 8b3f6d21ac57
+Revises: 5d2e8b0f13c9
+Create Date: 2026-10-19 14:05:52.118460
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "8b3f6d21ac57"
+down_revision: Union[str, None] = "5d2e8b0f13c9"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The refresh tokens are kept in the Redis token store
+    op.drop_column("authors", "refresh_token")
+
+
+def downgrade() -> None:
+    op.add_column(
+        "authors",
+        sa.Column("refresh_token", sa.String(length=500), nullable=True),
+    )
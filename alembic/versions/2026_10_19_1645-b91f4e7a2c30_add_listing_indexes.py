@@ -0,0 +1,42 @@
+"""add listing indexes
+
+Revision ID: b91f4e7a2c30
+Revises: e27a4d9c0b13
+Create Date: 2026-10-19 16:45:03.512877
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "b91f4e7a2c30"
+down_revision: Union[str, None] = "e27a4d9c0b13"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+INDEXES = (
+    ("idx_posts_author_id_created_at", "posts", ["author_id", sa.text("created_at DESC"), "id"]),
+    ("idx_posts_category_id_created_at", "posts", ["category_id", sa.text("created_at DESC"), "id"]),
+    ("idx_posts_created_at", "posts", [sa.text("created_at DESC"), "id"]),
+    ("idx_post_tag_association_tag_id", "post_tag_association", ["tag_id", "post_id"]),
+)
+
+
+def upgrade() -> None:
+    # CONCURRENTLY does not lock the writes to the tables, but it can not run in a transaction.
+    # A failed build leaves an invalid index, it is dropped first, so the migration can be repeated.
+    with op.get_context().autocommit_block():
+        for name, table, columns in INDEXES:
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
+            op.create_index(name, table, columns, unique=False, postgresql_concurrently=True)
+
+
+def downgrade() -> None:
+    with op.get_context().autocommit_block():
+        for name, table, _ in reversed(INDEXES):
+            op.drop_index(name, table_name=table, postgresql_concurrently=True, if_exists=True)
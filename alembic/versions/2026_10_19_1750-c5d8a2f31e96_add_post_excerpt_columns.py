@@ -0,0 +1,60 @@
+"""add post excerpt columns
+
+Revision ID: c5d8a2f31e96
+Revises: b91f4e7a2c30
+Create Date: 2026-10-19 17:50:41.206533
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "c5d8a2f31e96"
+down_revision: Union[str, None] = "b91f4e7a2c30"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.alter_column(
+        "posts",
+        "content",
+        existing_type=sa.String(length=500),
+        type_=sa.Text(),
+        existing_server_default="",
+    )
+    op.add_column("posts", sa.Column("excerpt", sa.String(length=320), server_default="", nullable=False))
+    op.add_column("posts", sa.Column("word_count", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("posts", sa.Column("reading_time", sa.Integer(), server_default="0", nullable=False))
+
+    # The existing contents are at most 500 characters, the excerpts are cut as the app does it
+    op.execute(
+        r"""
+        UPDATE posts SET
+            word_count = coalesce(array_length(regexp_split_to_array(nullif(btrim(content), ''), '\s+'), 1), 0),
+            excerpt = CASE
+                WHEN char_length(regexp_replace(btrim(content), '\s+', ' ', 'g')) <= 300
+                    THEN regexp_replace(btrim(content), '\s+', ' ', 'g')
+                ELSE regexp_replace(left(regexp_replace(btrim(content), '\s+', ' ', 'g'), 300), ' [^ ]*$', '') || '…'
+            END
+        """
+    )
+    op.execute("UPDATE posts SET reading_time = ceil(word_count / 200.0)")
+
+
+def downgrade() -> None:
+    op.drop_column("posts", "reading_time")
+    op.drop_column("posts", "word_count")
+    op.drop_column("posts", "excerpt")
+    op.alter_column(
+        "posts",
+        "content",
+        existing_type=sa.Text(),
+        type_=sa.String(length=500),
+        existing_server_default="",
+        postgresql_using="left(content, 500)",
+    )
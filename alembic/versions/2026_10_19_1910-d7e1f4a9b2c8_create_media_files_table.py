@@ -0,0 +1,42 @@
+"""create media files table
+
+Revision ID: d7e1f4a9b2c8
+Revises: c5d8a2f31e96
+Create Date: 2026-10-19 19:10:27.604119
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "d7e1f4a9b2c8"
+down_revision: Union[str, None] = "c5d8a2f31e96"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # The images uploaded before are kept under their names and are not tracked (nor collected)
+    op.create_table(
+        "media_files",
+        sa.Column("id", sa.Integer(), nullable=False),
+        sa.Column("key", sa.String(length=255), nullable=False),
+        sa.Column("size", sa.Integer(), nullable=False),
+        sa.Column("refcount", sa.Integer(), server_default="0", nullable=False),
+        sa.Column(
+            "created_at", sa.DateTime(), server_default=sa.text("now()"), nullable=False
+        ),
+        sa.Column("orphaned_at", sa.DateTime(), nullable=True),
+        sa.PrimaryKeyConstraint("id"),
+        sa.UniqueConstraint("key"),
+    )
+    op.create_index("idx_media_files_orphaned_at", "media_files", ["orphaned_at"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index("idx_media_files_orphaned_at", table_name="media_files")
+    op.drop_table("media_files")
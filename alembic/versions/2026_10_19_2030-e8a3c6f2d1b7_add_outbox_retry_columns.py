@@ -0,0 +1,33 @@
+"""add outbox retry columns
+
+Revision ID: e8a3c6f2d1b7
+Revises: d7e1f4a9b2c8
+Create Date: 2026-10-19 20:30:12.418305
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "e8a3c6f2d1b7"
+down_revision: Union[str, None] = "d7e1f4a9b2c8"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column("outbox", sa.Column("handled", sa.JSON(), server_default="[]", nullable=False))
+    op.add_column("outbox", sa.Column("attempts", sa.Integer(), server_default="0", nullable=False))
+    op.add_column("outbox", sa.Column("last_error", sa.Text(), nullable=True))
+    op.add_column("outbox", sa.Column("next_attempt_at", sa.DateTime(), nullable=True))
+
+
+def downgrade() -> None:
+    op.drop_column("outbox", "next_attempt_at")
+    op.drop_column("outbox", "last_error")
+    op.drop_column("outbox", "attempts")
+    op.drop_column("outbox", "handled")
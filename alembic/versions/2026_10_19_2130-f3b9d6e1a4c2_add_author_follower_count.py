@@ -0,0 +1,36 @@
+"""add follower_count to authors
+
+Revision ID: f3b9d6e1a4c2
+Revises: e8a3c6f2d1b7
+Create Date: 2026-10-19 21:30:41.205719
+
+"""
+
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = "f3b9d6e1a4c2"
+down_revision: Union[str, None] = "e8a3c6f2d1b7"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.add_column(
+        "authors",
+        sa.Column("follower_count", sa.Integer(), server_default="0", nullable=False),
+    )
+
+    # Backfill the counters from the existing rows
+    op.execute(
+        "UPDATE authors SET follower_count = "
+        "(SELECT count(*) FROM follows WHERE follows.author_id = authors.id)"
+    )
+
+
+def downgrade() -> None:
+    op.drop_column("authors", "follower_count")
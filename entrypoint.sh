@@ -7,8 +7,8 @@ set -e
 # Waiting for database availability
 /wait-for-it.sh postgres 5432
 
-# Running migrations
-alembic upgrade head
+# Running migrations, only if the database is not at head (the check does not load the models)
+python script_check_migrations.py || alembic upgrade head
 
-# Running Uvicorn
-exec uvicorn main:app --host 0.0.0.0 --port 8000
+# Running the pre-fork server: WEB_WORKERS uvicorn workers (one per core by default)
+exec python server.py
@@ -1,17 +1,33 @@
+import asyncio
 import logging
-
-import uvicorn
+from contextlib import asynccontextmanager
 
 from fastapi import FastAPI
+from fastapi.responses import PlainTextResponse
 from fastapi_pagination import add_pagination
 from fastapi_pagination.utils import disable_installed_extensions_check
 
+from src.core.conf.caching import open_connection_pools, close_connection_pools
 from src.core.conf.config import settings
 from src.core.conf.logging_config import setup_logging
+from src.core.conf.metrics import metrics
+from src.core.conf.tracing import TracingMiddleware, tracer
+from src.core.conf.utils import get_app_env
+from src.core.database.db_settings.db_helper import async_session, open_database_pool, close_database_pool
 
 from src.routes.auth import router as auth_router
 from src.routes.authors import router as authors_router
-from src.routes import router as router_v1
+from src.routes.media import router as media_router
+from src.routes import routers_v1
+
+from src.services import trending as trending_service
+from src.services.cache_warmer import cache_warmer
+from src.services.outbox import outbox_relay
+from src.services.outbox_subscribers import register_subscribers
+from src.services.profiler import ProfilerMiddleware
+from src.services.traffic_capture import TrafficCaptureMiddleware
+from src.services.revocation import revocation_list
+from src.services import views as views_service
 
 setup_logging()
 
@@ -20,12 +36,68 @@ logger = logging.getLogger(__name__)
 disable_installed_extensions_check()
 
 
-app = FastAPI(title="Blog API", description="The management of the Blog API")
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Opens the database and Redis pools of the worker and starts its background tasks,
+    on shutdown (after the in-flight requests are drained) stops them and closes the pools.
+    """
+    await open_database_pool()
+    open_connection_pools()
+
+    revocation_list.start()
+    register_subscribers()
+
+    background_tasks = [
+        asyncio.create_task(outbox_relay.run()),
+        asyncio.create_task(views_service.run_views_flusher()),
+        asyncio.create_task(trending_service.run_rescaler()),
+        asyncio.create_task(revocation_list.run_reloader()),
+    ]
+
+    # Not awaited, the worker serves the requests while the cache is warmed
+    cache_warmer.schedule()
+
+    yield
+
+    await cache_warmer.stop()
+
+    for task in background_tasks:
+        task.cancel()
+
+    await asyncio.gather(*background_tasks, return_exceptions=True)
+
+    revocation_list.stop()
+
+    try:
+        async with async_session() as session:
+            await views_service.flush_views(session=session)
+    except Exception as error:
+        logger.error("Unable to flush views on shutdown: %s", str(error))
+
+    await close_database_pool()
+    close_connection_pools()
+
+    tracer.shutdown()
+
+
+app = FastAPI(title="Blog API", description="The management of the Blog API", lifespan=lifespan)
+
+if tracer.enabled:
+    app.add_middleware(TracingMiddleware)
+
+if settings.profiler_enabled:
+    app.add_middleware(ProfilerMiddleware)
+
+if settings.capture_sample_ratio > 0:
+    app.add_middleware(TrafficCaptureMiddleware, sample_ratio=settings.capture_sample_ratio)
 
 
 app.include_router(router=auth_router, prefix="/api")
 app.include_router(router=authors_router, prefix="/api")
-app.include_router(router=router_v1, prefix=settings.api_v1_prefix)
+for router_v1, prefix in routers_v1:
+    app.include_router(router=router_v1, prefix=settings.api_v1_prefix + prefix)
+app.include_router(router=media_router, prefix="/media")
 
 add_pagination(app)
 
@@ -41,5 +113,18 @@ def read_root():
     return {"message": "Welcome to FastAPI project"}
 
 
+@app.get("/metrics", response_class=PlainTextResponse, include_in_schema=False)
+def read_metrics():
+    """
+    Metrics of the worker in the Prometheus text format (circuit breakers, cache hits)
+
+    :return: str: metrics
+    """
+    return metrics.render()
+
+
 if __name__ == "__main__":
-    uvicorn.run(app="main:app", host="127.0.0.1", port=8000, reload=True)
+    import uvicorn
+
+    # Development server, the production one is started by server.py
+    uvicorn.run(app="main:app", host="127.0.0.1", port=settings.web_port, reload=get_app_env() != ".env")
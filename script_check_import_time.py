@@ -0,0 +1,81 @@
+import argparse
+import logging
+import subprocess
+import sys
+from collections import defaultdict
+
+logger = logging.getLogger(__name__)
+
+# Loaded on the first use only, importing them at the startup is a regression
+LAZY_MODULES = ("PIL", "passlib", "numpy", "scipy", "boto3")
+
+
+def measure_import_time(module: str) -> list[tuple[str, int, int]]:
+    """
+    Imports the module in a fresh interpreter with -X importtime.
+
+    Returns:
+        list: The imported modules with their self and cumulative time in microseconds
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+
+    if result.returncode != 0:
+        raise SystemExit(f"Unable to import {module}:\n{result.stderr}")
+
+    imports = []
+
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+
+        self_time, cumulative_time, name = line.removeprefix("import time:").split("|")
+        imports.append((name.strip(), int(self_time), int(cumulative_time)))
+
+    return imports
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description="Checks the import time of the app against the budget.")
+    parser.add_argument("--module", default="main", help="The module to import (default: main)")
+    parser.add_argument("--budget-ms", type=int, default=1000, help="The import time budget (default: 1000)")
+    parser.add_argument("--top", type=int, default=15, help="The number of the heaviest packages to show")
+    args = parser.parse_args()
+
+    imports = measure_import_time(module=args.module)
+
+    total_ms = next(cumulative for name, _, cumulative in imports if name == args.module) / 1000
+
+    packages = defaultdict(int)
+    for name, self_time, _ in imports:
+        packages[name.split(".")[0]] += self_time
+
+    print(f"Import time of {args.module}: {total_ms:.0f} ms (budget {args.budget_ms} ms)")
+    print("The heaviest packages:")
+    for package, self_time in sorted(packages.items(), key=lambda item: item[1], reverse=True)[:args.top]:
+        print(f"  {self_time / 1000:8.1f} ms  {package}")
+
+    failed = False
+
+    eager_modules = sorted({name.split(".")[0] for name, _, _ in imports} & set(LAZY_MODULES))
+    if eager_modules:
+        print(f"Imported at the startup, but must be imported lazily: {', '.join(eager_modules)}")
+        failed = True
+
+    if total_ms > args.budget_ms:
+        print(f"Import time is over the budget by {total_ms - args.budget_ms:.0f} ms")
+        failed = True
+
+    if failed:
+        logger.error(f"Import time check of {args.module} failed: {total_ms:.0f} ms")
+        return 1
+
+    logger.info(f"Import time of {args.module}: {total_ms:.0f} ms")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
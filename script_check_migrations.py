@@ -0,0 +1,49 @@
+import asyncio
+import logging
+import sys
+
+from alembic.config import Config
+from alembic.script import ScriptDirectory
+from sqlalchemy import text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.ext.asyncio import create_async_engine
+
+from src.core.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+def get_script_heads() -> set[str]:
+    # Reads only the revision scripts, the environment (env.py and all the models) is not loaded
+    return set(ScriptDirectory.from_config(Config("alembic.ini")).get_heads())
+
+
+async def get_database_revisions() -> set[str]:
+    engine = create_async_engine(settings.database_url)
+
+    try:
+        async with engine.connect() as connection:
+            result = await connection.execute(text("SELECT version_num FROM alembic_version"))
+            return set(result.scalars().all())
+    except DBAPIError:
+        # No alembic_version table yet
+        return set()
+    finally:
+        await engine.dispose()
+
+
+async def main() -> int:
+    heads = get_script_heads()
+    revisions = await get_database_revisions()
+
+    if revisions == heads:
+        print(f"Database is at head: {', '.join(sorted(heads))}")
+        return 0
+
+    print(f"Database is at {', '.join(sorted(revisions)) or 'no revision'}, head is {', '.join(sorted(heads))}")
+    logger.info(f"Database revision {revisions} differs from head {heads}")
+    return 1
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,527 @@
+import argparse
+import asyncio
+import json
+import logging
+import sys
+from datetime import datetime, timedelta
+
+from fastapi import HTTPException
+from sqlalchemy import event, text
+from sqlalchemy.ext.asyncio import AsyncConnection, AsyncSession
+
+from src.core.conf.config import settings
+from src.core.database.db_settings.db_helper import async_engine, async_session
+from src.core.database.models.enums import Role
+from src.repositories import authors as repository_authors
+from src.repositories import categories as repository_categories
+from src.repositories import counters as repository_counters
+from src.repositories import follows as repository_follows
+from src.repositories import media as repository_media
+from src.repositories import outbox as repository_outbox
+from src.repositories import posts as repository_posts
+from src.repositories import profiles as repository_profiles
+from src.repositories import tags as repository_tags
+from src.schemas.authors import AuthorCreate, AuthorChangeRole, AuthorBulkChangeRole
+from src.schemas.categories import CategoryChange
+from src.schemas.posts import PostCreate, PostPartialUpdate
+from src.schemas.profiles import ProfileCreate, ProfilePartialUpdate
+from src.schemas.tags import TagUpdate, TagMerge, TagWindow
+from src.services import popular_tags as popular_tags_service
+
+logger = logging.getLogger(__name__)
+
+# The listings read the whole table (they are paginated in process), their plans are checked on a page of them
+LISTING_LIMIT = 20
+
+# The reconciliations recount whole tables by design, their scans are reported but do not fail the check
+WHOLE_TABLE_QUERIES = (
+    "reconcile_post_counts",
+    "reconcile_follower_counts",
+    "get_media_file_keys",
+    "get_image_references",
+    "reconcile_media_refcounts",
+)
+
+# The other statements (BEGIN, SAVEPOINT, ...) have no plan
+CHECKED_STATEMENTS = ("SELECT", "WITH", "INSERT", "UPDATE", "DELETE")
+
+PLAN_CHECK_NAME = "plan-check"
+
+SEED_SQL = (
+    """
+    INSERT INTO authors (username, email, hashed_password, role, is_active)
+    SELECT 'seed_' || g, 'seed_' || g || '@seed.local', '-', 'user', true
+    FROM generate_series(1, :authors) AS g
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO categories (name, slug)
+    SELECT 'Seed category ' || g, 'seed-category-' || g
+    FROM generate_series(1, :categories) AS g
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO tags (name)
+    SELECT 'seed-tag-' || g
+    FROM generate_series(1, :tags) AS g
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    WITH author_ids AS (SELECT array_agg(id) AS ids FROM authors),
+         category_ids AS (SELECT array_agg(id) AS ids FROM categories)
+    INSERT INTO posts (title, slug, content, author_id, category_id, created_at, updated_at)
+    SELECT 'Seed post ' || g, 'seed-post-' || g, repeat('Seed content. ', 20),
+           author_ids.ids[1 + g % cardinality(author_ids.ids)],
+           category_ids.ids[1 + g % cardinality(category_ids.ids)],
+           now() - g * interval '1 minute', now() - g * interval '1 minute'
+    FROM generate_series(1, :posts) AS g, author_ids, category_ids
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    WITH tag_ids AS (SELECT array_agg(id) AS ids FROM tags)
+    INSERT INTO post_tag_association (post_id, tag_id)
+    SELECT DISTINCT posts.id, tag_ids.ids[1 + (posts.id * 7 + n * 13) % cardinality(tag_ids.ids)]
+    FROM posts, tag_ids, generate_series(1, 3) AS n
+    WHERE posts.slug LIKE 'seed-post-%'
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    WITH author_ids AS (SELECT array_agg(id) AS ids FROM authors)
+    INSERT INTO follows (follower_id, author_id)
+    SELECT DISTINCT authors.id, author_ids.ids[1 + (authors.id * 31 + n * 17) % cardinality(author_ids.ids)]
+    FROM authors, author_ids, generate_series(1, 10) AS n
+    WHERE authors.username LIKE 'seed_%'
+    ON CONFLICT DO NOTHING
+    """,
+    """
+    INSERT INTO profiles (author_id, first_name)
+    SELECT id, 'Seed'
+    FROM authors
+    WHERE username LIKE 'seed_%' AND id % 2 = 0
+    ON CONFLICT DO NOTHING
+    """,
+)
+
+captured_statements: list | None = None
+
+
+@event.listens_for(async_engine.sync_engine, "before_cursor_execute")
+def capture_statement(conn, cursor, statement, parameters, context, executemany):
+    if captured_statements is not None and statement.lstrip().upper().startswith(CHECKED_STATEMENTS):
+        # The plan of a statement executed with many parameter sets is the same for each of them
+        captured_statements.append((statement, parameters[0] if executemany else parameters))
+
+
+async def seed(posts: int) -> None:
+    params = {
+        "authors": max(posts // 50, 10),
+        "categories": max(posts // 1000, 5),
+        "tags": max(posts // 100, 20),
+        "posts": posts,
+    }
+
+    async with async_session() as session:
+        for sql in SEED_SQL:
+            await session.execute(text(sql), params)
+        await session.commit()
+
+    async with async_engine.connect() as connection:
+        connection = await connection.execution_options(isolation_level="AUTOCOMMIT")
+        await connection.execute(text("ANALYZE"))
+
+    print(f"Seeded {posts} posts")
+
+
+async def get_large_tables(min_rows: int) -> set[str]:
+    async with async_session() as session:
+        result = await session.execute(
+            text(
+                "SELECT relname FROM pg_class "
+                "WHERE relkind = 'r' AND relnamespace = 'public'::regnamespace AND reltuples >= :min_rows"
+            ),
+            {"min_rows": min_rows},
+        )
+        return set(result.scalars().all())
+
+
+async def get_sample() -> dict:
+    async with async_session() as session:
+        async def fetch_one(sql: str, **params) -> dict:
+            return (await session.execute(text(sql), params)).mappings().one()
+
+        post = await fetch_one("SELECT id, slug, author_id, category_id FROM posts ORDER BY id DESC LIMIT 1")
+        category = await fetch_one("SELECT id, slug, name FROM categories WHERE id = :id", id=post["category_id"])
+        other_category = await fetch_one(
+            "SELECT id FROM categories WHERE id != :id ORDER BY id LIMIT 1", id=post["category_id"]
+        )
+        tag = await fetch_one(
+            "SELECT tags.id, tags.name FROM tags JOIN post_tag_association ON post_tag_association.tag_id = tags.id "
+            "WHERE post_tag_association.post_id = :post_id ORDER BY tags.id LIMIT 1",
+            post_id=post["id"],
+        )
+        other_tag = await fetch_one("SELECT id FROM tags WHERE id != :id ORDER BY id DESC LIMIT 1", id=tag["id"])
+        author = await fetch_one("SELECT id, email FROM authors WHERE id = :id", id=post["author_id"])
+        other_author = await fetch_one(
+            "SELECT id FROM authors WHERE id != :id ORDER BY id DESC LIMIT 1", id=post["author_id"]
+        )
+        profile = await fetch_one("SELECT author_id FROM profiles ORDER BY id DESC LIMIT 1")
+        no_profile = await fetch_one(
+            "SELECT id FROM authors WHERE NOT EXISTS (SELECT 1 FROM profiles WHERE profiles.author_id = authors.id) "
+            "ORDER BY id DESC LIMIT 1"
+        )
+
+    return {
+        "post": post,
+        "category": category,
+        "other_category_id": other_category["id"],
+        "tag": tag,
+        "other_tag_id": other_tag["id"],
+        "author": author,
+        "other_author_id": other_author["id"],
+        "profile_author_id": profile["author_id"],
+        "no_profile_author_id": no_profile["id"],
+    }
+
+
+async def fail_outbox_events(session: AsyncSession) -> None:
+    repository_outbox.add_event(
+        session=session, aggregate_type="tag", aggregate_id=0, event_type="tag.deleted"
+    )
+    await session.flush()
+
+    events = await repository_outbox.claim_unpublished_events(
+        session=session, limit=100, max_attempts=settings.outbox_max_attempts
+    )
+    for outbox_event in events:
+        repository_outbox.record_event_failure(
+            event=outbox_event, handled=[], error=PLAN_CHECK_NAME, next_attempt_at=datetime.utcnow()
+        )
+
+    await repository_outbox.mark_events_published(
+        session=session, event_ids=[outbox_event.id for outbox_event in events]
+    )
+    await session.commit()
+
+
+def get_queries(sample: dict) -> dict:
+    post, category, tag, author = sample["post"], sample["category"], sample["tag"], sample["author"]
+    post_ids = [post["id"], post["id"] - 1]
+    media_key = f"posts/{PLAN_CHECK_NAME}.webp"
+
+    return {
+        # Authors
+        "create_author": lambda session: repository_authors.create_author(
+            author=AuthorCreate(
+                username=PLAN_CHECK_NAME, email=f"{PLAN_CHECK_NAME}@example.com", password="Plan-check-1"
+            ),
+            session=session,
+        ),
+        "get_all_authors": lambda session: repository_authors.get_all_authors(session=session, limit=LISTING_LIMIT),
+        "get_author_by_id": lambda session: repository_authors.get_author_by_id(
+            author_id=author["id"], session=session
+        ),
+        "get_author_by_email": lambda session: repository_authors.get_author_by_email(
+            email=author["email"], session=session
+        ),
+        "change_author_role": lambda session: repository_authors.change_author_role(
+            author_role=AuthorChangeRole(id=author["id"], role=Role.moderator), session=session
+        ),
+        "change_authors_role": lambda session: repository_authors.change_authors_role(
+            author_roles=AuthorBulkChangeRole(ids=[author["id"], sample["other_author_id"]], role=Role.moderator),
+            session=session,
+        ),
+        "change_password": lambda session: repository_authors.change_password(
+            email=author["email"], password="-", session=session
+        ),
+        # Categories
+        "create_category": lambda session: repository_categories.create_category(
+            category=CategoryChange(name=PLAN_CHECK_NAME), session=session
+        ),
+        "get_all_categories": lambda session: repository_categories.get_all_categories(
+            session=session, limit=LISTING_LIMIT
+        ),
+        "get_category_by_id": lambda session: repository_categories.get_category_by_id(
+            session=session, category_id=category["id"]
+        ),
+        "get_category_by_id_and_slug": lambda session: repository_categories.get_category_by_id_and_slug(
+            session=session, category_id=category["id"], category_slug=category["slug"]
+        ),
+        "get_category_by_name": lambda session: repository_categories.get_category_by_name(
+            session=session, category_name=category["name"]
+        ),
+        "update_category": lambda session: repository_categories.update_category(
+            updated_category=CategoryChange(name=category["name"]), category_id=category["id"], session=session
+        ),
+        "delete_category": lambda session: repository_categories.delete_category(
+            category_id=sample["other_category_id"], session=session
+        ),
+        "move_category_posts": lambda session: repository_categories.move_category_posts(
+            session=session, category_id=category["id"], target_category_id=sample["other_category_id"]
+        ),
+        # Counters
+        "shift_post_counts": lambda session: repository_counters.shift_post_counts(
+            session=session, delta=1, author_id=author["id"], category_id=category["id"], tag_ids=[tag["id"]]
+        ),
+        "shift_follower_count": lambda session: repository_counters.shift_follower_count(
+            session=session, author_id=author["id"], delta=1
+        ),
+        "recount_post_counts": lambda session: repository_counters.recount_post_counts(
+            session=session, author_ids=[author["id"]], category_ids=[category["id"]], tag_ids=[tag["id"]]
+        ),
+        "reconcile_post_counts": lambda session: repository_counters.reconcile_post_counts(session=session),
+        "reconcile_follower_counts": lambda session: repository_counters.reconcile_follower_counts(session=session),
+        # Follows
+        "get_follow": lambda session: repository_follows.get_follow(
+            session=session, follower_id=author["id"], author_id=sample["other_author_id"]
+        ),
+        "follow_author": lambda session: repository_follows.follow_author(
+            session=session, follower_id=sample["no_profile_author_id"], author_id=author["id"]
+        ),
+        "unfollow_author": lambda session: repository_follows.unfollow_author(
+            session=session, follower_id=author["id"], author_id=sample["other_author_id"]
+        ),
+        "count_followers": lambda session: repository_follows.count_followers(
+            session=session, author_id=author["id"]
+        ),
+        "get_follower_ids": lambda session: repository_follows.get_follower_ids(
+            session=session, author_id=author["id"]
+        ),
+        "get_followed_authors_with_follower_counts": (
+            lambda session: repository_follows.get_followed_authors_with_follower_counts(
+                session=session, follower_id=author["id"]
+            )
+        ),
+        # Media files
+        "acquire_media_file": lambda session: repository_media.acquire_media_file(
+            session=session, key=media_key, size=1
+        ),
+        "release_media_files": lambda session: repository_media.release_media_files(
+            session=session, references={media_key: 1}
+        ),
+        "get_orphaned_media_files": lambda session: repository_media.get_orphaned_media_files(
+            session=session, orphaned_before=datetime.utcnow(), limit=100
+        ),
+        "delete_media_files": lambda session: repository_media.delete_media_files(
+            session=session, media_file_ids=[0]
+        ),
+        "get_media_file_keys": lambda session: repository_media.get_media_file_keys(session=session),
+        "get_image_references": lambda session: repository_media.get_image_references(session=session),
+        "reconcile_media_refcounts": lambda session: repository_media.reconcile_media_refcounts(
+            session=session, refcounts={}
+        ),
+        # Outbox
+        "add_events": lambda session: repository_outbox.add_events(
+            session=session,
+            events=[{"aggregate_type": "post", "aggregate_id": post_id, "event_type": "post.deleted"}
+                    for post_id in post_ids],
+        ),
+        "claim_unpublished_events": lambda session: repository_outbox.claim_unpublished_events(
+            session=session, limit=100, max_attempts=settings.outbox_max_attempts
+        ),
+        "fail_and_mark_events_published": fail_outbox_events,
+        "delete_published_events": lambda session: repository_outbox.delete_published_events(
+            session=session, older_than=timedelta(days=7)
+        ),
+        # Posts (the image uploads store files, they are not run)
+        "create_post": lambda session: repository_posts.create_post(
+            post_data=PostCreate(title=PLAN_CHECK_NAME, content=PLAN_CHECK_NAME),
+            author_id=author["id"],
+            category_id=category["id"],
+            session=session,
+        ),
+        "add_tags_to_post": lambda session: repository_posts.add_tags_to_post(
+            post_id=post["id"], author_id=author["id"], tag_names=[PLAN_CHECK_NAME], session=session
+        ),
+        "remove_tag_from_post": lambda session: repository_posts.remove_tag_from_post(
+            session=session, tag_id=tag["id"], post_id=post["id"], author_id=author["id"]
+        ),
+        "get_all_posts": lambda session: repository_posts.get_all_posts(session=session, limit=LISTING_LIMIT),
+        "get_all_posts_by_author_id": lambda session: repository_posts.get_all_posts_by_author_id(
+            author_id=author["id"], session=session, limit=LISTING_LIMIT
+        ),
+        "get_all_posts_by_category_id": lambda session: repository_posts.get_all_posts_by_category_id(
+            category_id=category["id"], session=session, limit=LISTING_LIMIT
+        ),
+        "get_posts_by_ids": lambda session: repository_posts.get_posts_by_ids(session=session, post_ids=post_ids),
+        "get_post_summaries_by_ids": lambda session: repository_posts.get_post_summaries_by_ids(
+            session=session, post_ids=post_ids
+        ),
+        "get_specific_post_by_id": lambda session: repository_posts.get_specific_post_by_id(
+            session=session, post_id=post["id"]
+        ),
+        "get_single_post_by_slug": lambda session: repository_posts.get_single_post_by_slug(
+            session=session, slug=post["slug"]
+        ),
+        "get_post_by_id_and_by_author_id": lambda session: repository_posts.get_post_by_id_and_by_author_id(
+            session=session, post_id=post["id"], author_id=author["id"]
+        ),
+        "partial_update_post": lambda session: repository_posts.partial_update_post(
+            session=session, post_update=PostPartialUpdate(title=PLAN_CHECK_NAME), post_id=post["id"],
+            author_id=author["id"],
+        ),
+        "delete_post": lambda session: repository_posts.delete_post(
+            session=session, post_id=post["id"], author_id=author["id"]
+        ),
+        "delete_posts_by_author": lambda session: repository_posts.delete_posts(
+            session=session, author_id=author["id"]
+        ),
+        "delete_posts_by_tag": lambda session: repository_posts.delete_posts(session=session, tag_id=tag["id"]),
+        # Profiles
+        "create_profile": lambda session: repository_profiles.create_profile(
+            profile=ProfileCreate(first_name=PLAN_CHECK_NAME), author_id=sample["no_profile_author_id"],
+            session=session,
+        ),
+        "get_profile_by_author_id": lambda session: repository_profiles.get_profile_by_author_id(
+            author_id=sample["profile_author_id"], session=session
+        ),
+        "partial_update_profile": lambda session: repository_profiles.partial_update_profile(
+            updated_profile=ProfilePartialUpdate(bio=PLAN_CHECK_NAME), author_id=sample["profile_author_id"],
+            session=session,
+        ),
+        "delete_profile": lambda session: repository_profiles.delete_profile(
+            author_id=sample["profile_author_id"], session=session
+        ),
+        # Tags
+        "create_tag": lambda session: repository_tags.create_tag(session=session, tag_name=PLAN_CHECK_NAME),
+        "get_tag_by_id": lambda session: repository_tags.get_tag_by_id(session=session, tag_id=tag["id"]),
+        "get_tag_by_name": lambda session: repository_tags.get_tag_by_name(session=session, tag_name=tag["name"]),
+        "update_tag": lambda session: repository_tags.update_tag(
+            session=session, tag_id=tag["id"], tag_update=TagUpdate(name=tag["name"])
+        ),
+        "delete_tag": lambda session: repository_tags.delete_tag(session=session, tag_id=sample["other_tag_id"]),
+        "merge_tags": lambda session: repository_tags.merge_tags(
+            session=session, tag_merge=TagMerge(name=tag["name"], tag_ids=[sample["other_tag_id"]])
+        ),
+        "count_tag_usage": lambda session: popular_tags_service.count_tag_usage(
+            session=session, since=datetime.utcnow() - timedelta(days=7), limit=10
+        ),
+        "count_popular_tags": lambda session: popular_tags_service.count_popular_tags(
+            session=session, window=TagWindow.week, limit=10
+        ),
+    }
+
+
+def find_problems(plan: dict, large_tables: set[str]) -> list[str]:
+    """
+    Returns the sequential scans of the large tables and the sorts of their rows found in the plan.
+    """
+    problems = []
+
+    def scanned_tables(node: dict) -> set[str]:
+        tables = {node["Relation Name"]} if "Relation Name" in node else set()
+        for child in node.get("Plans", []):
+            tables |= scanned_tables(child)
+        return tables
+
+    def visit(node: dict) -> None:
+        node_type = node["Node Type"]
+
+        if node_type == "Seq Scan" and node.get("Relation Name") in large_tables:
+            problems.append(f"Seq Scan on {node['Relation Name']}")
+
+        if node_type in ("Sort", "Incremental Sort"):
+            sorted_tables = scanned_tables(node) & large_tables
+            if sorted_tables:
+                problems.append(f"{node_type} of {', '.join(sorted(sorted_tables))} by {node.get('Sort Key')}")
+
+        for child in node.get("Plans", []):
+            visit(child)
+
+    visit(plan)
+    return problems
+
+
+async def explain(connection: AsyncConnection, statement: str, parameters) -> dict:
+    result = await connection.exec_driver_sql(f"EXPLAIN (FORMAT JSON) {statement}", parameters)
+    plan = result.scalar_one()
+
+    return (json.loads(plan) if isinstance(plan, str) else plan)[0]["Plan"]
+
+
+async def get_plans(query) -> list[tuple[str, dict]]:
+    """
+    Runs the query in a transaction which is rolled back and returns the plans of its statements.
+    The commits of the repositories only release a savepoint, so the writes are checked without changing the data.
+    """
+    global captured_statements
+
+    async with async_engine.connect() as connection:
+        transaction = await connection.begin()
+        session = async_session(bind=connection, join_transaction_mode="create_savepoint")
+        captured_statements = []
+
+        try:
+            await query(session)
+        except HTTPException:
+            # A refusal (e.g. a category with posts is not deleted) is an outcome, its statements are checked
+            pass
+        finally:
+            statements, captured_statements = captured_statements, None
+
+        plans = [
+            (statement, await explain(connection=connection, statement=statement, parameters=parameters))
+            for statement, parameters in statements
+        ]
+
+        await session.close()
+        await transaction.rollback()
+
+    return plans
+
+
+async def main() -> int:
+    parser = argparse.ArgumentParser(description="Checks the query plans of the repository queries.")
+    parser.add_argument("--seed", type=int, default=0, help="Insert this many synthetic posts (and related rows) first")
+    parser.add_argument("--min-rows", type=int, default=10000, help="The tables with more rows must not be scanned")
+    parser.add_argument("--verbose", action="store_true", help="Print the plans of all the queries")
+    args = parser.parse_args()
+
+    if async_engine.dialect.name != "postgresql":
+        print(f"The query plans can be checked only on Postgres, not on {async_engine.dialect.name}")
+        return 1
+
+    if args.seed:
+        await seed(posts=args.seed)
+
+    large_tables = await get_large_tables(min_rows=args.min_rows)
+
+    if not large_tables:
+        print(f"No table has {args.min_rows} rows, seed the database with --seed")
+        return 1
+
+    print(f"Large tables: {', '.join(sorted(large_tables))}")
+    print(f"Listings checked on their first {LISTING_LIMIT} rows, whole-table scans allowed: "
+          f"{', '.join(WHOLE_TABLE_QUERIES)}")
+
+    failures = 0
+
+    for name, query in get_queries(sample=await get_sample()).items():
+        try:
+            plans = await get_plans(query=query)
+        except Exception as error:
+            failures += 1
+            print(f"FAIL {name}: {error!r}")
+            continue
+
+        for statement, plan in plans:
+            problems = find_problems(plan=plan, large_tables=large_tables)
+
+            if problems and name in WHOLE_TABLE_QUERIES:
+                print(f"scan {name}: {'; '.join(problems)}")
+            elif problems:
+                failures += 1
+                print(f"FAIL {name}: {'; '.join(problems)}\n  {' '.join(statement.split())}")
+            elif args.verbose:
+                print(f"ok   {name}: {plan['Node Type']} (cost {plan['Total Cost']})")
+
+    if failures:
+        logger.error(f"Query plan check failed: {failures} statement(s)")
+        print(f"{failures} statement(s) scan or sort a large table")
+        return 1
+
+    print("All query plans use indexes")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(asyncio.run(main()))
@@ -0,0 +1,40 @@
+import argparse
+import asyncio
+import logging
+
+from src.core.conf.config import settings
+from src.core.database.db_settings.db_helper import async_session
+from src.repositories.media import reconcile_media_refcounts
+from src.services import media as media_service
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(description="Deletes the stored images nothing refers to.")
+    parser.add_argument(
+        "--grace-hours",
+        type=float,
+        default=settings.media_gc_grace_hours,
+        help="Keep the files for this many hours after they lost the last reference",
+    )
+    parser.add_argument(
+        "--reconcile", action="store_true", help="Recount the references from the posts and profiles first"
+    )
+    args = parser.parse_args()
+
+    async with async_session() as session:
+        if args.reconcile:
+            repaired = await reconcile_media_refcounts(
+                session=session, refcounts=await media_service.count_image_references(session=session)
+            )
+            print(f"{repaired} media refcount(s) repaired.")
+            logger.info(f"{repaired} media refcount(s) repaired.")
+
+        deleted = await media_service.collect_garbage(session=session, grace_hours=args.grace_hours)
+
+    print(f"Deleted {deleted['orphaned']} orphaned and {deleted['untracked']} untracked media file(s).")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,26 @@
+import sys
+import asyncio
+import logging
+
+from src.core.database.db_settings.db_helper import async_session
+from src.services.popular_tags import rebuild_popular_tags, refresh_windows
+
+logger = logging.getLogger(__name__)
+
+
+async def main(windows_only: bool = False) -> None:
+    if windows_only:
+        refresh_windows()
+        print("Rolling windows of popular tags refreshed.")
+        logger.info("Rolling windows of popular tags refreshed.")
+        return
+
+    async with async_session() as session:
+        await rebuild_popular_tags(session=session)
+
+    print("Popular tags rebuilt successfully.")
+    logger.info("Popular tags rebuilt successfully.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(windows_only="--windows-only" in sys.argv))
@@ -0,0 +1,25 @@
+import asyncio
+import logging
+
+from src.core.database.db_settings.db_helper import async_session
+from src.services.related_posts import rebuild_related_posts
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    async with async_session() as session:
+        indexed = await rebuild_related_posts(session=session)
+
+    print(f"Related posts rebuilt for {indexed} post(s).")
+    logger.info(f"Related posts rebuilt for {indexed} post(s).")
+
+
+if __name__ == "__main__":
+    try:
+        import numpy  # noqa: F401
+        import scipy  # noqa: F401
+    except ImportError:
+        raise SystemExit("The batch rebuild requires numpy and scipy: poetry install --with related")
+
+    asyncio.run(main())
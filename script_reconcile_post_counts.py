@@ -0,0 +1,24 @@
+import asyncio
+import logging
+
+from src.core.database.db_settings.db_helper import async_session
+from src.repositories.counters import reconcile_post_counts, reconcile_follower_counts
+
+logger = logging.getLogger(__name__)
+
+
+async def main() -> None:
+    async with async_session() as session:
+        repaired = await reconcile_post_counts(session=session)
+        repaired_followers = await reconcile_follower_counts(session=session)
+
+    for table_name, rows in repaired.items():
+        print(f"Table {table_name}: {rows} post counter(s) repaired.")
+        logger.info(f"Table {table_name}: {rows} post counter(s) repaired.")
+
+    print(f"Table authors: {repaired_followers} follower counter(s) repaired.")
+    logger.info(f"Table authors: {repaired_followers} follower counter(s) repaired.")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,287 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import re
+import time
+from collections import Counter, defaultdict
+
+import httpx
+
+from src.services.traffic_capture import UNMATCHED_ROUTE
+
+logger = logging.getLogger(__name__)
+
+PATH_PARAM_PATTERN = re.compile(r"\{(\w+)(?::\w+)?\}")
+
+PERCENTILES = (50, 90, 99)
+
+
+def load_entries(paths: list[str], methods: set[str], limit: int | None) -> list[dict]:
+    """
+    Reads the captured requests (the rotated files of all the workers), in the order they came.
+    """
+    entries = []
+
+    for path in paths:
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                line = line.strip()
+                if not line:
+                    continue
+
+                entry = json.loads(line)
+                if entry["route"] != UNMATCHED_ROUTE and entry["method"] in methods:
+                    entries.append(entry)
+
+    entries.sort(key=lambda entry: entry["ts"])
+
+    return entries[:limit] if limit else entries
+
+
+def build_path(entry: dict) -> str:
+    path_params = entry["path_params"]
+    return PATH_PARAM_PATTERN.sub(lambda match: str(path_params.get(match.group(1), match.group(0))), entry["route"])
+
+
+def percentile(values: list[float], rank: float) -> float | None:
+    if not values:
+        return None
+
+    return values[max(0, math.ceil(rank / 100 * len(values)) - 1)]
+
+
+def summarize(results: list[dict]) -> dict:
+    latencies = sorted(result["latency_ms"] for result in results if result["status"] is not None)
+
+    summary = {
+        "requests": len(results),
+        "errors": sum(1 for result in results if result["status"] is None or result["status"] >= 500),
+        "recorded_errors": sum(1 for result in results if result["recorded_status"] >= 500),
+        "status_changed": sum(
+            1 for result in results if result["status"] is None or result["status"] != result["recorded_status"]
+        ),
+        "statuses": dict(Counter(str(result["status"] or "error") for result in results)),
+        "max_ms": latencies[-1] if latencies else None,
+    }
+
+    for rank in PERCENTILES:
+        summary[f"p{rank}_ms"] = percentile(latencies, rank)
+
+    return summary
+
+
+def build_report(results: list[dict], target: str, duration: float, max_lag: float) -> dict:
+    by_route = defaultdict(list)
+
+    for result in results:
+        by_route[result["route"]].append(result)
+
+    return {
+        "target": target,
+        "duration_seconds": round(duration, 3),
+        "max_lag_seconds": round(max_lag, 3),
+        "total": summarize(results),
+        "routes": {
+            route: summarize(route_results)
+            for route, route_results in sorted(by_route.items(), key=lambda item: -len(item[1]))
+        },
+    }
+
+
+def format_ms(value: float | None) -> str:
+    return f"{value:.1f}" if value is not None else "-"
+
+
+def format_change(current: float | None, baseline: float | None) -> str:
+    if current is None or baseline is None or baseline == 0:
+        return "-"
+
+    return f"{(current - baseline) / baseline * 100:+.0f}%"
+
+
+def print_report(report: dict) -> None:
+    print(f"Replayed {report['total']['requests']} request(s) against {report['target']} "
+          f"in {report['duration_seconds']} s (max lag {report['max_lag_seconds']} s).")
+    print(f"{'route':60} {'count':>7} {'errors':>7} {'changed':>8} {'p50':>8} {'p90':>8} {'p99':>8} {'max':>8}")
+
+    for route, summary in [("TOTAL", report["total"]), *report["routes"].items()]:
+        print(
+            f"{route[:60]:60} {summary['requests']:>7} {summary['errors']:>7} {summary['status_changed']:>8} "
+            f"{format_ms(summary['p50_ms']):>8} {format_ms(summary['p90_ms']):>8} "
+            f"{format_ms(summary['p99_ms']):>8} {format_ms(summary['max_ms']):>8}"
+        )
+
+
+def print_comparison(report: dict, baseline: dict) -> None:
+    print(f"Compared with {baseline['target']} (the changes of p50, p99 and the errors):")
+    print(f"{'route':60} {'p50':>8} {'p99':>8} {'errors':>12}")
+
+    routes = [("TOTAL", report["total"], baseline["total"])]
+    routes += [
+        (route, summary, baseline["routes"][route])
+        for route, summary in report["routes"].items()
+        if route in baseline["routes"]
+    ]
+
+    for route, summary, baseline_summary in routes:
+        errors = f"{baseline_summary['errors']} -> {summary['errors']}"
+        print(
+            f"{route[:60]:60} {format_change(summary['p50_ms'], baseline_summary['p50_ms']):>8} "
+            f"{format_change(summary['p99_ms'], baseline_summary['p99_ms']):>8} {errors:>12}"
+        )
+
+    missing = sorted(set(baseline["routes"]) - set(report["routes"]))
+    if missing:
+        print(f"Not replayed this time: {', '.join(missing)}")
+
+
+async def send_request(client: httpx.AsyncClient, entry: dict, tokens: dict[str, str]) -> dict:
+    headers = {"X-Replay": "1"}
+
+    if entry["auth"] in tokens:
+        headers["Authorization"] = f"Bearer {tokens[entry['auth']]}"
+
+    content = None
+
+    # The bodies are not captured, a placeholder of the same size and type is sent
+    if entry["request_bytes"]:
+        content = b"x" * entry["request_bytes"]
+        headers["Content-Type"] = entry["content_type"] or "application/octet-stream"
+
+    result = {
+        "route": f"{entry['method']} {entry['route']}",
+        "recorded_status": entry["status"],
+        "status": None,
+        "latency_ms": None,
+    }
+
+    start = time.perf_counter()
+
+    try:
+        response = await client.request(
+            entry["method"], build_path(entry), params=entry["query"], headers=headers, content=content
+        )
+    except httpx.HTTPError as error:
+        logger.warning("%s failed: %s", result["route"], str(error))
+        return result
+
+    result["status"] = response.status_code
+    result["latency_ms"] = (time.perf_counter() - start) * 1000
+    return result
+
+
+async def replay(
+    entries: list[dict], target: str, speed: float, concurrency: int, tokens: dict[str, str], timeout: float
+) -> tuple[list[dict], float, float]:
+    """
+    Sends the requests at their captured pace divided by the speed (as fast as the concurrency allows with 0).
+    The lag is how late the requests were sent because all the connections were busy.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    results: list[dict] = []
+    tasks = []
+    max_lag = 0.0
+
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+    async with httpx.AsyncClient(base_url=target, timeout=timeout, limits=limits) as client:
+
+        async def run(entry: dict) -> None:
+            try:
+                results.append(await send_request(client=client, entry=entry, tokens=tokens))
+            finally:
+                semaphore.release()
+
+        loop = asyncio.get_running_loop()
+        start = loop.time()
+        first_ts = entries[0]["ts"] if entries else 0
+
+        for entry in entries:
+            due = (entry["ts"] - first_ts) / speed if speed > 0 else 0
+            delay = due - (loop.time() - start)
+
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+            await semaphore.acquire()
+            max_lag = max(max_lag, loop.time() - start - due)
+
+            tasks.append(asyncio.create_task(run(entry)))
+
+        await asyncio.gather(*tasks)
+
+        duration = loop.time() - start
+
+    return results, duration, max_lag
+
+
+async def main() -> None:
+    parser = argparse.ArgumentParser(
+        description="Replays the captured traffic (CAPTURE_SAMPLE_RATIO) against an instance and reports the latencies."
+    )
+    parser.add_argument("paths", nargs="+", help="The captured NDJSON files (logs/capture/traffic-*.ndjson*)")
+    parser.add_argument("--target", required=True, help="The base URL of the instance, e.g. http://127.0.0.1:8000")
+    parser.add_argument(
+        "--speed", type=float, default=1, help="The pace of the captured traffic multiplied (0: as fast as possible)"
+    )
+    parser.add_argument("--concurrency", type=int, default=10, help="The most requests in flight")
+    parser.add_argument(
+        "--token",
+        action="append",
+        default=[],
+        metavar="ROLE=TOKEN",
+        help="The access token sent for the requests of the role (user, moderator, admin), "
+             "the requests of the roles without a token are skipped",
+    )
+    parser.add_argument(
+        "--methods",
+        default="GET,HEAD",
+        help="The replayed methods, the writes are sent with placeholder bodies (default: GET,HEAD)",
+    )
+    parser.add_argument("--limit", type=int, default=None, help="Replay only the first requests")
+    parser.add_argument("--timeout", type=float, default=10, help="The timeout of a request in seconds")
+    parser.add_argument("--output", help="Save the report as JSON, to compare the next build with it")
+    parser.add_argument("--baseline", help="The JSON report of the previous build to compare with")
+    args = parser.parse_args()
+
+    tokens = dict(token.split("=", 1) for token in args.token)
+    methods = {method.strip().upper() for method in args.methods.split(",") if method.strip()}
+
+    entries = load_entries(paths=args.paths, methods=methods, limit=args.limit)
+
+    skipped = Counter(entry["auth"] for entry in entries if entry["auth"] != "anonymous" and entry["auth"] not in tokens)
+    entries = [entry for entry in entries if entry["auth"] == "anonymous" or entry["auth"] in tokens]
+
+    if skipped:
+        print(f"Skipped the requests without a token: {dict(skipped)}")
+
+    if not entries:
+        print("No requests to replay.")
+        return
+
+    results, duration, max_lag = await replay(
+        entries=entries,
+        target=args.target,
+        speed=args.speed,
+        concurrency=args.concurrency,
+        tokens=tokens,
+        timeout=args.timeout,
+    )
+
+    report = build_report(results=results, target=args.target, duration=duration, max_lag=max_lag)
+    print_report(report)
+    logger.info(f"Replayed {len(results)} request(s) against {args.target}.")
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(report, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as file:
+            print_comparison(report=report, baseline=json.load(file))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,173 @@
+import os
+import time
+import random
+import signal
+import socket
+import logging
+
+import uvicorn
+
+from src.core.conf.config import settings
+
+logger = logging.getLogger("server")
+
+
+def get_workers_count() -> int:
+    """
+    The number of workers from the settings, or one per core available to the container.
+    """
+    if settings.web_workers > 0:
+        return settings.web_workers
+
+    return len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+
+def preload():
+    """
+    Imports and warms the application in the master process, so the workers are forked
+    with the modules, routes and OpenAPI schema already built and share their memory.
+    No connection is opened here, the pools are opened by the lifespan of every worker.
+    """
+    from main import app
+
+    app.openapi()
+
+    return app
+
+
+def create_socket() -> socket.socket:
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((settings.web_host, settings.web_port))
+    sock.listen(settings.web_backlog)
+    sock.set_inheritable(True)
+    return sock
+
+
+def run_worker(app, sock: socket.socket) -> None:
+    """
+    Serves the requests in the forked worker until it is stopped by SIGTERM (the in-flight requests
+    are drained for up to the graceful timeout) or until it has served its max requests.
+    """
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+
+    # The random state is inherited from the master, every worker needs its own jitter
+    random.seed()
+
+    limit_max_requests = None
+    if settings.web_max_requests > 0:
+        limit_max_requests = settings.web_max_requests + random.randint(0, settings.web_max_requests_jitter)
+
+    config = uvicorn.Config(
+        app=app,
+        lifespan="on",
+        proxy_headers=True,
+        timeout_keep_alive=settings.web_keepalive_seconds,
+        timeout_graceful_shutdown=settings.web_graceful_timeout_seconds,
+        limit_max_requests=limit_max_requests,
+    )
+    server = uvicorn.Server(config=config)
+    server.run(sockets=[sock])
+
+
+class Master:
+    def __init__(self, app, sock: socket.socket, workers_count: int):
+        """
+        Pre-fork master process: forks the workers, replaces the exited ones
+        (after max requests or a crash) and stops them gracefully on SIGTERM.
+
+        Arguments:
+            app (FastAPI): The preloaded application
+            sock (socket): The listening socket shared by the workers
+            workers_count (int): The number of workers
+
+        Returns:
+            None
+        """
+        self.app = app
+        self.sock = sock
+        self.workers_count = workers_count
+        self.workers: set[int] = set()
+        self.stopping = False
+
+    def spawn_worker(self) -> None:
+        pid = os.fork()
+
+        if pid == 0:
+            exit_code = 0
+            try:
+                run_worker(app=self.app, sock=self.sock)
+            except BaseException:
+                logger.exception("Worker %s failed", os.getpid())
+                exit_code = 1
+            finally:
+                os._exit(exit_code)
+
+        self.workers.add(pid)
+        logger.info("Worker %s started", pid)
+
+    def handle_stop(self, signum, frame) -> None:
+        self.stopping = True
+
+    def reap_workers(self) -> None:
+        while self.workers:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                self.workers.clear()
+                return
+
+            if pid == 0:
+                return
+
+            self.workers.discard(pid)
+            logger.info("Worker %s exited with code %s", pid, os.waitstatus_to_exitcode(status))
+
+    def stop_workers(self) -> None:
+        logger.info("Stopping %s workers", len(self.workers))
+
+        for pid in self.workers:
+            os.kill(pid, signal.SIGTERM)
+
+        deadline = time.monotonic() + settings.web_graceful_timeout_seconds + 5
+
+        while self.workers and time.monotonic() < deadline:
+            self.reap_workers()
+            time.sleep(0.1)
+
+        for pid in self.workers:
+            logger.warning("Worker %s did not stop in time, killed", pid)
+            os.kill(pid, signal.SIGKILL)
+
+        self.reap_workers()
+
+    def run(self) -> None:
+        signal.signal(signal.SIGTERM, self.handle_stop)
+        signal.signal(signal.SIGINT, self.handle_stop)
+
+        logger.info(
+            "Serving on %s:%s with %s workers", settings.web_host, settings.web_port, self.workers_count
+        )
+
+        while not self.stopping:
+            self.reap_workers()
+
+            while len(self.workers) < self.workers_count and not self.stopping:
+                self.spawn_worker()
+
+            time.sleep(0.5)
+
+        self.stop_workers()
+        self.sock.close()
+
+
+def main() -> None:
+    app = preload()
+
+    master = Master(app=app, sock=create_socket(), workers_count=get_workers_count())
+    master.run()
+
+
+if __name__ == "__main__":
+    main()
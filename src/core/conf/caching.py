@@ -1,26 +1,207 @@
 import logging
 import redis
 
+from src.core.conf.circuit_breaker import CircuitBreaker
 from src.core.conf.config import settings
+from src.core.conf.metrics import metrics
+from src.core.conf.tracing import TracedRedis, tracer
 
 
 logger = logging.getLogger(__name__)
 
+metrics.describe("cache_requests_total", "counter", "Response cache lookups by result (hit, miss, error)")
 
-def get_redis():
-    redis_client = redis.Redis(
-        host=settings.redis_host,
-        port=settings.redis_port,
-        db=0
-    )
+redis_breaker = CircuitBreaker(
+    name="redis",
+    failure_threshold=settings.redis_breaker_failure_threshold,
+    reset_timeout=settings.redis_breaker_reset_timeout_seconds,
+)
+
+
+class BreakerConnection(redis.Connection):
+    """
+    Redis connection reporting the connection failures and timeouts to the breaker,
+    so every client, pipeline and pub/sub of the pools is covered.
+    """
+    def connect(self):
+        try:
+            super().connect()
+        except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError):
+            redis_breaker.record_failure()
+            raise
+
+    def read_response(self, *args, **kwargs):
+        try:
+            response = super().read_response(*args, **kwargs)
+        except (redis.exceptions.ConnectionError, redis.exceptions.TimeoutError):
+            redis_breaker.record_failure()
+            raise
+
+        redis_breaker.record_success()
+        return response
+
+
+connection_pools: dict[int, redis.ConnectionPool] = {}
+
+
+def get_connection_pool(db: int) -> redis.ConnectionPool:
+    if db not in connection_pools:
+        connection_pools[db] = redis.ConnectionPool(
+            host=settings.redis_host,
+            port=settings.redis_port,
+            db=db,
+            socket_connect_timeout=settings.redis_connect_timeout_seconds,
+            socket_timeout=settings.redis_timeout_seconds,
+            connection_class=BreakerConnection,
+        )
+
+    return connection_pools[db]
+
+
+def open_connection_pools() -> None:
+    """
+    Opens a connection of the cache and data pools at the worker startup, so the first requests do not wait for it.
+    """
+    for db in (settings.redis_cache_db, settings.redis_data_db):
+        redis_client = get_redis(db=db)
+
+        if not redis_client:
+            continue
+
+        try:
+            redis_client.ping()
+        except redis.exceptions.RedisError as error:
+            logger.error("Unable to connect to Redis: %s", str(error))
+
+
+def close_connection_pools() -> None:
+    for connection_pool in connection_pools.values():
+        connection_pool.disconnect()
+
+    connection_pools.clear()
+
+
+def get_redis(db: int = settings.redis_cache_db):
+    """
+    Redis client on the shared connection pool of the database.
+    Returns None at once while the circuit breaker is open, so an outage costs no connection attempts.
+    When the breaker lets a probe through, the client is checked with a ping first.
+    """
+    if not redis_breaker.allow_request():
+        return None
+
+    redis_class = TracedRedis if tracer.enabled else redis.Redis
+    redis_client = redis_class(connection_pool=get_connection_pool(db))
+
+    if redis_breaker.state == redis_breaker.CLOSED:
+        return redis_client
 
     try:
         redis_client.ping()
-        return redis_client
     except redis.exceptions.AuthenticationError as error:
         logger.error("Authentication failed to connect to Redis: %s", str(error))
-        print(f"Authentication failed to connect to Redis: {error}")
+        redis_breaker.record_failure()
+        return None
     except Exception as error:
         logger.error("Unable to connect to Redis: %s", str(error))
-        print(f"Unable to connect to Redis: {error}")
+        redis_breaker.record_failure()
         return None
+
+    redis_breaker.record_success()
+    return redis_client
+
+
+def get_redis_data():
+    """
+    Redis client for derived data (aggregates, counters, feeds).
+    It uses a separate database, so flushing the response cache does not drop it.
+    """
+    return get_redis(db=settings.redis_data_db)
+
+
+class RedisCache:
+    def __init__(self, db: int = settings.redis_cache_db):
+        """
+        Response cache facade. Redis being slow or down is never an error here:
+        the reads miss, the writes are skipped, and the routes serve the data from the database.
+
+        Arguments:
+            db (int): The Redis database of the cache
+
+        Returns:
+            None
+        """
+        self.db = db
+        self.flush_pending = False
+
+    def get_client(self):
+        """
+        Returns the Redis client, or None while Redis is unavailable.
+        A flush which failed during the outage is repeated first, so no stale response outlives it.
+        """
+        redis_client = get_redis(db=self.db)
+
+        if redis_client and self.flush_pending:
+            try:
+                redis_client.flushdb()
+            except redis.exceptions.RedisError as error:
+                logger.error("Unable to flush the cache: %s", str(error))
+                return None
+
+            self.flush_pending = False
+
+        return redis_client
+
+    def get(self, key: str) -> bytes | None:
+        redis_client = self.get_client()
+
+        if not redis_client:
+            metrics.inc("cache_requests_total", result="error")
+            return None
+
+        try:
+            value = redis_client.get(key)
+        except redis.exceptions.RedisError as error:
+            logger.warning("Unable to read %s from the cache: %s", key, str(error))
+            metrics.inc("cache_requests_total", result="error")
+            return None
+
+        metrics.inc("cache_requests_total", result="hit" if value is not None else "miss")
+        return value
+
+    def set(self, key: str, value: bytes, ttl: int = 1800) -> None:
+        redis_client = self.get_client()
+
+        if not redis_client:
+            return
+
+        try:
+            redis_client.set(key, value, ex=ttl)
+        except redis.exceptions.RedisError as error:
+            logger.warning("Unable to write %s to the cache: %s", key, str(error))
+
+    def delete(self, *keys: str) -> None:
+        redis_client = self.get_client()
+
+        if not redis_client:
+            return
+
+        try:
+            redis_client.delete(*keys)
+        except redis.exceptions.RedisError as error:
+            logger.warning("Unable to delete %s from the cache: %s", keys, str(error))
+
+    def flush(self) -> bool:
+        """
+        Drops the whole response cache. If Redis is unavailable, the flush is repeated
+        before the cache of this worker is used again.
+
+        Returns:
+            bool: Whether the cache was flushed
+        """
+        self.flush_pending = True
+
+        return self.get_client() is not None
+
+
+cache = RedisCache()
@@ -0,0 +1,89 @@
+import time
+import logging
+import threading
+
+from src.core.conf.metrics import metrics
+
+logger = logging.getLogger(__name__)
+
+metrics.describe("circuit_breaker_state", "gauge", "State of the circuit breaker: 0 closed, 1 half-open, 2 open")
+metrics.describe("circuit_breaker_failures_total", "counter", "Failed calls counted by the circuit breaker")
+metrics.describe("circuit_breaker_rejected_total", "counter", "Calls rejected without trying while the breaker is open")
+metrics.describe("circuit_breaker_transitions_total", "counter", "State changes of the circuit breaker")
+
+
+class CircuitBreaker:
+    CLOSED = "closed"
+    HALF_OPEN = "half_open"
+    OPEN = "open"
+
+    STATE_VALUES = {CLOSED: 0, HALF_OPEN: 1, OPEN: 2}
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        """
+        Circuit breaker of a remote dependency.
+        It opens after failure_threshold consecutive failures, then the calls are rejected at once
+        for reset_timeout seconds. After that a single probe is let through (half-open):
+        its success closes the breaker, its failure opens it again.
+
+        Arguments:
+            name (str): The name of the dependency in logs and metrics
+            failure_threshold (int): The number of consecutive failures which opens the breaker
+            reset_timeout (float): The seconds the breaker stays open before the probe
+
+        Returns:
+            None
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_at = 0.0
+        self.lock = threading.Lock()
+
+        metrics.set("circuit_breaker_state", self.STATE_VALUES[self.state], breaker=self.name)
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+
+        logger.warning("Circuit breaker %s: %s -> %s", self.name, self.state, state)
+
+        self.state = state
+        metrics.set("circuit_breaker_state", self.STATE_VALUES[state], breaker=self.name)
+        metrics.inc("circuit_breaker_transitions_total", breaker=self.name, state=state)
+
+    def allow_request(self) -> bool:
+        """
+        Returns whether the call may be tried. Once the reset timeout has passed, the first caller
+        gets True and becomes the probe, the others are rejected until the probe reports its result.
+        """
+        if self.state == self.CLOSED:
+            return True
+
+        with self.lock:
+            if self.state == self.OPEN and time.monotonic() - self.opened_at >= self.reset_timeout:
+                self._transition(self.HALF_OPEN)
+                return True
+
+        metrics.inc("circuit_breaker_rejected_total", breaker=self.name)
+        return False
+
+    def record_success(self) -> None:
+        if self.state == self.CLOSED and not self.failures:
+            return
+
+        with self.lock:
+            self.failures = 0
+            self._transition(self.CLOSED)
+
+    def record_failure(self) -> None:
+        metrics.inc("circuit_breaker_failures_total", breaker=self.name)
+
+        with self.lock:
+            self.failures += 1
+
+            if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+                self._transition(self.OPEN)
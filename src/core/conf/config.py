@@ -12,8 +12,76 @@ class Settings(BaseSettings):
     algorithm: str = "HS256"
     access_token_expire_minutes: int = 30
     refresh_token_expire_minutes: int = 60 * 24 * 7
+    web_host: str = "0.0.0.0"
+    web_port: int = 8000
+    web_workers: int = 0
+    web_backlog: int = 2048
+    web_keepalive_seconds: int = 5
+    web_graceful_timeout_seconds: int = 30
+    web_max_requests: int = 10000
+    web_max_requests_jitter: int = 1000
     redis_host: str = "host_name"
     redis_port: str = "port"
+    redis_cache_db: int = 0
+    redis_data_db: int = 1
+    redis_connect_timeout_seconds: float = 0.25
+    redis_timeout_seconds: float = 0.5
+    redis_breaker_failure_threshold: int = 3
+    redis_breaker_reset_timeout_seconds: float = 30
+    timeline_max_length: int = 800
+    timeline_fanout_max_followers: int = 10000
+    views_flush_interval_seconds: int = 10
+    views_flush_stale_seconds: int = 300
+    trending_half_life_hours: float = 24
+    trending_rescale_interval_seconds: int = 3600
+    related_posts_limit: int = 10
+    related_posts_category_weight: float = 0.2
+    outbox_batch_size: int = 100
+    outbox_poll_interval_seconds: float = 5
+    outbox_stream_max_length: int = 100000
+    outbox_retention_hours: int = 24
+    outbox_max_attempts: int = 10
+    outbox_retry_base_seconds: float = 5
+    outbox_retry_max_seconds: float = 3600
+    revocation_bloom_capacity: int = 100000
+    revocation_reload_interval_seconds: int = 600
+    revocation_resync_interval_seconds: int = 5
+    cache_warm_concurrency: int = 4
+    cache_warm_top_posts: int = 100
+    cache_warm_top_authors: int = 20
+    cache_warm_delay_seconds: float = 1
+    cache_warm_lock_timeout_seconds: int = 300
+    cache_warm_hits_decay_interval_seconds: int = 3600
+    media_dir: str = "media"
+    media_url: str = "/media"
+    media_max_age_seconds: int = 3600
+    media_accel_redirect: str = ""
+    media_gc_grace_hours: float = 24
+    upload_post_image_max_bytes: int = 10 * 1024 * 1024
+    upload_post_image_max_pixels: int = 40_000_000
+    upload_profile_image_max_bytes: int = 2 * 1024 * 1024
+    upload_profile_image_max_pixels: int = 2048 * 2048
+    storage_backend: str = "local"
+    storage_s3_bucket: str = ""
+    storage_s3_prefix: str = ""
+    storage_s3_endpoint_url: str = ""
+    storage_s3_region: str = ""
+    storage_s3_public_url: str = ""
+    storage_s3_url_expire_seconds: int = 3600
+    tracing_exporter: str = ""
+    tracing_sample_ratio: float = 1.0
+    tracing_file_path: str = "logs/traces.jsonl"
+    tracing_service_name: str = "blog-api"
+    profiler_enabled: bool = False
+    profiler_interval_ms: float = 1
+    profiler_max_seconds: float = 60
+    profiler_top_allocations: int = 20
+    profiler_dir: str = "logs/profiles"
+    capture_sample_ratio: float = 0
+    capture_dir: str = "logs/capture"
+    capture_max_bytes: int = 100 * 1024 * 1024
+    capture_backup_count: int = 5
+    capture_query_keys: str = "page,size,limit,window,fields,include"
 
     model_config = SettingsConfigDict(env_file=get_app_env(), extra="allow")
 
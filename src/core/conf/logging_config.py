@@ -2,23 +2,33 @@ import os
 import sys
 import logging
 
+from src.core.conf.tracing import TraceContextFilter, tracer
+
 
 def setup_logging() -> None:
     log_directory = "logs"
     if not os.path.exists(log_directory):
         os.makedirs(log_directory)
 
-    if sys.stdout.encoding != "utf-8":
-        sys.stdout = open(sys.stdout.fileno(), mode="w", encoding="utf-8", buffering=1)
-    if sys.stderr.encoding != "utf-8":
-        sys.stderr = open(sys.stderr.fileno(), mode="w", encoding="utf-8", buffering=1)
+    # Switched in place: a second file object on the same descriptor would lose the buffered output of the first
+    for stream in (sys.stdout, sys.stderr):
+        if stream.encoding != "utf-8" and hasattr(stream, "reconfigure"):
+            stream.reconfigure(encoding="utf-8", line_buffering=True)
+
+    handlers = [
+        logging.FileHandler("logs/app.log", encoding="utf-8"),
+        logging.StreamHandler(sys.stdout)
+    ]
+
+    # The records carry the trace_id and span_id of the request, printed while the tracing is enabled
+    for handler in handlers:
+        handler.addFilter(TraceContextFilter())
+
+    trace_format = " - trace_id=%(trace_id)s span_id=%(span_id)s" if tracer.enabled else ""
 
     logging.basicConfig(
         level=logging.INFO,
-        format="%(levelname)s - %(asctime)s - %(name)s - %(message)s",
+        format=f"%(levelname)s - %(asctime)s - %(name)s{trace_format} - %(message)s",
         datefmt="%d-%m-%Y %H:%M:%S",
-        handlers=[
-            logging.FileHandler("logs/app.log", encoding="utf-8"),
-            logging.StreamHandler(sys.stdout)
-        ]
+        handlers=handlers
     )
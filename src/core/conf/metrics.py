@@ -0,0 +1,53 @@
+import threading
+from collections import defaultdict
+
+
+class Metrics:
+    def __init__(self):
+        """
+        In-process registry of counters and gauges rendered in the Prometheus text format.
+        Every worker keeps its own values, the scraper adds them up.
+
+        Returns:
+            None
+        """
+        self.descriptions: dict[str, tuple[str, str]] = {}
+        self.values: dict[str, dict[tuple, float]] = defaultdict(dict)
+        self.lock = threading.Lock()
+
+    def describe(self, name: str, metric_type: str, description: str) -> None:
+        self.descriptions[name] = (metric_type, description)
+
+    def inc(self, name: str, value: float = 1, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+
+        with self.lock:
+            self.values[name][key] = self.values[name].get(key, 0) + value
+
+    def set(self, name: str, value: float, **labels) -> None:
+        key = tuple(sorted(labels.items()))
+
+        with self.lock:
+            self.values[name][key] = value
+
+    def get(self, name: str, **labels) -> float:
+        return self.values[name].get(tuple(sorted(labels.items())), 0)
+
+    def render(self) -> str:
+        lines = []
+
+        with self.lock:
+            for name in sorted(self.values):
+                if name in self.descriptions:
+                    metric_type, description = self.descriptions[name]
+                    lines.append(f"# HELP {name} {description}")
+                    lines.append(f"# TYPE {name} {metric_type}")
+
+                for labels, value in self.values[name].items():
+                    label_text = ",".join(f'{label}="{label_value}"' for label, label_value in labels)
+                    lines.append(f"{name}{{{label_text}}} {value}" if label_text else f"{name} {value}")
+
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
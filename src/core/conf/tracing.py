@@ -0,0 +1,515 @@
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Iterator
+
+import redis
+from redis.client import Pipeline
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+OTLP_FILE_EXPORTER = "otlp_file"
+MEMORY_EXPORTER = "memory"
+
+# The kinds of the spans as numbered by OTLP
+SPAN_KIND_INTERNAL = 1
+SPAN_KIND_SERVER = 2
+SPAN_KIND_CLIENT = 3
+
+STATUS_CODE_ERROR = 2
+
+DB_STATEMENT_MAX_LENGTH = 2000
+
+TRACEPARENT_PATTERN = re.compile(r"^00-([0-9a-f]{32})-([0-9a-f]{16})-([0-9a-f]{2})$")
+
+SPAN_KEY = "_trace_span"
+
+
+class Span:
+    def __init__(
+        self,
+        name: str,
+        trace_id: str,
+        parent_id: str | None,
+        kind: int,
+        recording: bool,
+        attributes: dict[str, Any] | None = None,
+        trace: "TraceBuffer | None" = None,
+    ):
+        """
+        One timed operation of a trace, with the W3C trace and span ids.
+        A span which is not sampled is not recording: it carries the ids to the logs, but nothing is exported.
+
+        Arguments:
+            name (str): The name of the operation
+            trace_id (str): The id of the trace (32 hex digits)
+            parent_id (str): The id of the parent span, None for the root
+            kind (int): The kind of the span (server, client or internal)
+            recording (bool): Whether the span is sampled
+            attributes (dict): The attributes of the span
+            trace (TraceBuffer): The finished spans of the trace in this worker
+
+        Returns:
+            None
+        """
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = f"{random.getrandbits(64):016x}"
+        self.parent_id = parent_id
+        self.kind = kind
+        self.recording = recording
+        self.attributes = attributes or {}
+        self.events: list[dict] = []
+        self.error: str | None = None
+        self.start_time = time.time_ns()
+        self.end_time: int | None = None
+        self.trace = trace
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        if self.recording:
+            self.attributes[key] = value
+
+    def record_exception(self, error: BaseException) -> None:
+        if not self.recording:
+            return
+
+        self.error = f"{type(error).__name__}: {error}"
+        self.events.append({
+            "name": "exception",
+            "time": time.time_ns(),
+            "attributes": {"exception.type": type(error).__name__, "exception.message": str(error)},
+        })
+
+    @property
+    def traceparent(self) -> str:
+        return f"00-{self.trace_id}-{self.span_id}-{'01' if self.recording else '00'}"
+
+
+class TraceBuffer:
+    def __init__(self):
+        # The spans of a trace are exported together when its root span ends
+        self.spans: list[Span] = []
+        self.exported = False
+
+
+current_span: ContextVar[Span | None] = ContextVar("current_span", default=None)
+
+
+def otlp_value(value: Any) -> dict:
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    return {"stringValue": str(value)}
+
+
+def otlp_attributes(attributes: dict[str, Any]) -> list[dict]:
+    return [{"key": key, "value": otlp_value(value)} for key, value in attributes.items()]
+
+
+def otlp_span(span: Span) -> dict:
+    data = {
+        "traceId": span.trace_id,
+        "spanId": span.span_id,
+        "name": span.name,
+        "kind": span.kind,
+        "startTimeUnixNano": str(span.start_time),
+        "endTimeUnixNano": str(span.end_time),
+        "attributes": otlp_attributes(span.attributes),
+        "events": [
+            {"name": item["name"], "timeUnixNano": str(item["time"]), "attributes": otlp_attributes(item["attributes"])}
+            for item in span.events
+        ],
+        "status": {"code": STATUS_CODE_ERROR, "message": span.error} if span.error else {},
+    }
+
+    if span.parent_id:
+        data["parentSpanId"] = span.parent_id
+
+    return data
+
+
+class OTLPFileExporter:
+    def __init__(self, path: str, service_name: str):
+        """
+        Appends the spans to a file in the OTLP/JSON format, one export request per line,
+        which is read by the OpenTelemetry Collector (the otlpjsonfile receiver) or by Jaeger.
+
+        Arguments:
+            path (str): The path of the file
+            service_name (str): The service.name of the resource
+
+        Returns:
+            None
+        """
+        self.path = path
+        self.service_name = service_name
+        self.file = None
+        self.lock = threading.Lock()
+
+    def export(self, spans: list[Span]) -> None:
+        request = {
+            "resourceSpans": [{
+                "resource": {"attributes": otlp_attributes({"service.name": self.service_name})},
+                "scopeSpans": [{"scope": {"name": __name__}, "spans": [otlp_span(span) for span in spans]}],
+            }]
+        }
+        line = json.dumps(request, separators=(",", ":")) + "\n"
+
+        with self.lock:
+            if self.file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self.file = open(self.path, "a", encoding="utf-8")
+
+            self.file.write(line)
+            self.file.flush()
+
+    def shutdown(self) -> None:
+        with self.lock:
+            if self.file is not None:
+                self.file.close()
+                self.file = None
+
+
+class InMemorySpanExporter:
+    def __init__(self, max_spans: int = 10000):
+        """
+        Keeps the last finished spans in the memory, for the tests and the local debugging.
+
+        Arguments:
+            max_spans (int): The maximum number of the kept spans
+
+        Returns:
+            None
+        """
+        self.spans: deque[Span] = deque(maxlen=max_spans)
+
+    def export(self, spans: list[Span]) -> None:
+        self.spans.extend(spans)
+
+    def get_finished_spans(self, trace_id: str | None = None) -> list[Span]:
+        return [span for span in self.spans if trace_id is None or span.trace_id == trace_id]
+
+    def clear(self) -> None:
+        self.spans.clear()
+
+    def shutdown(self) -> None:
+        pass
+
+
+def create_exporter() -> OTLPFileExporter | InMemorySpanExporter | None:
+    if not settings.tracing_exporter:
+        return None
+
+    if settings.tracing_exporter == OTLP_FILE_EXPORTER:
+        return OTLPFileExporter(path=settings.tracing_file_path, service_name=settings.tracing_service_name)
+
+    if settings.tracing_exporter == MEMORY_EXPORTER:
+        return InMemorySpanExporter()
+
+    raise ValueError(f"Unknown tracing exporter: {settings.tracing_exporter}")
+
+
+class Tracer:
+    def __init__(self, exporter: OTLPFileExporter | InMemorySpanExporter | None, sample_ratio: float):
+        """
+        Creates the spans of the sampled requests and exports them. The spans of the database, Redis
+        and the manual ones are created only inside a sampled request, so the other work costs one context lookup.
+
+        Arguments:
+            exporter: The exporter of the finished spans, None disables the tracing
+            sample_ratio (float): The share of the new traces which are sampled (0..1)
+
+        Returns:
+            None
+        """
+        self.exporter = exporter
+        self.sample_ratio = sample_ratio
+
+    @property
+    def enabled(self) -> bool:
+        return self.exporter is not None
+
+    def should_sample(self, trace_id: str) -> bool:
+        # By the trace id, like TraceIdRatioBased, so every worker makes the same decision for one trace
+        return int(trace_id[16:], 16) < self.sample_ratio * (1 << 64)
+
+    def start_root(self, name: str, traceparent: str | None = None, attributes: dict | None = None) -> Span:
+        """
+        Starts the span of a request, continuing the trace of the caller when the traceparent header is valid
+        (its sampling decision is followed too).
+        """
+        match = TRACEPARENT_PATTERN.match(traceparent or "")
+
+        if match and match.group(1) != "0" * 32 and match.group(2) != "0" * 16:
+            trace_id, parent_id = match.group(1), match.group(2)
+            recording = bool(int(match.group(3), 16) & 1)
+        else:
+            trace_id, parent_id = f"{random.getrandbits(128):032x}", None
+            recording = self.should_sample(trace_id)
+
+        return Span(
+            name=name,
+            trace_id=trace_id,
+            parent_id=parent_id,
+            kind=SPAN_KIND_SERVER,
+            recording=recording,
+            attributes=attributes,
+            trace=TraceBuffer() if recording else None,
+        )
+
+    def start(self, name: str, kind: int = SPAN_KIND_INTERNAL, attributes: dict | None = None) -> Span | None:
+        """
+        Starts a child of the current span, None outside a sampled trace. The span is not made current.
+        """
+        parent = current_span.get()
+
+        if parent is None or not parent.recording:
+            return None
+
+        return Span(
+            name=name,
+            trace_id=parent.trace_id,
+            parent_id=parent.span_id,
+            kind=kind,
+            recording=True,
+            attributes=attributes,
+            trace=parent.trace,
+        )
+
+    def end(self, span: Span | None, error: BaseException | None = None) -> None:
+        if span is None or not span.recording or span.end_time is not None:
+            return
+
+        if error is not None:
+            span.record_exception(error)
+
+        span.end_time = time.time_ns()
+
+        trace = span.trace
+
+        # A span which outlived its root (a task started by the request) is exported alone
+        if trace.exported:
+            self.export([span])
+            return
+
+        trace.spans.append(span)
+
+        if span.kind == SPAN_KIND_SERVER:
+            trace.exported = True
+            self.export(trace.spans)
+
+    def export(self, spans: list[Span]) -> None:
+        try:
+            self.exporter.export(spans)
+        except Exception as error:
+            logger.warning("Unable to export %s spans: %s", len(spans), str(error))
+
+    @contextmanager
+    def span(self, name: str, kind: int = SPAN_KIND_INTERNAL, **attributes) -> Iterator[Span | None]:
+        """
+        Times the block as a child of the current span, the spans started in the block are its children.
+
+        Arguments:
+            name (str): The name of the operation
+            kind (int): The kind of the span
+            attributes: The attributes of the span
+
+        Returns:
+            Span: The span, None outside a sampled trace
+        """
+        span = self.start(name=name, kind=kind, attributes=attributes)
+
+        if span is None:
+            yield None
+            return
+
+        token = current_span.set(span)
+
+        try:
+            yield span
+        except BaseException as error:
+            self.end(span, error=error)
+            raise
+        finally:
+            current_span.reset(token)
+            self.end(span)
+
+    def shutdown(self) -> None:
+        if self.exporter is not None:
+            self.exporter.shutdown()
+
+
+tracer = Tracer(exporter=create_exporter(), sample_ratio=settings.tracing_sample_ratio)
+
+
+class TracingMiddleware:
+    def __init__(self, app: ASGIApp):
+        """
+        Starts a server span for every HTTP request, named by the route template
+        (e.g. GET /api/v1/posts/{post_slug}), and returns its trace id in the X-Trace-Id header.
+
+        Arguments:
+            app (ASGIApp): The application
+
+        Returns:
+            None
+        """
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        method = scope["method"]
+
+        span = tracer.start_root(
+            name=method,
+            traceparent=headers.get(b"traceparent", b"").decode("latin-1"),
+            attributes={"http.request.method": method, "url.path": scope["path"]},
+        )
+        token = current_span.set(span)
+        status_code = 500
+
+        async def traced_send(message: Message) -> None:
+            nonlocal status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                message["headers"] = [*message.get("headers", []), (b"x-trace-id", span.trace_id.encode())]
+
+            await send(message)
+
+        error = None
+
+        try:
+            await self.app(scope, receive, traced_send)
+        except BaseException as exception:
+            error = exception
+            raise
+        finally:
+            current_span.reset(token)
+
+            # Set by the router of FastAPI when the path matches a route
+            route = scope.get("route")
+            if route is not None and hasattr(route, "path"):
+                span.name = f"{method} {route.path}"
+                span.set_attribute("http.route", route.path)
+
+            span.set_attribute("http.response.status_code", status_code)
+
+            if status_code >= 500 and error is None:
+                span.error = f"HTTP {status_code}"
+
+            tracer.end(span, error=error)
+
+
+def start_cursor_span(conn, cursor, statement, parameters, context, executemany) -> None:
+    operation = statement.lstrip().split(None, 1)[0].upper() if statement.strip() else "SQL"
+
+    span = tracer.start(
+        name=f"{operation} {conn.engine.url.database or conn.dialect.name}",
+        kind=SPAN_KIND_CLIENT,
+        attributes={
+            "db.system": conn.dialect.name,
+            "db.operation": operation,
+            "db.statement": statement[:DB_STATEMENT_MAX_LENGTH],
+        },
+    )
+
+    if span is not None and context is not None:
+        setattr(context, SPAN_KEY, span)
+
+
+def end_cursor_span(conn, cursor, statement, parameters, context, executemany) -> None:
+    tracer.end(getattr(context, SPAN_KEY, None))
+
+
+def end_failed_cursor_span(exception_context) -> None:
+    context = exception_context.execution_context
+    tracer.end(getattr(context, SPAN_KEY, None), error=exception_context.original_exception)
+
+
+def instrument_engine(engine: Engine) -> None:
+    """
+    Times every statement sent to the database (the queries, the flushes and the refreshes) as a child span.
+    The parameters are not recorded, only the statement.
+    """
+    if not tracer.enabled:
+        return
+
+    event.listen(engine, "before_cursor_execute", start_cursor_span)
+    event.listen(engine, "after_cursor_execute", end_cursor_span)
+    event.listen(engine, "handle_error", end_failed_cursor_span)
+
+
+def redis_command_name(args: tuple) -> str:
+    name = args[0] if args else "UNKNOWN"
+    return (name.decode() if isinstance(name, bytes) else str(name)).upper()
+
+
+class TracedPipeline(Pipeline):
+    def execute(self, raise_on_error: bool = True) -> list:
+        operation = "MULTI" if self.transaction else "PIPELINE"
+
+        with tracer.span(
+            operation,
+            kind=SPAN_KIND_CLIENT,
+            **{
+                "db.system": "redis",
+                "db.operation": operation,
+                "db.redis.database_index": self.connection_pool.connection_kwargs.get("db", 0),
+                "db.redis.pipeline_length": len(self.command_stack),
+            },
+        ):
+            return super().execute(raise_on_error=raise_on_error)
+
+
+class TracedRedis(redis.Redis):
+    """
+    Redis client which times every command and pipeline as a child span. The keys and values are not recorded.
+    """
+    def execute_command(self, *args, **options):
+        operation = redis_command_name(args)
+
+        with tracer.span(
+            operation,
+            kind=SPAN_KIND_CLIENT,
+            **{
+                "db.system": "redis",
+                "db.operation": operation,
+                "db.redis.database_index": self.connection_pool.connection_kwargs.get("db", 0),
+            },
+        ):
+            return super().execute_command(*args, **options)
+
+    def pipeline(self, transaction: bool = True, shard_hint=None) -> TracedPipeline:
+        return TracedPipeline(self.connection_pool, self.response_callbacks, transaction, shard_hint)
+
+
+class TraceContextFilter(logging.Filter):
+    """
+    Adds the trace_id and span_id of the current span to the log records ("-" outside a trace),
+    so the logs of a request are found by its trace id.
+    """
+    def filter(self, record: logging.LogRecord) -> bool:
+        span = current_span.get()
+        record.trace_id = span.trace_id if span is not None else "-"
+        record.span_id = span.span_id if span is not None else "-"
+        return True
@@ -4,10 +4,12 @@ from typing import AsyncGenerator, Annotated
 
 from fastapi import HTTPException, status, Depends
 
+from sqlalchemy import text
 from sqlalchemy.exc import SQLAlchemyError
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
 
 from src.core.conf.config import settings
+from src.core.conf.tracing import instrument_engine
 
 logger = logging.getLogger(__name__)
 
@@ -16,11 +18,28 @@ SQLALCHEMY_DATABASE_URL = settings.database_url
 
 async_engine = create_async_engine(SQLALCHEMY_DATABASE_URL, echo=True)
 
+instrument_engine(async_engine.sync_engine)
+
 async_session = async_sessionmaker(
     bind=async_engine, autoflush=False, autocommit=False, expire_on_commit=False
 )
 
 
+async def open_database_pool() -> None:
+    """
+    Opens the first connection of the pool at the worker startup, so the first request does not wait for it.
+    """
+    try:
+        async with async_engine.connect() as connection:
+            await connection.execute(text("SELECT 1"))
+    except Exception as error:
+        logger.error("Unable to connect to the database: %s", str(error))
+
+
+async def close_database_pool() -> None:
+    await async_engine.dispose()
+
+
 async def get_async_session() -> AsyncGenerator[AsyncSession, None]:
     async with async_session() as session:
         try:
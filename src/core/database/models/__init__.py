@@ -4,10 +4,16 @@ __all__ = (
     "Category",
     "Post",
     "Tag",
+    "Follow",
+    "OutboxEvent",
+    "MediaFile",
 )
 
 from .authors import Author
 from .categories import Category
+from .follows import Follow
+from .media_files import MediaFile
+from .outbox import OutboxEvent
 from .posts import Post
 from .profiles import Profile
 from .tags import Tag
@@ -17,7 +17,6 @@ class Author(Base):
     email: Mapped[str] = mapped_column(String(100), nullable=False, unique=True, index=True)
     hashed_password: Mapped[str] = mapped_column(String(1024), nullable=False)
     role: Mapped[Enum[Role]] = mapped_column(Enum(Role), default=Role.user)
-    refresh_token: Mapped[str] = mapped_column(String(500), nullable=True)
     registered_at: Mapped[datetime] = mapped_column(
         default=datetime.utcnow, server_default=func.now()
     )
@@ -25,6 +24,8 @@ class Author(Base):
         default=datetime.utcnow, server_default=func.now()
     )
     is_active: Mapped[bool] = mapped_column(default=True)
+    post_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    follower_count: Mapped[int] = mapped_column(default=0, server_default="0")
 
     profile: Mapped["Profile"] = relationship(lazy="selectin", back_populates="author")
     posts: Mapped[list["Post"]] = relationship(lazy="selectin", back_populates="author")
@@ -15,6 +15,7 @@ class Category(Base):
 
     name: Mapped[str] = mapped_column(String(100), unique=True, index=True, nullable=False)
     slug: Mapped[str] = mapped_column(String(150), nullable=False, unique=True)
+    post_count: Mapped[int] = mapped_column(default=0, server_default="0")
 
     posts: Mapped[list["Post"]] = relationship(lazy="selectin", back_populates="category")
 
@@ -0,0 +1,21 @@
+from datetime import datetime
+
+from sqlalchemy import ForeignKey, UniqueConstraint, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.core.database.db_settings.base import Base
+
+
+class Follow(Base):
+    __table_args__ = (
+        UniqueConstraint("follower_id", "author_id", name="idx_unique_follower_author"),
+    )
+
+    follower_id: Mapped[int] = mapped_column(ForeignKey("authors.id", ondelete="CASCADE"))
+    author_id: Mapped[int] = mapped_column(ForeignKey("authors.id", ondelete="CASCADE"), index=True)
+    created_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow, server_default=func.now()
+    )
+
+    def __repr__(self):
+        return f"<Follow(follower_id={self.follower_id}, author_id={self.author_id})>"
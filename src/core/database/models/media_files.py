@@ -0,0 +1,28 @@
+from datetime import datetime
+
+from sqlalchemy import String, Index, func
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.core.database.db_settings.base import Base
+
+
+class MediaFile(Base):
+    """
+    A stored file shared by the posts and profiles with the same image (the key is derived from the content),
+    deleted by the garbage collector when nothing refers to it.
+    """
+    __tablename__ = "media_files"
+    __table_args__ = (
+        Index("idx_media_files_orphaned_at", "orphaned_at"),
+    )
+
+    key: Mapped[str] = mapped_column(String(255), unique=True)
+    size: Mapped[int]
+    refcount: Mapped[int] = mapped_column(default=0, server_default="0")
+    created_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow, server_default=func.now()
+    )
+    orphaned_at: Mapped[datetime | None] = mapped_column(nullable=True)
+
+    def __repr__(self):
+        return f"<MediaFile(id={self.id}, key={self.key}, refcount={self.refcount})>"
@@ -0,0 +1,30 @@
+from datetime import datetime
+
+from sqlalchemy import String, JSON, Index, Text, func, text
+from sqlalchemy.orm import Mapped, mapped_column
+
+from src.core.database.db_settings.base import Base
+
+
+class OutboxEvent(Base):
+    __tablename__ = "outbox"
+    __table_args__ = (
+        Index("idx_outbox_unpublished", "id", postgresql_where=text("published_at IS NULL")),
+    )
+
+    aggregate_type: Mapped[str] = mapped_column(String(32))
+    aggregate_id: Mapped[int]
+    event_type: Mapped[str] = mapped_column(String(64))
+    payload: Mapped[dict] = mapped_column(JSON, default=dict)
+    created_at: Mapped[datetime] = mapped_column(
+        default=datetime.utcnow, server_default=func.now()
+    )
+    published_at: Mapped[datetime | None] = mapped_column(nullable=True)
+    # The subscribers which handled the event, they are not called again when it is retried
+    handled: Mapped[list] = mapped_column(JSON, default=list, server_default="[]")
+    attempts: Mapped[int] = mapped_column(default=0, server_default="0")
+    last_error: Mapped[str | None] = mapped_column(Text, nullable=True)
+    next_attempt_at: Mapped[datetime | None] = mapped_column(nullable=True)
+
+    def __repr__(self):
+        return f"<OutboxEvent(id={self.id}, event_type={self.event_type}, aggregate_id={self.aggregate_id})>"
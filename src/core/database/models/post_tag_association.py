@@ -1,4 +1,4 @@
-from sqlalchemy import Table, Column, Integer, ForeignKey, UniqueConstraint
+from sqlalchemy import Table, Column, Integer, ForeignKey, UniqueConstraint, Index
 
 from src.core.database.db_settings.base import Base
 
@@ -9,4 +9,5 @@ post_tag_association_table = Table(
     Column("post_id", ForeignKey("posts.id")),
     Column("tag_id", ForeignKey("tags.id")),
     UniqueConstraint("post_id", "tag_id", name="idx_unique_post_tag"),
+    Index("idx_post_tag_association_tag_id", "tag_id", "post_id"),
 )
@@ -1,13 +1,13 @@
 from datetime import datetime
 from typing import TYPE_CHECKING
 
-from sqlalchemy import String, func, ForeignKey
+from sqlalchemy import String, Text, Index, func, ForeignKey, text
 from sqlalchemy.orm import Mapped, mapped_column, relationship
 
 from src.core.database.db_settings.base import Base
 from src.core.database.models.mixins import AuthorRelationMixin
 from src.core.database.models.post_tag_association import post_tag_association_table
-from src.core.database.models.utils import slugify
+from src.core.database.models.utils import slugify, make_excerpt, count_words, reading_time
 
 if TYPE_CHECKING:
     from src.core.database.models.categories import Category
@@ -16,12 +16,22 @@ if TYPE_CHECKING:
 
 class Post(AuthorRelationMixin, Base):
     _author_back_populates = "posts"
+    __table_args__ = (
+        Index("idx_posts_author_id_created_at", "author_id", text("created_at DESC"), "id"),
+        Index("idx_posts_category_id_created_at", "category_id", text("created_at DESC"), "id"),
+        Index("idx_posts_created_at", text("created_at DESC"), "id"),
+    )
 
     title: Mapped[str] = mapped_column(String(255), nullable=False)
     slug: Mapped[str] = mapped_column(String(300), nullable=False, unique=True)
-    content: Mapped[str] = mapped_column(String(500), default="", server_default="")
+    content: Mapped[str] = mapped_column(Text, default="", server_default="")
+    excerpt: Mapped[str] = mapped_column(String(320), default="", server_default="")
+    word_count: Mapped[int] = mapped_column(default=0, server_default="0")
+    reading_time: Mapped[int] = mapped_column(default=0, server_default="0")
     image: Mapped[str] = mapped_column(String(255), nullable=True)
     category_id: Mapped[int] = mapped_column(ForeignKey("categories.id"))
+    views: Mapped[int] = mapped_column(default=0, server_default="0")
+    unique_views: Mapped[int] = mapped_column(default=0, server_default="0")
     created_at: Mapped[datetime] = mapped_column(
         default=datetime.utcnow, server_default=func.now()
     )
@@ -37,10 +47,20 @@ class Post(AuthorRelationMixin, Base):
     def __init__(self, *args, **kwargs):
         super(Post, self).__init__(*args, **kwargs)
         self.generate_slug()
+        self.generate_summary()
 
     def generate_slug(self) -> None:
         if self.title:
             self.slug = slugify(self.title).lower()
 
+    def generate_summary(self) -> None:
+        """
+        Precomputes the excerpt, word count and reading time shown in the listings instead of the content.
+        """
+        content = self.content or ""
+        self.excerpt = make_excerpt(content)
+        self.word_count = count_words(content)
+        self.reading_time = reading_time(self.word_count)
+
     def __repr__(self):
         return f"{self.id}: {self.title}"
@@ -12,6 +12,7 @@ if TYPE_CHECKING:
 
 class Tag(Base):
     name: Mapped[str] = mapped_column(String(150), nullable=False, unique=True)
+    post_count: Mapped[int] = mapped_column(default=0, server_default="0")
 
     posts: Mapped["Post"] = relationship(
         secondary=post_tag_association_table, lazy="selectin", back_populates="tags"
@@ -1,6 +1,29 @@
+import math
 import re
 
+EXCERPT_LENGTH = 300
+WORDS_PER_MINUTE = 200
+
 
 def slugify(s):
     pattern = r"[^\w+]"
     return re.sub(pattern, "-", s)
+
+
+def make_excerpt(text: str, length: int = EXCERPT_LENGTH) -> str:
+    # Only the beginning of the text is normalized, so a long article costs no more than a short one
+    excerpt = " ".join(text[:length * 4].split())
+
+    if len(excerpt) <= length:
+        return excerpt
+
+    return excerpt[:length].rsplit(" ", 1)[0].rstrip(".,;:!?-") + "…"
+
+
+def count_words(text: str) -> int:
+    return len(text.split())
+
+
+def reading_time(word_count: int) -> int:
+    # In minutes, at least one for a non-empty text
+    return math.ceil(word_count / WORDS_PER_MINUTE)
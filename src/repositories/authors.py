@@ -4,13 +4,15 @@ from datetime import datetime
 from fastapi import HTTPException, status
 from fastapi.responses import JSONResponse
 
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.orm import joinedload
 
 from src.core.database import models
-from src.schemas.authors import AuthorCreate, AuthorChangeRole
+from src.repositories import outbox as repository_outbox
+from src.repositories.loaders import get_loaders
+from src.schemas.authors import AuthorCreate, AuthorChangeRole, AuthorBulkChangeRole
 from src.services.security import get_password_hash
 from src.services.validation import validate_password
 
@@ -31,54 +33,35 @@ async def create_author(author: AuthorCreate, session: AsyncSession) -> JSONResp
     )
 
     session.add(new_author)
+    await session.flush()
+
+    repository_outbox.add_event(
+        session=session, aggregate_type="author", aggregate_id=new_author.id, event_type="author.created"
+    )
 
     await session.commit()
     await session.refresh(new_author)
 
+    loaders = get_loaders(session)
+    loaders.author_by_id.prime(new_author.id, new_author)
+    loaders.author_by_email.prime(new_author.email, new_author)
+
     return new_author
 
 
-async def get_all_authors(session: AsyncSession) -> list[models.Author]:
-    stmt = select(models.Author).options(joinedload(models.Author.profile))
+async def get_all_authors(session: AsyncSession, limit: int | None = None) -> list[models.Author]:
+    stmt = select(models.Author).options(joinedload(models.Author.profile)).limit(limit)
     result: Result = await session.execute(stmt)
     authors = result.scalars().all()
     return list(authors)
 
 
 async def get_author_by_email(email: str, session: AsyncSession) -> models.Author | None:
-    stmt = select(models.Author).where(models.Author.email == email)
-    result: Result = await session.execute(stmt)
-    author_data = result.scalar_one_or_none()
-    return author_data
+    return await get_loaders(session).author_by_email.load(email)
 
 
 async def get_author_by_id(author_id: int, session: AsyncSession) -> models.Author | None:
-    stmt = (
-        select(models.Author)
-        .options(joinedload(models.Author.profile))
-        .where(models.Author.id == author_id)
-    )
-    result: Result = await session.execute(stmt)
-    author_data = result.scalar_one_or_none()
-    return author_data
-
-
-async def update_token(author: models.Author, refresh_token: str | None, session: AsyncSession) -> None:
-    """
-    The update_token function updates the refresh token for a user.
-
-    Arguments:
-        author (Author): Pass the user object to the function
-        refresh_token (str | None): Pass the refresh token to the update_token function
-        session (AsyncSession): SQLAlchemy session object for accessing the database
-
-    Returns:
-        None
-    """
-    author.refresh_token = refresh_token
-    author.updated_at = datetime.now()
-
-    await session.commit()
+    return await get_loaders(session).author_by_id.load(author_id)
 
 
 async def change_author_role(author_role: AuthorChangeRole, session: AsyncSession) -> models.Author:
@@ -100,15 +83,63 @@ async def change_author_role(author_role: AuthorChangeRole, session: AsyncSessio
     author_to_update.role = author_role.role
     author_to_update.updated_at = datetime.now()
 
+    repository_outbox.add_event(
+        session=session,
+        aggregate_type="author",
+        aggregate_id=author_to_update.id,
+        event_type="author.role_changed",
+        payload={"role": author_role.role},
+    )
+
     await session.commit()
 
     return author_to_update
 
 
+async def change_authors_role(author_roles: AuthorBulkChangeRole, session: AsyncSession) -> list[int]:
+    """
+    Logged-in admin can change the role of many profiles by their IDs with one UPDATE.
+    The authors which already have the role are not changed.
+
+    Arguments:
+        author_roles (AuthorBulkChangeRole): The ids of the authors and their new role
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+
+    Returns:
+        list[int]: The ids of the changed authors
+    """
+    result: Result = await session.execute(
+        update(models.Author)
+        .where(models.Author.id.in_(set(author_roles.ids)), models.Author.role != author_roles.role)
+        .values(role=author_roles.role, updated_at=datetime.now())
+        .returning(models.Author.id)
+        .execution_options(synchronize_session=False)
+    )
+    author_ids = sorted(result.scalars().all())
+
+    for author_id in author_ids:
+        repository_outbox.add_event(
+            session=session,
+            aggregate_type="author",
+            aggregate_id=author_id,
+            event_type="author.role_changed",
+            payload={"role": author_roles.role},
+        )
+        get_loaders(session).author_by_id.clear(author_id)
+
+    await session.commit()
+
+    return author_ids
+
+
 async def change_password(email: str, password: str, session: AsyncSession) -> None:
     author = await get_author_by_email(email=email, session=session)
 
     author.hashed_password = password
     author.updated_at = datetime.now()
 
+    repository_outbox.add_event(
+        session=session, aggregate_type="author", aggregate_id=author.id, event_type="author.password_changed"
+    )
+
     await session.commit()
@@ -1,11 +1,16 @@
+from datetime import datetime
+
 from fastapi import HTTPException, status
 
-from sqlalchemy import select, asc
+from sqlalchemy import select, asc, update, delete, exists
 from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import lazyload
 
 from src.core.database import models
 from src.core.database.models.utils import slugify
+from src.repositories import counters as repository_counters
+from src.repositories import outbox as repository_outbox
 from src.schemas.categories import CategoryChange
 
 
@@ -14,6 +19,15 @@ async def create_category(category: CategoryChange, session: AsyncSession) -> mo
     new_category = models.Category(**category.model_dump())
 
     session.add(new_category)
+    await session.flush()
+
+    repository_outbox.add_event(
+        session=session,
+        aggregate_type="category",
+        aggregate_id=new_category.id,
+        event_type="category.created",
+        payload={"name": new_category.name},
+    )
 
     await session.commit()
     await session.refresh(new_category)
@@ -21,15 +35,24 @@ async def create_category(category: CategoryChange, session: AsyncSession) -> mo
     return new_category
 
 
-async def get_all_categories(session: AsyncSession) -> list[models.Category]:
-    stmt = select(models.Category).order_by(asc(models.Category.name))
+async def get_all_categories(session: AsyncSession, limit: int | None = None) -> list[models.Category]:
+    stmt = (
+        select(models.Category)
+        .options(lazyload(models.Category.posts))
+        .order_by(asc(models.Category.name))
+        .limit(limit)
+    )
     result: Result = await session.execute(stmt)
     categories = result.scalars().all()
     return list(categories)
 
 
 async def get_category_by_id(session: AsyncSession, category_id: int) -> models.Category | None:
-    stmt = select(models.Category).where(models.Category.id == category_id)
+    stmt = (
+        select(models.Category)
+        .options(lazyload(models.Category.posts))
+        .where(models.Category.id == category_id)
+    )
     result: Result = await session.execute(stmt)
     category = result.scalar_one_or_none()
     return category
@@ -38,9 +61,10 @@ async def get_category_by_id(session: AsyncSession, category_id: int) -> models.
 async def get_category_by_id_and_slug(
         session: AsyncSession, category_id: int, category_slug: str
 ) -> models.Category | None:
-    stmt = select(models.Category).where(
-        models.Category.id == category_id,
-        models.Category.slug == category_slug
+    stmt = (
+        select(models.Category)
+        .options(lazyload(models.Category.posts))
+        .where(models.Category.id == category_id, models.Category.slug == category_slug)
     )
     result: Result = await session.execute(stmt)
     category = result.scalar_one_or_none()
@@ -48,7 +72,11 @@ async def get_category_by_id_and_slug(
 
 
 async def get_category_by_name(session: AsyncSession, category_name: str) -> models.Category | None:
-    stmt = select(models.Category).where(models.Category.name == category_name)
+    stmt = (
+        select(models.Category)
+        .options(lazyload(models.Category.posts))
+        .where(models.Category.name == category_name)
+    )
     result: Result = await session.execute(stmt)
     category = result.scalar_one_or_none()
     return category
@@ -70,18 +98,92 @@ async def update_category(
 
     category.slug = slugify(updated_category.name).lower()
 
+    repository_outbox.add_event(
+        session=session,
+        aggregate_type="category",
+        aggregate_id=category.id,
+        event_type="category.updated",
+        payload={"name": category.name, "slug": category.slug},
+    )
+
     await session.commit()
     await session.refresh(category)
 
     return category
 
 
+async def category_has_posts(session: AsyncSession, category_id: int) -> bool:
+    stmt = select(exists().where(models.Post.category_id == category_id))
+    result: Result = await session.execute(stmt)
+    return result.scalar()
+
+
 async def delete_category(category_id: int, session: AsyncSession) -> None:
-    category = await get_category_by_id(category_id=category_id, session=session)
-    if not category:
+    if await category_has_posts(session=session, category_id=category_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="Category cannot be deleted while there are any posts in it, move them to another category first",
+        )
+
+    result: Result = await session.execute(delete(models.Category).where(models.Category.id == category_id))
+
+    if not result.rowcount:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Category not found",
         )
 
-    await session.delete(category)
+    repository_outbox.add_event(
+        session=session, aggregate_type="category", aggregate_id=category_id, event_type="category.deleted"
+    )
+
+    await session.commit()
+
+
+async def move_category_posts(session: AsyncSession, category_id: int, target_category_id: int) -> int:
+    """
+    Moves all the posts of the category to the target category by one UPDATE, the posts are never loaded.
+    The slugs of the posts are kept, so their URLs do not change (as when the category is renamed).
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+        category_id (int): The category the posts are moved from
+        target_category_id (int): The category the posts are moved to
+
+    Returns:
+        int: The number of the moved posts
+    """
+    if category_id == target_category_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="The posts cannot be moved to the same category",
+        )
+
+    for checked_category_id in (category_id, target_category_id):
+        if not await get_category_by_id(session=session, category_id=checked_category_id):
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
+
+    result: Result = await session.execute(
+        update(models.Post)
+        .where(models.Post.category_id == category_id)
+        .values(category_id=target_category_id, updated_at=datetime.now())
+        .returning(models.Post.id)
+        .execution_options(synchronize_session=False)
+    )
+    post_ids = list(result.scalars().all())
+
+    if post_ids:
+        await repository_counters.shift_post_counts(session=session, delta=-len(post_ids), category_id=category_id)
+        await repository_counters.shift_post_counts(
+            session=session, delta=len(post_ids), category_id=target_category_id
+        )
+
+        repository_outbox.add_event(
+            session=session,
+            aggregate_type="category",
+            aggregate_id=category_id,
+            event_type="category.posts_moved",
+            payload={"target_category_id": target_category_id, "post_ids": post_ids},
+        )
+
     await session.commit()
+
+    return len(post_ids)
@@ -0,0 +1,195 @@
+import logging
+from typing import Iterable
+
+from sqlalchemy import update, select, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.database import models
+from src.core.database.models.post_tag_association import post_tag_association_table
+
+logger = logging.getLogger(__name__)
+
+
+async def shift_post_counts(
+    session: AsyncSession,
+    delta: int,
+    author_id: int | None = None,
+    category_id: int | None = None,
+    tag_ids: Iterable[int] = (),
+) -> None:
+    """
+    Shifts the denormalized post_count columns by delta.
+    The statements are only executed, so they are committed together with the caller's write.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+        delta (int): The value added to every affected counter (negative to decrement)
+        author_id (int | None): The author whose counter is shifted
+        category_id (int | None): The category whose counter is shifted
+        tag_ids (Iterable[int]): The tags whose counters are shifted
+
+    Returns:
+        None
+    """
+    if author_id is not None:
+        await session.execute(
+            update(models.Author)
+            .where(models.Author.id == author_id)
+            .values(post_count=models.Author.post_count + delta)
+        )
+
+    if category_id is not None:
+        await session.execute(
+            update(models.Category)
+            .where(models.Category.id == category_id)
+            .values(post_count=models.Category.post_count + delta)
+        )
+
+    tag_ids = list(tag_ids)
+
+    if tag_ids:
+        await session.execute(
+            update(models.Tag)
+            .where(models.Tag.id.in_(tag_ids))
+            .values(post_count=models.Tag.post_count + delta)
+        )
+
+
+async def shift_follower_count(session: AsyncSession, author_id: int, delta: int) -> None:
+    """
+    Shifts the denormalized follower_count column of the author by delta.
+    The statement is only executed, so it is committed together with the caller's follow or unfollow.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+        author_id (int): The followed author
+        delta (int): The value added to the counter (negative to decrement)
+
+    Returns:
+        None
+    """
+    await session.execute(
+        update(models.Author)
+        .where(models.Author.id == author_id)
+        .values(follower_count=models.Author.follower_count + delta)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def get_actual_post_counts() -> tuple:
+    """
+    The correlated subqueries counting the posts of every category, author and tag.
+    """
+    category_count = (
+        select(func.count(models.Post.id))
+        .where(models.Post.category_id == models.Category.id)
+        .scalar_subquery()
+    )
+    author_count = (
+        select(func.count(models.Post.id))
+        .where(models.Post.author_id == models.Author.id)
+        .scalar_subquery()
+    )
+    tag_count = (
+        select(func.count(post_tag_association_table.c.id))
+        .where(post_tag_association_table.c.tag_id == models.Tag.id)
+        .scalar_subquery()
+    )
+
+    return (
+        ("categories", models.Category, category_count),
+        ("authors", models.Author, author_count),
+        ("tags", models.Tag, tag_count),
+    )
+
+
+async def recount_post_counts(
+    session: AsyncSession,
+    author_ids: Iterable[int] = (),
+    category_ids: Iterable[int] = (),
+    tag_ids: Iterable[int] = (),
+) -> None:
+    """
+    Sets the post_count columns of the given rows to the actual counts, one statement per table.
+    It is used after the bulk changes, which affect many rows by different deltas.
+    The statements are only executed, so they are committed together with the caller's write.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+        author_ids (Iterable[int]): The authors whose counters are recounted
+        category_ids (Iterable[int]): The categories whose counters are recounted
+        tag_ids (Iterable[int]): The tags whose counters are recounted
+
+    Returns:
+        None
+    """
+    ids = {"categories": set(category_ids), "authors": set(author_ids), "tags": set(tag_ids)}
+
+    for table_name, model, actual_count in get_actual_post_counts():
+        if ids[table_name]:
+            await session.execute(
+                update(model)
+                .where(model.id.in_(ids[table_name]))
+                .values(post_count=actual_count)
+                .execution_options(synchronize_session=False)
+            )
+
+
+async def reconcile_post_counts(session: AsyncSession) -> dict[str, int]:
+    """
+    Repairs the drift of post_count columns by recounting them from the source tables.
+    Only the rows whose counter differs from the actual count are updated.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+
+    Returns:
+        dict: The number of repaired rows per table
+    """
+    repaired = {}
+
+    for table_name, model, actual_count in get_actual_post_counts():
+        result = await session.execute(
+            update(model)
+            .where(model.post_count != actual_count)
+            .values(post_count=actual_count)
+            .execution_options(synchronize_session=False)
+        )
+        repaired[table_name] = result.rowcount
+
+    await session.commit()
+
+    logger.info("Post counters reconciled: %s", repaired)
+
+    return repaired
+
+
+async def reconcile_follower_counts(session: AsyncSession) -> int:
+    """
+    Repairs the drift of follower_count column by recounting it from the follows.
+    Only the authors whose counter differs from the actual count are updated.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+
+    Returns:
+        int: The number of repaired authors
+    """
+    actual_count = (
+        select(func.count(models.Follow.id))
+        .where(models.Follow.author_id == models.Author.id)
+        .scalar_subquery()
+    )
+
+    result = await session.execute(
+        update(models.Author)
+        .where(models.Author.follower_count != actual_count)
+        .values(follower_count=actual_count)
+        .execution_options(synchronize_session=False)
+    )
+
+    await session.commit()
+
+    logger.info("Follower counters reconciled: %s", result.rowcount)
+
+    return result.rowcount
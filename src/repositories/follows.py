@@ -0,0 +1,86 @@
+from fastapi import HTTPException, status
+
+from sqlalchemy import select, delete
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.database import models
+from src.repositories import counters as repository_counters
+
+
+async def get_follow(session: AsyncSession, follower_id: int, author_id: int) -> models.Follow | None:
+    stmt = select(models.Follow).where(
+        models.Follow.follower_id == follower_id,
+        models.Follow.author_id == author_id,
+    )
+    result: Result = await session.execute(stmt)
+    follow = result.scalar_one_or_none()
+    return follow
+
+
+async def follow_author(session: AsyncSession, follower_id: int, author_id: int) -> models.Follow:
+    if follower_id == author_id:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="You cannot follow yourself"
+        )
+
+    if await get_follow(session=session, follower_id=follower_id, author_id=author_id):
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT, detail="You already follow this author"
+        )
+
+    new_follow = models.Follow(follower_id=follower_id, author_id=author_id)
+
+    session.add(new_follow)
+
+    await repository_counters.shift_follower_count(session=session, author_id=author_id, delta=1)
+
+    await session.commit()
+    await session.refresh(new_follow)
+
+    return new_follow
+
+
+async def unfollow_author(session: AsyncSession, follower_id: int, author_id: int) -> None:
+    result = await session.execute(
+        delete(models.Follow).where(
+            models.Follow.follower_id == follower_id,
+            models.Follow.author_id == author_id,
+        )
+    )
+
+    if not result.rowcount:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="You do not follow this author"
+        )
+
+    await repository_counters.shift_follower_count(session=session, author_id=author_id, delta=-1)
+
+    await session.commit()
+
+
+async def count_followers(session: AsyncSession, author_id: int) -> int:
+    stmt = select(models.Author.follower_count).where(models.Author.id == author_id)
+    result: Result = await session.execute(stmt)
+    return result.scalar_one_or_none() or 0
+
+
+async def get_follower_ids(session: AsyncSession, author_id: int) -> list[int]:
+    stmt = select(models.Follow.follower_id).where(models.Follow.author_id == author_id)
+    result: Result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def get_followed_authors_with_follower_counts(
+    session: AsyncSession, follower_id: int
+) -> list[tuple[int, int]]:
+    """
+    Returns the ids of the authors followed by the follower together with their follower counts.
+    """
+    stmt = (
+        select(models.Author.id, models.Author.follower_count)
+        .join(models.Follow, models.Follow.author_id == models.Author.id)
+        .where(models.Follow.follower_id == follower_id)
+    )
+    result: Result = await session.execute(stmt)
+    return [(author_id, count) for author_id, count in result.all()]
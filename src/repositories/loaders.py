@@ -0,0 +1,163 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Hashable
+
+from sqlalchemy import event, select
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, joinedload, lazyload, subqueryload, defaultload
+
+from src.core.database import models
+
+LOADERS_KEY = "loaders"
+
+BatchLoad = Callable[[AsyncSession, list], Awaitable[dict]]
+
+
+class DataLoader:
+    def __init__(self, session: AsyncSession, batch_load: BatchLoad, lock: asyncio.Lock):
+        """
+        Request-scoped loader of the entities by a key. The keys requested in the same
+        event loop tick are loaded by one query, and every key is loaded at most once per session,
+        the missing entities (None) included.
+
+        Arguments:
+            session (AsyncSession): The session of the request
+            batch_load (BatchLoad): Loads the entities of the keys, returns them by their keys
+            lock (asyncio.Lock): Shared by the loaders of the session, which can run one query at a time
+
+        Returns:
+            None
+        """
+        self.session = session
+        self.batch_load = batch_load
+        self.lock = lock
+        self.futures: dict[Hashable, asyncio.Future] = {}
+        self.queue: list[Hashable] = []
+
+    async def load(self, key: Hashable) -> Any:
+        future = self.futures.get(key)
+
+        if future is None:
+            future = self.futures[key] = asyncio.get_running_loop().create_future()
+            self.queue.append(key)
+
+            if len(self.queue) == 1:
+                # The loads started by the other coroutines of this tick join the batch
+                await asyncio.sleep(0)
+                await self.dispatch()
+
+        return await future
+
+    async def dispatch(self) -> None:
+        keys, self.queue = self.queue, []
+        futures = {key: self.futures[key] for key in keys}
+
+        try:
+            async with self.lock:
+                entities = await self.batch_load(self.session, keys)
+        except Exception as error:
+            for key, future in futures.items():
+                if self.futures.get(key) is future:
+                    del self.futures[key]
+                future.set_exception(error)
+            return
+
+        for key, future in futures.items():
+            future.set_result(entities.get(key))
+
+    def prime(self, key: Hashable, entity: Any) -> None:
+        """
+        Stores an entity loaded or created otherwise, unless the key is already being loaded.
+        """
+        future = self.futures.get(key)
+
+        if future is not None and not future.done():
+            return
+
+        future = asyncio.get_running_loop().create_future()
+        future.set_result(entity)
+        self.futures[key] = future
+
+    def clear(self, key: Hashable) -> None:
+        self.futures.pop(key, None)
+
+
+async def load_posts_by_ids(session: AsyncSession, post_ids: list[int]) -> dict[int, models.Post]:
+    stmt = (
+        select(models.Post)
+        .options(
+            joinedload(models.Post.author).joinedload(models.Author.profile),
+            defaultload(models.Post.author).lazyload(models.Author.posts),
+            joinedload(models.Post.category).lazyload(models.Category.posts),
+            subqueryload(models.Post.tags).lazyload(models.Tag.posts),
+        )
+        .where(models.Post.id.in_(post_ids))
+    )
+    result: Result = await session.execute(stmt)
+    return {post.id: post for post in result.scalars().all()}
+
+
+def select_authors():
+    return select(models.Author).options(joinedload(models.Author.profile), lazyload(models.Author.posts))
+
+
+async def load_authors_by_ids(session: AsyncSession, author_ids: list[int]) -> dict[int, models.Author]:
+    result: Result = await session.execute(select_authors().where(models.Author.id.in_(author_ids)))
+    authors = {author.id: author for author in result.scalars().all()}
+
+    for author in authors.values():
+        get_loaders(session).author_by_email.prime(author.email, author)
+
+    return authors
+
+
+async def load_authors_by_emails(session: AsyncSession, emails: list[str]) -> dict[str, models.Author]:
+    result: Result = await session.execute(select_authors().where(models.Author.email.in_(emails)))
+    authors = {author.email: author for author in result.scalars().all()}
+
+    for author in authors.values():
+        get_loaders(session).author_by_id.prime(author.id, author)
+
+    return authors
+
+
+async def load_profiles_by_author_ids(session: AsyncSession, author_ids: list[int]) -> dict[int, models.Profile]:
+    stmt = (
+        select(models.Profile)
+        .options(defaultload(models.Profile.author).lazyload(models.Author.posts))
+        .where(models.Profile.author_id.in_(author_ids))
+    )
+    result: Result = await session.execute(stmt)
+    profiles = {profile.author_id: profile for profile in result.scalars().all()}
+
+    for profile in profiles.values():
+        get_loaders(session).author_by_id.prime(profile.author_id, profile.author)
+        get_loaders(session).author_by_email.prime(profile.author.email, profile.author)
+
+    return profiles
+
+
+class Loaders:
+    def __init__(self, session: AsyncSession):
+        lock = asyncio.Lock()
+        self.post_by_id = DataLoader(session=session, batch_load=load_posts_by_ids, lock=lock)
+        self.author_by_id = DataLoader(session=session, batch_load=load_authors_by_ids, lock=lock)
+        self.author_by_email = DataLoader(session=session, batch_load=load_authors_by_emails, lock=lock)
+        self.profile_by_author_id = DataLoader(session=session, batch_load=load_profiles_by_author_ids, lock=lock)
+
+
+def get_loaders(session: AsyncSession) -> Loaders:
+    """
+    Returns the loaders of the session, the session lives as long as the request,
+    so the entities are shared by the dependencies, the handler and the repositories of one request.
+    """
+    if LOADERS_KEY not in session.info:
+        session.info[LOADERS_KEY] = Loaders(session=session)
+
+    return session.info[LOADERS_KEY]
+
+
+@event.listens_for(Session, "after_soft_rollback")
+def clear_loaders(session: Session, previous_transaction) -> None:
+    # The rollback expires the loaded entities, they are loaded again on the next use
+    session.info.pop(LOADERS_KEY, None)
@@ -0,0 +1,136 @@
+from datetime import datetime
+
+from sqlalchemy import select, update, delete, case, func
+from sqlalchemy.engine import Result
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.database import models
+
+
+async def acquire_media_file(session: AsyncSession, key: str, size: int) -> bool:
+    """
+    Counts one more reference to the stored file, the row of a new content is created.
+    The row stays locked until the commit, so the garbage collector cannot delete the file meanwhile.
+
+    Arguments:
+        session (AsyncSession): The session of the transaction which stores the reference
+        key (str): The key of the file in the storage
+        size (int): The size of the file in bytes
+
+    Returns:
+        bool: True if the row was created, the file may be missing or left by an upload which was never committed
+    """
+    stmt = (
+        update(models.MediaFile)
+        .where(models.MediaFile.key == key)
+        .values(refcount=models.MediaFile.refcount + 1, orphaned_at=None)
+    )
+
+    if (await session.execute(stmt)).rowcount:
+        return False
+
+    try:
+        async with session.begin_nested():
+            session.add(models.MediaFile(key=key, size=size, refcount=1))
+    except IntegrityError:
+        # Created by a concurrent upload of the same content
+        await session.execute(stmt)
+        return False
+
+    return True
+
+
+async def release_media_files(session: AsyncSession, references: dict[str, int]) -> None:
+    """
+    Counts the released references by the keys of the files with one UPDATE, the files without references
+    are marked as orphaned. The files uploaded before the refcounting have no row and are left alone.
+
+    Arguments:
+        session (AsyncSession): The session of the transaction which removes the references
+        references (dict): The number of the released references by the key of the file
+
+    Returns:
+        None
+    """
+    if not references:
+        return
+
+    released = case(references, value=models.MediaFile.key, else_=0)
+
+    await session.execute(
+        update(models.MediaFile)
+        .where(models.MediaFile.key.in_(references), models.MediaFile.refcount > 0)
+        .values(
+            refcount=case((models.MediaFile.refcount <= released, 0), else_=models.MediaFile.refcount - released),
+            orphaned_at=case((models.MediaFile.refcount <= released, datetime.utcnow()), else_=None),
+        )
+        .execution_options(synchronize_session=False)
+    )
+
+
+async def get_orphaned_media_files(
+    session: AsyncSession, orphaned_before: datetime, limit: int
+) -> list[models.MediaFile]:
+    # The rows being acquired by an upload are skipped, the others stay locked until they are deleted
+    stmt = (
+        select(models.MediaFile)
+        .where(models.MediaFile.refcount <= 0, models.MediaFile.orphaned_at < orphaned_before)
+        .order_by(models.MediaFile.orphaned_at)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result: Result = await session.execute(stmt)
+    return list(result.scalars().all())
+
+
+async def delete_media_files(session: AsyncSession, media_file_ids: list[int]) -> None:
+    await session.execute(delete(models.MediaFile).where(models.MediaFile.id.in_(media_file_ids)))
+
+
+async def get_media_file_keys(session: AsyncSession) -> set[str]:
+    result: Result = await session.execute(select(models.MediaFile.key))
+    return set(result.scalars().all())
+
+
+async def get_image_references(session: AsyncSession) -> dict[tuple[str, str], int]:
+    """
+    Returns the number of the posts and profiles referring to every image by (model, filename).
+    """
+    references = {}
+
+    for model in (models.Post, models.Profile):
+        result: Result = await session.execute(
+            select(model.image, func.count(model.id)).where(model.image.is_not(None)).group_by(model.image)
+        )
+        for image, count in result.all():
+            references[(model.__tablename__, image)] = count
+
+    return references
+
+
+async def reconcile_media_refcounts(session: AsyncSession, refcounts: dict[str, int]) -> int:
+    """
+    Sets the refcounts counted from the references, e.g. after rows were deleted bypassing the repositories.
+
+    Arguments:
+        session (AsyncSession): The session
+        refcounts (dict): The number of references by the key of the file
+
+    Returns:
+        int: The number of repaired rows
+    """
+    result: Result = await session.execute(select(models.MediaFile))
+    repaired = 0
+
+    for media_file in result.scalars().all():
+        refcount = refcounts.get(media_file.key, 0)
+
+        if media_file.refcount != refcount:
+            media_file.refcount = refcount
+            media_file.orphaned_at = datetime.utcnow() if refcount == 0 else None
+            repaired += 1
+
+    await session.commit()
+
+    return repaired
@@ -0,0 +1,112 @@
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, update, delete, insert, or_
+from sqlalchemy.engine import Result
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.database import models
+
+
+def add_event(
+    session: AsyncSession,
+    aggregate_type: str,
+    aggregate_id: int,
+    event_type: str,
+    payload: dict | None = None,
+) -> None:
+    """
+    Adds a change event to the outbox. The event is only added to the session,
+    so it is committed in the same transaction as the change it describes, or not at all.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+        aggregate_type (str): The type of the changed entity (post, tag, category, author)
+        aggregate_id (int): The id of the changed entity
+        event_type (str): The type of the event, e.g. post.created
+        payload (dict | None): JSON-serializable details the subscribers need
+
+    Returns:
+        None
+    """
+    session.add(
+        models.OutboxEvent(
+            aggregate_type=aggregate_type,
+            aggregate_id=aggregate_id,
+            event_type=event_type,
+            payload=payload or {},
+        )
+    )
+
+
+async def add_events(session: AsyncSession, events: list[dict]) -> None:
+    """
+    Inserts the change events of a bulk change with one statement, in the transaction of the change.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+        events (list[dict]): The events with the same keys as the arguments of add_event
+
+    Returns:
+        None
+    """
+    if events:
+        await session.execute(
+            insert(models.OutboxEvent),
+            [{"payload": {}, **event} for event in events],
+        )
+
+
+async def claim_unpublished_events(session: AsyncSession, limit: int, max_attempts: int) -> list[models.OutboxEvent]:
+    """
+    Returns the oldest unpublished events due for a (re)try and locks them until the transaction ends.
+    The events locked by another relay are skipped, so every event is relayed by one worker.
+    The events which failed max_attempts times are left in the table for an inspection.
+    """
+    stmt = (
+        select(models.OutboxEvent)
+        .where(
+            models.OutboxEvent.published_at.is_(None),
+            models.OutboxEvent.attempts < max_attempts,
+            or_(
+                models.OutboxEvent.next_attempt_at.is_(None),
+                models.OutboxEvent.next_attempt_at <= datetime.utcnow(),
+            ),
+        )
+        .order_by(models.OutboxEvent.id)
+        .limit(limit)
+        .with_for_update(skip_locked=True)
+    )
+    result: Result = await session.execute(stmt)
+    events = result.scalars().all()
+    return list(events)
+
+
+async def mark_events_published(session: AsyncSession, event_ids: list[int]) -> None:
+    stmt = (
+        update(models.OutboxEvent)
+        .where(models.OutboxEvent.id.in_(event_ids))
+        .values(published_at=datetime.utcnow())
+    )
+    await session.execute(stmt)
+
+
+def record_event_failure(
+    event: models.OutboxEvent, handled: list[str], error: str, next_attempt_at: datetime
+) -> None:
+    """
+    Keeps the event unpublished for a retry, with the subscribers which already handled it.
+    The event is claimed by the session, which commits the change.
+    """
+    event.handled = list(handled)
+    event.attempts += 1
+    event.last_error = error
+    event.next_attempt_at = next_attempt_at
+
+
+async def delete_published_events(session: AsyncSession, older_than: timedelta) -> int:
+    stmt = delete(models.OutboxEvent).where(
+        models.OutboxEvent.published_at < datetime.utcnow() - older_than
+    )
+    result = await session.execute(stmt)
+    await session.commit()
+    return result.rowcount
@@ -1,24 +1,87 @@
-import os
+from collections import defaultdict
 from datetime import datetime
 
-from io import BytesIO
-from PIL import Image
-
 from fastapi import HTTPException, status, UploadFile
 
-from sqlalchemy import select, desc, and_
+from sqlalchemy import select, desc, and_, delete, exists
 from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.orm import subqueryload, joinedload
+from sqlalchemy.orm import subqueryload, joinedload, defaultload, lazyload, defer, load_only
 
 from src.core.database import models
 from src.core.database.models.post_tag_association import post_tag_association_table
 from src.core.database.models.utils import slugify
 
-from src.schemas.posts import PostCreate, PostPartialUpdate
+from src.schemas.posts import PostCreate, PostPartialUpdate, PostFieldset
 
+from src.repositories import counters as repository_counters
+from src.repositories.loaders import get_loaders
+from src.repositories import outbox as repository_outbox
 from src.repositories import tags as repository_tags
 
+from src.services import media as media_service
+
+# The listings return the excerpts: the content is not read, nor are the back-references
+# (all the posts of the author, category and tags), so a page costs the same whatever the article length.
+LISTING_OPTIONS = (
+    joinedload(models.Post.author).joinedload(models.Author.profile),
+    defaultload(models.Post.author).lazyload(models.Author.posts),
+    defaultload(models.Post.category).lazyload(models.Category.posts),
+    subqueryload(models.Post.tags).lazyload(models.Tag.posts),
+    defer(models.Post.content),
+)
+
+DETAIL_OPTIONS = (
+    joinedload(models.Post.author).joinedload(models.Author.profile),
+    subqueryload(models.Post.tags),
+)
+
+# The posts deleted per statement by delete_posts, the ids of a batch are locked and deleted together
+BULK_DELETE_BATCH_SIZE = 1000
+
+
+def get_loader_options(fieldset: PostFieldset | None, detail: bool = False) -> tuple:
+    """
+    Returns the loader options reading only the requested columns of the posts
+    and loading only the requested embedded entities.
+
+    Arguments:
+        fieldset (PostFieldset | None): The requested fields and embeds, None for the whole posts
+        detail (bool): Whether the content of the post is returned by default
+
+    Returns:
+        tuple: The loader options of the query
+    """
+    if fieldset is None or fieldset.is_default:
+        return DETAIL_OPTIONS if detail else LISTING_OPTIONS
+
+    columns = [
+        getattr(models.Post, name) for name in fieldset.fields if name in models.Post.__mapper__.column_attrs
+    ]
+    if detail:
+        # The view counters of the post page are counted from the stored ones
+        columns += [models.Post.views, models.Post.unique_views]
+
+    options = [load_only(models.Post.id, *columns)]
+
+    if "author" in fieldset.include:
+        options.append(joinedload(models.Post.author).joinedload(models.Author.profile))
+        options.append(defaultload(models.Post.author).lazyload(models.Author.posts))
+    else:
+        options.append(lazyload(models.Post.author))
+
+    if "tags" in fieldset.include:
+        options.append(subqueryload(models.Post.tags).lazyload(models.Tag.posts))
+    else:
+        options.append(lazyload(models.Post.tags))
+
+    if "category" in fieldset.include:
+        options.append(joinedload(models.Post.category).lazyload(models.Category.posts))
+    else:
+        options.append(lazyload(models.Post.category))
+
+    return tuple(options)
+
 
 async def create_post(
     post_data: PostCreate, author_id: int, category_id: int, session: AsyncSession
@@ -27,11 +90,23 @@ async def create_post(
 
     session.add(new_post)
 
-    await session.commit()
+    await repository_counters.shift_post_counts(
+        session=session, delta=1, author_id=author_id, category_id=category_id
+    )
+
+    await session.flush()
     await session.refresh(new_post)
 
     new_post.slug = f"{new_post.slug}-{new_post.category.slug}-{new_post.id}"
 
+    repository_outbox.add_event(
+        session=session,
+        aggregate_type="post",
+        aggregate_id=new_post.id,
+        event_type="post.created",
+        payload={"author_id": author_id, "category_id": category_id},
+    )
+
     await session.commit()
 
     return new_post
@@ -44,6 +119,8 @@ async def add_tags_to_post(
     if not post:
         raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
+    added_tags = {}
+
     for tag_name in tag_names:
         tag_name = models.Tag.add_hashtag(tag_name)
         tag = await repository_tags.get_tag_by_name(session=session, tag_name=tag_name)
@@ -55,6 +132,18 @@ async def add_tags_to_post(
         )
         await session.execute(post_tag_association)
 
+        added_tags[tag.id] = tag.name
+
+    await repository_counters.shift_post_counts(session=session, delta=1, tag_ids=added_tags.keys())
+
+    repository_outbox.add_event(
+        session=session,
+        aggregate_type="post",
+        aggregate_id=post.id,
+        event_type="post.tags_added",
+        payload={"tag_names": added_tags, "post_created_at": post.created_at.isoformat()},
+    )
+
     await session.commit()
 
 
@@ -92,64 +181,109 @@ async def remove_tag_from_post(session: AsyncSession, tag_id: int, post_id: int,
     )
 
     await session.execute(post_tag_association)
+
+    await repository_counters.shift_post_counts(session=session, delta=-1, tag_ids=[tag.id])
+
+    repository_outbox.add_event(
+        session=session,
+        aggregate_type="post",
+        aggregate_id=post.id,
+        event_type="post.tag_removed",
+        payload={"tag_id": tag.id, "post_created_at": post.created_at.isoformat()},
+    )
+
     await session.commit()
 
 
-async def get_all_posts(session: AsyncSession) -> list[models.Post]:
+async def get_all_posts(
+    session: AsyncSession, fieldset: PostFieldset | None = None, limit: int | None = None
+) -> list[models.Post]:
     stmt = (
         select(models.Post)
-        .options(joinedload(models.Post.author).joinedload(models.Author.profile))
-        .options(subqueryload(models.Post.tags))
-        .order_by(desc(models.Post.created_at))
+        .options(*get_loader_options(fieldset=fieldset))
+        .order_by(desc(models.Post.created_at), models.Post.id)
+        .limit(limit)
     )
     result: Result = await session.execute(stmt)
     posts = result.scalars().all()
     return list(posts)
 
 
-async def get_all_posts_by_author_id(author_id: int, session: AsyncSession) -> list[models.Post]:
+async def get_all_posts_by_author_id(
+    author_id: int, session: AsyncSession, fieldset: PostFieldset | None = None, limit: int | None = None
+) -> list[models.Post]:
     stmt = (
         select(models.Post)
-        .options(joinedload(models.Post.author).joinedload(models.Author.profile))
-        .options(subqueryload(models.Post.tags))
+        .options(*get_loader_options(fieldset=fieldset))
         .where(models.Post.author_id == author_id)
-        .order_by(desc(models.Post.created_at))
+        .order_by(desc(models.Post.created_at), models.Post.id)
+        .limit(limit)
     )
     result: Result = await session.execute(stmt)
     posts = result.scalars().all()
     return list(posts)
 
 
-async def get_all_posts_by_category_id(category_id: int, session: AsyncSession) -> list[models.Post]:
+async def get_all_posts_by_category_id(
+    category_id: int, session: AsyncSession, fieldset: PostFieldset | None = None, limit: int | None = None
+) -> list[models.Post]:
     stmt = (
         select(models.Post)
-        .options(joinedload(models.Post.author).joinedload(models.Author.profile))
-        .options(subqueryload(models.Post.tags))
+        .options(*get_loader_options(fieldset=fieldset))
         .where(models.Post.category_id == category_id)
-        .order_by(desc(models.Post.created_at))
+        .order_by(desc(models.Post.created_at), models.Post.id)
+        .limit(limit)
     )
     result: Result = await session.execute(stmt)
     posts = result.scalars().all()
     return list(posts)
 
 
-async def get_specific_post_by_id(session: AsyncSession, post_id: int) -> models.Post | None:
+async def get_posts_by_ids(
+    session: AsyncSession, post_ids: list[int], fieldset: PostFieldset | None = None
+) -> list[models.Post]:
+    """
+    Returns the posts in the order of the given ids, the missing (deleted) posts are skipped.
+    """
+    if not post_ids:
+        return []
+
     stmt = (
         select(models.Post)
-        .options(subqueryload(models.Post.tags))
-        .where(models.Post.id == post_id)
-        .order_by(desc(models.Post.created_at))
+        .options(*get_loader_options(fieldset=fieldset))
+        .where(models.Post.id.in_(post_ids))
     )
     result: Result = await session.execute(stmt)
-    post = result.scalar_one_or_none()
-    return post
+    posts = {post.id: post for post in result.scalars().all()}
+    return [posts[post_id] for post_id in post_ids if post_id in posts]
 
 
-async def get_single_post_by_slug(session: AsyncSession, slug: str) -> models.Post | None:
+async def get_post_summaries_by_ids(session: AsyncSession, post_ids: list[int]) -> list[dict]:
+    """
+    Returns only the id, title, slug and image of the posts in the order of the given ids.
+    """
+    if not post_ids:
+        return []
+
+    stmt = (
+        select(models.Post.id, models.Post.title, models.Post.slug, models.Post.image)
+        .where(models.Post.id.in_(post_ids))
+    )
+    result: Result = await session.execute(stmt)
+    posts = {post["id"]: dict(post) for post in result.mappings().all()}
+    return [posts[post_id] for post_id in post_ids if post_id in posts]
+
+
+async def get_specific_post_by_id(session: AsyncSession, post_id: int) -> models.Post | None:
+    return await get_loaders(session).post_by_id.load(post_id)
+
+
+async def get_single_post_by_slug(
+    session: AsyncSession, slug: str, fieldset: PostFieldset | None = None
+) -> models.Post | None:
     stmt = (
         select(models.Post)
-        .options(joinedload(models.Post.author).joinedload(models.Author.profile))
-        .options(subqueryload(models.Post.tags))
+        .options(*get_loader_options(fieldset=fieldset, detail=True))
         .where(models.Post.slug == slug)
         .order_by(desc(models.Post.created_at))
     )
@@ -161,16 +295,11 @@ async def get_single_post_by_slug(session: AsyncSession, slug: str) -> models.Po
 async def get_post_by_id_and_by_author_id(
     session: AsyncSession, post_id: int, author_id: int
 ) -> models.Post | None:
-    stmt = (
-        select(models.Post)
-        .options(subqueryload(models.Post.tags))
-        .where(
-            models.Post.author_id == author_id,
-            models.Post.id == post_id
-        )
-    )
-    result: Result = await session.execute(stmt)
-    post = result.scalar_one_or_none()
+    post = await get_loaders(session).post_by_id.load(post_id)
+
+    if post is None or post.author_id != author_id:
+        return None
+
     return post
 
 
@@ -190,11 +319,21 @@ async def partial_update_post(
     for field, value in update_data.items():
         setattr(post, field, value)
 
+    if "content" in update_data:
+        post.generate_summary()
+
     post.slug = f"{slugify(post_update.title).lower()}-{post.category.slug}-{post.id}"
     post.updated_at = datetime.now()
 
+    repository_outbox.add_event(
+        session=session,
+        aggregate_type="post",
+        aggregate_id=post.id,
+        event_type="post.updated",
+        payload={"fields": list(update_data)},
+    )
+
     await session.commit()
-    await session.refresh(post)
 
     return post
 
@@ -209,27 +348,157 @@ async def delete_post(session: AsyncSession, post_id: int, author_id: int) -> No
             status_code=status.HTTP_404_NOT_FOUND, detail="Post not found"
         )
 
+    tag_ids = [tag.id for tag in post.tags]
+
+    await repository_counters.shift_post_counts(
+        session=session,
+        delta=-1,
+        author_id=post.author_id,
+        category_id=post.category_id,
+        tag_ids=tag_ids,
+    )
+
+    repository_outbox.add_event(
+        session=session,
+        aggregate_type="post",
+        aggregate_id=post.id,
+        event_type="post.deleted",
+        payload={
+            "author_id": post.author_id,
+            "category_id": post.category_id,
+            "tag_ids": tag_ids,
+            "created_at": post.created_at.isoformat(),
+        },
+    )
+
+    await media_service.release_image(session=session, kind=media_service.POSTS_MEDIA, filename=post.image)
     await session.delete(post)
     await session.commit()
 
+    get_loaders(session).post_by_id.clear(post_id)
+
+
+async def delete_posts(
+    session: AsyncSession,
+    author_id: int | None = None,
+    category_id: int | None = None,
+    tag_id: int | None = None,
+    created_before: datetime | None = None,
+) -> int:
+    """
+    Deletes all the posts matching the filter by set-based statements, the posts are never loaded.
+    The posts are deleted in batches (their ids are locked first, then their tag associations and the posts
+    themselves are deleted with RETURNING), in one transaction. The counters, the events and the images
+    of the deleted posts are updated as by delete_post.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+        author_id (int | None): Delete the posts of the author
+        category_id (int | None): Delete the posts of the category
+        tag_id (int | None): Delete the posts with the tag
+        created_before (datetime | None): Delete the posts created before the time
+
+    Returns:
+        int: The number of the deleted posts
+    """
+    conditions = []
+
+    if author_id is not None:
+        conditions.append(models.Post.author_id == author_id)
+    if category_id is not None:
+        conditions.append(models.Post.category_id == category_id)
+    if tag_id is not None:
+        conditions.append(
+            exists().where(
+                post_tag_association_table.c.post_id == models.Post.id,
+                post_tag_association_table.c.tag_id == tag_id,
+            )
+        )
+    if created_before is not None:
+        conditions.append(models.Post.created_at < created_before)
 
-async def upload_post_image(file: UploadFile, post: models.Post, session: AsyncSession) -> None:
-    media_dir = "media"
-    os.makedirs(media_dir, exist_ok=True)
+    if not conditions:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="At least one filter of the posts is required"
+        )
 
-    posts_dir = os.path.join(media_dir, "posts")
-    os.makedirs(posts_dir, exist_ok=True)
+    author_ids, category_ids, tag_ids, images = set(), set(), set(), []
+    deleted = 0
 
-    image = Image.open(BytesIO(await file.read()))
+    while True:
+        result: Result = await session.execute(
+            select(models.Post.id)
+            .where(*conditions)
+            .order_by(models.Post.id)
+            .limit(BULK_DELETE_BATCH_SIZE)
+            .with_for_update()
+        )
+        post_ids = list(result.scalars().all())
 
-    file_extension = file.filename.split(".")[-1]
+        if not post_ids:
+            break
 
-    filename = f"{post.slug}_post_image.{file_extension}"
-    filepath = os.path.join(posts_dir, filename.lower())
+        result = await session.execute(
+            delete(post_tag_association_table)
+            .where(post_tag_association_table.c.post_id.in_(post_ids))
+            .returning(post_tag_association_table.c.post_id, post_tag_association_table.c.tag_id)
+        )
+        post_tag_ids = defaultdict(list)
+
+        for post_id, post_tag_id in result.all():
+            post_tag_ids[post_id].append(post_tag_id)
+            tag_ids.add(post_tag_id)
+
+        result = await session.execute(
+            delete(models.Post)
+            .where(models.Post.id.in_(post_ids))
+            .returning(
+                models.Post.id,
+                models.Post.author_id,
+                models.Post.category_id,
+                models.Post.image,
+                models.Post.created_at,
+            )
+            .execution_options(synchronize_session=False)
+        )
+        events = []
+
+        for post in result.all():
+            author_ids.add(post.author_id)
+            category_ids.add(post.category_id)
+            images.append(post.image)
+
+            events.append({
+                "aggregate_type": "post",
+                "aggregate_id": post.id,
+                "event_type": "post.deleted",
+                "payload": {
+                    "author_id": post.author_id,
+                    "category_id": post.category_id,
+                    "tag_ids": post_tag_ids[post.id],
+                    "created_at": post.created_at.isoformat(),
+                },
+            })
+            get_loaders(session).post_by_id.clear(post.id)
+
+        await repository_outbox.add_events(session=session, events=events)
+
+        deleted += len(events)
+
+    await repository_counters.recount_post_counts(
+        session=session, author_ids=author_ids, category_ids=category_ids, tag_ids=tag_ids
+    )
+    await media_service.release_images(session=session, kind=media_service.POSTS_MEDIA, filenames=images)
 
-    image.save(filepath)
+    await session.commit()
 
-    post.image = filename.lower()
+    return deleted
+
+
+async def upload_post_image(file: UploadFile, post: models.Post, session: AsyncSession) -> None:
+    post.image = await media_service.save_image(
+        session=session, file=file, kind=media_service.POSTS_MEDIA, previous=post.image
+    )
     post.updated_at = datetime.now()
 
     await session.commit()
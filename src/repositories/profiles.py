@@ -1,24 +1,20 @@
-import os
 import logging
 
 from datetime import datetime
 
-from io import BytesIO
-from PIL import Image
-
 from fastapi import UploadFile
 from fastapi.responses import JSONResponse
 
-from sqlalchemy import select
-from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import AsyncSession
 
 from src.core.database import models
 
 from src.repositories import authors as repository_authors
+from src.repositories.loaders import get_loaders
 
 from src.schemas.profiles import ProfileCreate, ProfilePartialUpdate
 
+from src.services import media as media_service
 from src.services.validation import validate_phone_number
 
 logger = logging.getLogger(__name__)
@@ -36,21 +32,19 @@ async def create_profile(
     await session.commit()
     await session.refresh(new_profile)
 
+    get_loaders(session).profile_by_author_id.prime(author.id, new_profile)
+
     return new_profile
 
 
 async def get_profile_by_author_id(author_id: int, session: AsyncSession) -> models.Profile | None:
-    stmt = select(models.Profile).where(models.Profile.author_id == author_id)
-    result: Result = await session.execute(stmt)
-    existing_profile = result.scalar_one_or_none()
-    return existing_profile
+    return await get_loaders(session).profile_by_author_id.load(author_id)
 
 
 async def partial_update_profile(
     updated_profile: ProfilePartialUpdate, author_id: int, session: AsyncSession,
 ) -> JSONResponse | models.Profile:
-    author = await repository_authors.get_author_by_id(author_id=author_id, session=session)
-    profile = await get_profile_by_author_id(author_id=author.id, session=session)
+    profile = await get_profile_by_author_id(author_id=author_id, session=session)
 
     try:
         validate_phone_number(phone_number=updated_profile.phone_number)
@@ -66,7 +60,6 @@ async def partial_update_profile(
     profile.updated_at = datetime.now()
 
     await session.commit()
-    await session.refresh(profile)
 
     return profile
 
@@ -74,22 +67,9 @@ async def partial_update_profile(
 async def upload_profile_image(
         file: UploadFile, profile: models.Profile, session: AsyncSession
 ) -> None:
-    media_dir = "media"
-    os.makedirs(media_dir, exist_ok=True)
-
-    uploads_dir = os.path.join(media_dir, "uploads")
-    os.makedirs(uploads_dir, exist_ok=True)
-
-    image = Image.open(BytesIO(await file.read()))
-
-    file_extension = file.filename.split(".")[-1]
-
-    filename = f"{profile.author.username}_profile_image.{file_extension}"
-    filepath = os.path.join(uploads_dir, filename.lower())
-
-    image.save(filepath)
-
-    profile.image = filename.lower()
+    profile.image = await media_service.save_image(
+        session=session, file=file, kind=media_service.PROFILES_MEDIA, previous=profile.image
+    )
     profile.updated_at = datetime.now()
 
     await session.commit()
@@ -97,8 +77,10 @@ async def upload_profile_image(
 
 
 async def delete_profile(author_id: int, session: AsyncSession) -> None:
-    author = await repository_authors.get_author_by_id(author_id=author_id, session=session)
-    profile = await get_profile_by_author_id(author_id=author.id, session=session)
+    profile = await get_profile_by_author_id(author_id=author_id, session=session)
 
+    await media_service.release_image(session=session, kind=media_service.PROFILES_MEDIA, filename=profile.image)
     await session.delete(profile)
     await session.commit()
+
+    get_loaders(session).profile_by_author_id.clear(author_id)
@@ -1,18 +1,30 @@
 from fastapi import HTTPException, status
 
-from sqlalchemy import select
+from sqlalchemy import select, update, delete, exists, insert, literal
 from sqlalchemy.engine import Result
 from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import lazyload
 
 from src.core.database import models
 from src.core.database.models.post_tag_association import post_tag_association_table
-from src.schemas.tags import TagUpdate
+from src.repositories import counters as repository_counters
+from src.repositories import outbox as repository_outbox
+from src.schemas.tags import TagUpdate, TagMerge
 
 
 async def create_tag(session: AsyncSession, tag_name: str) -> models.Tag:
     new_tag = models.Tag(name=tag_name)
 
     session.add(new_tag)
+    await session.flush()
+
+    repository_outbox.add_event(
+        session=session,
+        aggregate_type="tag",
+        aggregate_id=new_tag.id,
+        event_type="tag.created",
+        payload={"name": new_tag.name},
+    )
 
     await session.commit()
     await session.refresh(new_tag)
@@ -21,14 +33,22 @@ async def create_tag(session: AsyncSession, tag_name: str) -> models.Tag:
 
 
 async def get_tag_by_id(session: AsyncSession, tag_id: int) -> models.Tag | None:
-    stmt = select(models.Tag).where(models.Tag.id == tag_id)
+    stmt = (
+        select(models.Tag)
+        .options(lazyload(models.Tag.posts))
+        .where(models.Tag.id == tag_id)
+    )
     result: Result = await session.execute(stmt)
     tag = result.scalar_one_or_none()
     return tag
 
 
 async def get_tag_by_name(session: AsyncSession, tag_name: str) -> models.Tag | None:
-    stmt = select(models.Tag).where(models.Tag.name == tag_name)
+    stmt = (
+        select(models.Tag)
+        .options(lazyload(models.Tag.posts))
+        .where(models.Tag.name == tag_name)
+    )
     result: Result = await session.execute(stmt)
     tag = result.scalar_one_or_none()
     return tag
@@ -42,31 +62,132 @@ async def update_tag(
 
     db_tag.name = tag_name
 
+    repository_outbox.add_event(
+        session=session,
+        aggregate_type="tag",
+        aggregate_id=db_tag.id,
+        event_type="tag.updated",
+        payload={"name": tag_name},
+    )
+
     await session.commit()
     await session.refresh(db_tag)
 
     return db_tag
 
 
+async def tag_has_posts(session: AsyncSession, tag_id: int) -> bool:
+    stmt = select(exists().where(post_tag_association_table.c.tag_id == tag_id))
+    result: Result = await session.execute(stmt)
+    return result.scalar()
+
+
 async def delete_tag(session: AsyncSession, tag_id: int) -> None:
-    db_tag = await get_tag_by_id(tag_id=tag_id, session=session)
+    if await tag_has_posts(session=session, tag_id=tag_id):
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail="Tag cannot be deleted while there are any associations with posts!"
+        )
 
-    if not db_tag:
+    result: Result = await session.execute(delete(models.Tag).where(models.Tag.id == tag_id))
+
+    if not result.rowcount:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found"
         )
 
-    association_record = await session.execute(
-        select(post_tag_association_table)
-        .filter(post_tag_association_table.c.tag_id == db_tag.id)
+    repository_outbox.add_event(
+        session=session, aggregate_type="tag", aggregate_id=tag_id, event_type="tag.deleted"
     )
-    association_record = association_record.scalars().all()
 
-    if not association_record:
-        await session.delete(db_tag)
-        await session.commit()
+    await session.commit()
+
+
+async def merge_tags(session: AsyncSession, tag_merge: TagMerge) -> dict:
+    """
+    Merges the tags into the tag with the given name: their posts are tagged with it and they are deleted.
+    Without a tag of that name the first of the tags is renamed, so a single tag is just renamed.
+    The associations are moved by set-based statements, the posts are never loaded.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+        tag_merge (TagMerge): The ids of the merged tags and the name of the resulting tag
+
+    Returns:
+        dict: The resulting tag, the number of the merged tags and of the retagged posts
+    """
+    tag_name = models.Tag.add_hashtag(tag_merge.name)
+    tag_ids = list(dict.fromkeys(tag_merge.tag_ids))
+
+    target = await get_tag_by_name(session=session, tag_name=tag_name)
+
+    if target:
+        target_id = target.id
     else:
-        raise HTTPException(
-            status_code=status.HTTP_403_FORBIDDEN,
-            detail="Tag cannot be deleted while there are any associations with posts!"
+        result: Result = await session.execute(
+            update(models.Tag).where(models.Tag.id == tag_ids[0]).values(name=tag_name).returning(models.Tag.id)
+        )
+        target_id = result.scalar_one_or_none()
+
+        if target_id is None:
+            raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Tag not found")
+
+        repository_outbox.add_event(
+            session=session,
+            aggregate_type="tag",
+            aggregate_id=target_id,
+            event_type="tag.updated",
+            payload={"name": tag_name},
+        )
+
+    source_ids = [tag_id for tag_id in tag_ids if tag_id != target_id]
+    post_ids = set()
+
+    if source_ids:
+        association = post_tag_association_table
+        target_association = post_tag_association_table.alias()
+
+        # The posts of the merged tags which do not have the resulting tag yet get it
+        await session.execute(
+            insert(association).from_select(
+                ["post_id", "tag_id"],
+                select(association.c.post_id, literal(target_id))
+                .where(
+                    association.c.tag_id.in_(source_ids),
+                    ~exists().where(
+                        target_association.c.post_id == association.c.post_id,
+                        target_association.c.tag_id == target_id,
+                    ),
+                )
+                .distinct(),
+            )
+        )
+
+        result = await session.execute(
+            delete(association).where(association.c.tag_id.in_(source_ids)).returning(association.c.post_id)
+        )
+        post_ids = set(result.scalars().all())
+
+        result = await session.execute(
+            delete(models.Tag).where(models.Tag.id.in_(source_ids)).returning(models.Tag.id)
+        )
+        source_ids = list(result.scalars().all())
+
+        await repository_counters.recount_post_counts(session=session, tag_ids=[target_id])
+
+        for source_id in source_ids:
+            repository_outbox.add_event(
+                session=session, aggregate_type="tag", aggregate_id=source_id, event_type="tag.deleted"
+            )
+
+        repository_outbox.add_event(
+            session=session,
+            aggregate_type="tag",
+            aggregate_id=target_id,
+            event_type="tag.merged",
+            payload={"source_ids": source_ids, "post_ids": sorted(post_ids)},
         )
+
+    await session.commit()
+
+    return {"id": target_id, "name": tag_name, "merged_tags": len(source_ids), "posts": len(post_ids)}
@@ -1,13 +1,13 @@
-from fastapi import APIRouter
-
 from src.routes.categories import router as categories_router
 from src.routes.posts import router as posts_router
+from src.routes.profiler import router as profiler_router
 from src.routes.tags import router as tags_router
 
-
-router = APIRouter()
-
-
-router.include_router(router=categories_router, prefix="/categories")
-router.include_router(router=posts_router, prefix="/posts")
-router.include_router(router=tags_router, prefix="/tags")
+# Included by the app one by one: every include_router rebuilds the routes (and their response models),
+# a router of the routers would build them once more at the startup
+routers_v1 = [
+    (categories_router, "/categories"),
+    (posts_router, "/posts"),
+    (tags_router, "/tags"),
+    (profiler_router, "/profiler"),
+]
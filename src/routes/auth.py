@@ -3,25 +3,32 @@ import logging
 from fastapi import APIRouter, status, HTTPException, Depends, Response, Request
 from fastapi.security import OAuth2PasswordRequestForm
 
-from src.core.conf.caching import get_redis
+from src.core.conf.caching import cache
 from src.core.database import models
 from src.core.database.db_settings.db_helper import db_dependency
 
-from src.schemas.authors import AuthorResponse, AuthorCreate, TokenModel
+from src.schemas.authors import AuthorResponse, AuthorCreate, AuthorClaims, TokenModel, SessionResponse
 from src.repositories import authors as repository_authors
 
 from src.services.auth import auth_service
+from src.services.rate_limit import RateLimiter, LoginRateLimiter
+from src.services.revocation import revocation_list
 from src.services.security import verify_password
+from src.services.token_store import refresh_token_store
 
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter(prefix="/auth", tags=["Auth"])
 
+register_rate_limiter = RateLimiter("register")
+login_rate_limiter = LoginRateLimiter("login")
+
 
 @router.post("/register",
              response_model=AuthorResponse,
-             status_code=status.HTTP_201_CREATED)
+             status_code=status.HTTP_201_CREATED,
+             dependencies=[Depends(register_rate_limiter)])
 async def create_author(author: AuthorCreate, session: db_dependency) -> models.Author:
     """
     The create_user function creates a new user in the database.
@@ -46,8 +53,9 @@ async def create_author(author: AuthorCreate, session: db_dependency) -> models.
     return new_author
 
 
-@router.post("/login", response_model=TokenModel)
+@router.post("/login", response_model=TokenModel, dependencies=[Depends(login_rate_limiter)])
 async def login_for_tokens(
+    request: Request,
     response: Response,
     session: db_dependency,
     form_data: OAuth2PasswordRequestForm = Depends(),
@@ -56,8 +64,10 @@ async def login_for_tokens(
     The login_for_tokens function is used to receive the refresh_token and the access token.
         The function takes in the user credentials and returns an access_token,
         a refresh_token, and the type of token.
+        Every login opens a new session, so the author can be logged in on several devices.
 
         Arguments:
+            request: Request: Get the device (user agent) of the session
             response: Response: Sets tokens in cookies
             form_data(OAuth2PasswordRequestForm): enter the user credentials
             session (db_dependency): SQLAlchemy session object for accessing the database
@@ -65,8 +75,7 @@ async def login_for_tokens(
     Returns:
         dict: JSON access_token - refresh_token - token_type - author object
     """
-    with get_redis() as redis_cl:
-        redis_cl.delete(f"author:{form_data.username}")
+    cache.delete(f"author:{form_data.username}")
 
     author = await repository_authors.get_author_by_email(email=form_data.username, session=session)
 
@@ -77,15 +86,17 @@ async def login_for_tokens(
             status_code=status.HTTP_403_FORBIDDEN, detail="Invalid email or password"
         )
 
+    sid, jti = refresh_token_store.open_session(
+        author_id=author.id, device=request.headers.get("user-agent")
+    )
+
     access_token = await auth_service.create_access_token(
-        data={"author_id": author.id, "sub": author.email}
+        data={"author_id": author.id, "sub": author.email, "role": author.role}
     )
     refresh_token_ = await auth_service.create_refresh_token(
-        data={"author_id": author.id, "sub": author.email}
+        data={"author_id": author.id, "sub": author.email, "sid": sid, "jti": jti}
     )
 
-    await repository_authors.update_token(author=author, refresh_token=refresh_token_, session=session)
-
     response.set_cookie(
         key="refresh_token", value=refresh_token_, httponly=True, secure=True, samesite="none"
     )
@@ -99,8 +110,8 @@ async def refresh_token(request: Request, response: Response, session: db_depend
     The refresh_token function is used to refresh the access token.
         The function takes in a refresh token from cookies and returns an access_token,
         a new refresh_token, and the type of token.
-        If the user's current refresh_token does not match what was
-            passed into this function then it will return an error.
+        The refresh token is rotated: if an already rotated token is passed into this function,
+            the whole session is revoked and it will return an error.
 
         Arguments:
             request: Request: Get the token from the Cookie
@@ -111,30 +122,100 @@ async def refresh_token(request: Request, response: Response, session: db_depend
         dict: JSON access_token - refresh_token - token_type - author object
     """
     token = request.cookies.get("refresh_token")
-    email = await auth_service.decode_refresh_token(refresh_token=token)
+    payload = await auth_service.decode_refresh_token(refresh_token=token)
+    email = payload["sub"]
+
+    new_jti = refresh_token_store.rotate(
+        author_id=payload["author_id"], sid=payload["sid"], jti=payload["jti"]
+    )
 
     author = await repository_authors.get_author_by_email(email=email, session=session)
 
-    if author.refresh_token != token:
-        await repository_authors.update_token(author=author, refresh_token=None, session=session)
+    if author is None:
+        refresh_token_store.revoke_session(author_id=payload["author_id"], sid=payload["sid"])
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token"
         )
 
     access_token = await auth_service.create_access_token(
-        data={"author_id": author.id, "sub": email}
+        data={"author_id": author.id, "sub": email, "role": author.role}
     )
     refresh_token_ = await auth_service.create_refresh_token(
-        data={"author_id": author.id, "sub": email}
+        data={"author_id": author.id, "sub": email, "sid": payload["sid"], "jti": new_jti}
     )
 
-    await repository_authors.update_token(author=author, refresh_token=refresh_token_, session=session)
-
     response.set_cookie(
         key="refresh_token", value=refresh_token_, httponly=True, secure=True, samesite="none"
     )
 
-    with get_redis() as redis_cl:
-        redis_cl.delete(f"author:{email}")
+    cache.delete(f"author:{email}")
 
     return TokenModel(access_token=access_token, token_type="bearer", author=author)
+
+
+@router.post("/logout", status_code=status.HTTP_204_NO_CONTENT)
+async def logout(
+    request: Request,
+    response: Response,
+    access_token: str | None = Depends(auth_service.optional_oauth2_scheme),
+) -> None:
+    """
+    The logout function revokes the session of the refresh token from cookies
+        and deletes the cookie. The other sessions of the author stay active.
+        The access token passed in the Authorization header is revoked as well.
+
+        Arguments:
+            request: Request: Get the token from the Cookie
+            response: Response: Deletes the token from cookies
+            access_token (str | None): The access token from the Authorization header
+
+    Returns:
+        None
+    """
+    token = request.cookies.get("refresh_token")
+    payload = await auth_service.decode_refresh_token(refresh_token=token)
+
+    refresh_token_store.revoke_session(author_id=payload["author_id"], sid=payload["sid"])
+
+    if access_token:
+        auth_service.revoke_access_token(token=access_token)
+
+    response.delete_cookie(key="refresh_token", httponly=True, secure=True, samesite="none")
+
+
+@router.get("/sessions", response_model=list[SessionResponse])
+async def get_sessions(
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
+) -> list[dict]:
+    """
+    The get_sessions function returns the active sessions (devices) of the current author.
+
+        Arguments:
+            current_author (AuthorClaims): the current author
+
+    Returns:
+        list: The active sessions
+    """
+    return refresh_token_store.get_sessions(author_id=current_author.id)
+
+
+@router.delete("/sessions", status_code=status.HTTP_204_NO_CONTENT)
+async def revoke_all_sessions(
+    response: Response,
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
+) -> None:
+    """
+    The revoke_all_sessions function logs the current author out of all the devices:
+        the sessions are revoked together with all the issued access tokens.
+
+        Arguments:
+            response: Response: Deletes the token from cookies
+            current_author (AuthorClaims): the current author
+
+    Returns:
+        None
+    """
+    refresh_token_store.revoke_all_sessions(author_id=current_author.id)
+    revocation_list.revoke_author(author_id=current_author.id)
+
+    response.delete_cookie(key="refresh_token", httponly=True, secure=True, samesite="none")
@@ -1,40 +1,48 @@
 import logging
 import pickle
 
-from fastapi import APIRouter, status, HTTPException, Depends, UploadFile
+from fastapi import APIRouter, status, HTTPException, Depends, UploadFile, Query
 from fastapi.responses import JSONResponse
-from fastapi_pagination import Page, paginate
+from fastapi_pagination import Page, Params, paginate
 
-from src.core.conf.caching import get_redis
+from src.core.conf.caching import cache
 from src.core.database.db_settings.db_helper import db_dependency
 from src.core.database.models import Author, Profile, Post
 from src.core.database.models.enums import Role
 
-from src.schemas.posts import PostTagsResponse
+from src.schemas.posts import PostTagsResponse, PostFieldset, TimelineResponse
 from src.schemas.profiles import ProfileResponse, ProfileCreate, ProfilePartialUpdate
 from src.schemas.authors import (
-    AuthorResponse, AuthorMessageResponse, PasswordChangeModel, AuthorChangeRole,
+    AuthorResponse, AuthorMessageResponse, AuthorClaims, PasswordChangeModel, AuthorChangeRole,
+    AuthorBulkChangeRole, AuthorBulkChangeRoleResponse,
 )
 
 from src.services.auth import auth_service
+from src.services import cache_warmer
 from src.services.cache_in_redis import delete_cache_in_redis
+from src.services.fieldsets import get_post_fieldset, render_posts_page
+from src.services.revocation import revocation_list
 from src.services.roles import RoleAccess
 from src.services.security import verify_password, get_password_hash
-from src.services.validation import validate_password, validate_image
+from src.services.timeline import timeline_service, CURSOR_PATTERN
+from src.services.token_store import refresh_token_store
+from src.services.uploads import UploadLimitRoute, validate_profile_image
+from src.services.validation import validate_password
 
 from src.repositories import authors as repository_authors
+from src.repositories import follows as repository_follows
 from src.repositories import profiles as repository_profiles
 from src.repositories import posts as repository_posts
 
 logger = logging.getLogger(__name__)
 
-router = APIRouter(prefix="/authors", tags=["Authors"])
+router = APIRouter(prefix="/authors", tags=["Authors"], route_class=UploadLimitRoute)
 
 allowed_operation_admin = RoleAccess([Role["admin"]])
 
 
 @router.get("/me", response_model=AuthorResponse)
-async def read_authors_me(current_author: Author = Depends(auth_service.get_current_author)) -> Author:
+async def read_authors_me(current_author: Author = Depends(auth_service.get_current_author_record)) -> Author:
     """
     The read_authors_me function is a GET request that returns the current author's information.
         It requires authentication, and it uses the auth_service to get the current author.
@@ -51,66 +59,153 @@ async def read_authors_me(current_author: Author = Depends(auth_service.get_curr
 @router.get("/me/my_posts", response_model=Page[PostTagsResponse])
 async def get_all_posts_for_current_author(
     session: db_dependency,
-    current_author: Author = Depends(auth_service.get_current_author),
+    params: Params = Depends(),
+    fieldset: PostFieldset = Depends(get_post_fieldset),
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
 ) -> list[Post]:
     """
     The function returns a list of all posts for the current author in the database.
 
         Args:
             session: db_dependency: Access the database
-            current_author (Author): Get the current author data to obtain all posts
+            params: Params: The page and the size of the page
+            fieldset: PostFieldset: The fields and embeds requested by ?fields= and ?include=
+            current_author (AuthorClaims): Get the current author data to obtain all posts
 
     Returns:
         A list of posts
     """
-    redis_client = get_redis()
+    key = f"current_author_id-{current_author.id}_posts{fieldset.cache_key}"
 
-    key = f"current_author_id-{current_author.id}_posts"
-
-    cached_current_author_posts = None
-
-    if redis_client:
-        cached_current_author_posts = redis_client.get(key)
+    cached_current_author_posts = cache.get(key)
 
     if not cached_current_author_posts:
 
         posts = await repository_posts.get_all_posts_by_author_id(
-            author_id=current_author.id, session=session
+            author_id=current_author.id, session=session, fieldset=fieldset
         )
 
         if len(posts) == 0:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Posts not found")
 
-        if redis_client:
-            redis_client.set(key, pickle.dumps(posts))
-            redis_client.expire(key, 1800)
+        cache.set(key, pickle.dumps(posts), ttl=1800)
 
     else:
         posts = pickle.loads(cached_current_author_posts)
 
-    return paginate(posts)
+    if not fieldset.is_default:
+        return render_posts_page(posts=posts, fieldset=fieldset, params=params)
+
+    return paginate(posts, params)
+
+
+@router.get("/me/timeline", response_model=TimelineResponse)
+async def get_timeline_for_current_author(
+    session: db_dependency,
+    cursor: str | None = Query(default=None, pattern=CURSOR_PATTERN),
+    limit: int = Query(default=20, ge=1, le=100),
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
+) -> dict:
+    """
+    The function returns a page of posts from the authors followed by the current author, newest first.
+
+        Args:
+            session: db_dependency: Access the database
+            cursor: str | None: The next_cursor value from the previous page
+            limit: int: The page size
+            current_author (AuthorClaims): the current author
+
+    Returns:
+        A page of posts with the cursor of the next page
+    """
+    post_ids, next_cursor = await timeline_service.get_timeline(
+        session=session, follower_id=current_author.id, cursor=cursor, limit=limit
+    )
+
+    posts = await repository_posts.get_posts_by_ids(session=session, post_ids=post_ids)
+
+    return {"items": posts, "next_cursor": next_cursor}
+
+
+@router.post("/{author_id}/follow",
+             response_model=AuthorMessageResponse,
+             status_code=status.HTTP_201_CREATED)
+async def follow_author(
+    author_id: int,
+    session: db_dependency,
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
+) -> dict[str, str]:
+    """
+    The follow_author function subscribes the current author to the posts of the specific author.
+
+        Args:
+            author_id: int: Get the id of the author to be followed
+            session: db_dependency: Access the database
+            current_author (AuthorClaims): the current author
+
+    Returns:
+        A message about successful following
+    """
+    author = await repository_authors.get_author_by_id(author_id=author_id, session=session)
+
+    if not author:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Author not found")
+
+    await repository_follows.follow_author(
+        session=session, follower_id=current_author.id, author_id=author.id
+    )
+
+    await timeline_service.follow(session=session, follower_id=current_author.id, author_id=author.id)
+
+    return {"message": "You follow the author now"}
+
+
+@router.delete("/{author_id}/follow", status_code=status.HTTP_204_NO_CONTENT)
+async def unfollow_author(
+    author_id: int,
+    session: db_dependency,
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
+) -> None:
+    """
+    The unfollow_author function unsubscribes the current author from the posts of the specific author.
+
+        Args:
+            author_id: int: Get the id of the author to be unfollowed
+            session: db_dependency: Access the database
+            current_author (AuthorClaims): the current author
+
+    Returns:
+        None
+    """
+    await repository_follows.unfollow_author(
+        session=session, follower_id=current_author.id, author_id=author_id
+    )
+
+    await timeline_service.unfollow(session=session, follower_id=current_author.id, author_id=author_id)
 
 
 @router.get("/{author_id}/posts", response_model=Page[PostTagsResponse])
-async def get_all_posts_for_specific_author(author_id: int, session: db_dependency) -> list[Post]:
+async def get_all_posts_for_specific_author(
+    author_id: int,
+    session: db_dependency,
+    params: Params = Depends(),
+    fieldset: PostFieldset = Depends(get_post_fieldset),
+) -> list[Post]:
     """
     The function returns a list of all posts for the specific author in the database.
 
         Args:
             author_id: int: Get the id of the author to obtain all posts
             session: db_dependency: Access the database
+            params: Params: The page and the size of the page
+            fieldset: PostFieldset: The fields and embeds requested by ?fields= and ?include=
 
     Returns:
         A list of posts
     """
-    redis_client = get_redis()
+    key = f"{cache_warmer.author_posts_key(author_id=author_id)}{fieldset.cache_key}"
 
-    key = f"author_id-{author_id}_posts"
-
-    cached_author_posts = None
-
-    if redis_client:
-        cached_author_posts = redis_client.get(key)
+    cached_author_posts = cache.get(key)
 
     if not cached_author_posts:
         author = await repository_authors.get_author_by_id(author_id=author_id, session=session)
@@ -118,26 +213,31 @@ async def get_all_posts_for_specific_author(author_id: int, session: db_dependen
         if not author:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Author not found")
 
-        posts = await repository_posts.get_all_posts_by_author_id(author_id=author.id, session=session)
+        posts = await repository_posts.get_all_posts_by_author_id(
+            author_id=author.id, session=session, fieldset=fieldset
+        )
 
         if len(posts) == 0:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Posts not found")
 
-        if redis_client:
-            redis_client.set(key, pickle.dumps(posts))
-            redis_client.expire(key, 1800)
+        cache.set(key, pickle.dumps(posts), ttl=1800)
 
     else:
         posts = pickle.loads(cached_author_posts)
 
-    return paginate(posts)
+    cache_warmer.record_hit(kind=cache_warmer.AUTHOR_HITS, member=author_id)
+
+    if not fieldset.is_default:
+        return render_posts_page(posts=posts, fieldset=fieldset, params=params)
+
+    return paginate(posts, params)
 
 
 @router.post("/me/change_password", response_model=AuthorMessageResponse)
 async def change_password(
     body: PasswordChangeModel,
     session: db_dependency,
-    current_author: Author = Depends(auth_service.get_current_author),
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
 ) -> JSONResponse | dict[str, str]:
     """
     The change_password function takes a body as input.
@@ -149,7 +249,7 @@ async def change_password(
         Args:
             body: PasswordChangeModel: Get the password from the request body
             session: db_dependency: Get the database session
-            current_author (Author): the current author
+            current_author (AuthorClaims): the current author
 
     Returns:
         A message to the author
@@ -183,6 +283,9 @@ async def change_password(
         email=author.email, password=body.new_password, session=session
     )
 
+    refresh_token_store.revoke_all_sessions(author_id=author.id)
+    revocation_list.revoke_author(author_id=author.id)
+
     await delete_cache_in_redis()
 
     return {"message": "Your password changed successfully"}
@@ -192,7 +295,7 @@ async def change_password(
 async def create_author_profile(
     author_profile: ProfileCreate,
     session: db_dependency,
-    current_author: Author = Depends(auth_service.get_current_author),
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
 ) -> Profile:
     """
     The create_author_profile function creates a new profile for current author in the database.
@@ -201,7 +304,7 @@ async def create_author_profile(
         Args:
             author_profile: ProfileCreate: Receive the data of the author profile to be created
             session: db_dependency: Access the database
-            current_author (Author): the current author
+            current_author (AuthorClaims): the current author
 
     Returns:
         The created author profile
@@ -228,7 +331,7 @@ async def create_author_profile(
 async def partial_update_author_profile(
     author_profile: ProfilePartialUpdate,
     session: db_dependency,
-    current_author: Author = Depends(auth_service.get_current_author),
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
 ) -> Profile:
     """
     The partial_update_author_profile function partial updates a profile data for current author in the database.
@@ -237,7 +340,7 @@ async def partial_update_author_profile(
         Args:
             author_profile: ProfilePartialUpdate: Receive the data of the author profile to be updated
             session: db_dependency: Access the database
-            current_author (Author): the current author
+            current_author (AuthorClaims): the current author
 
     Returns:
         The updated author profile
@@ -262,14 +365,14 @@ async def partial_update_author_profile(
 
 @router.delete("/me/profile", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_author_profile(
-    session: db_dependency, current_author: Author = Depends(auth_service.get_current_author)
+    session: db_dependency, current_author: AuthorClaims = Depends(auth_service.get_current_author)
 ) -> None:
     """
     The delete_author_profile function removes a profile data for current author in the database.
 
         Args:
             session: db_dependency: Access the database
-            current_author (Author): the current author
+            current_author (AuthorClaims): the current author
 
     Returns:
         None
@@ -291,8 +394,8 @@ async def delete_author_profile(
 @router.post("/me/profile/upload-image", response_model=AuthorMessageResponse)
 async def upload_profile_image(
     session: db_dependency,
-    file: UploadFile = Depends(validate_image),
-    current_author: Author = Depends(auth_service.get_current_author),
+    file: UploadFile = Depends(validate_profile_image),
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
 ) -> dict[str, str]:
     """
     The upload_profile_image function uploads profile image.
@@ -300,7 +403,7 @@ async def upload_profile_image(
         Args:
             file: UploadFile: upload image
             session: db_dependency: Access the database
-            current_author (Author): the current author
+            current_author (AuthorClaims): the current author
 
     Returns:
         A message about successful uploading profile image
@@ -336,8 +439,37 @@ async def change_role(author_role: AuthorChangeRole, session: db_dependency) ->
 
     Returns:
         Author: object after the change operation
+        The issued access tokens of the author are revoked, so the old role is not trusted anymore.
     """
+    author = await repository_authors.change_author_role(author_role=author_role, session=session)
+
+    revocation_list.revoke_author(author_id=author.id)
+
+    await delete_cache_in_redis()
+
+    return author
+
+
+@router.put("/change_role/bulk", response_model=AuthorBulkChangeRoleResponse,
+            dependencies=[Depends(allowed_operation_admin)])
+async def change_roles(author_roles: AuthorBulkChangeRole, session: db_dependency) -> dict:
+    """
+    Change the role of many authors at once
+
+        Arguments:
+            author_roles (AuthorBulkChangeRole): the ids of the authors and their new role
+            (role: (permitted: "admin", "moderator", "user"))
+            session (db_dependency): SQLAlchemy session object for accessing the database
+
+    Returns:
+        dict: the ids of the changed authors (the authors with the role already and the unknown ids are skipped)
+        The issued access tokens of the changed authors are revoked.
+    """
+    author_ids = await repository_authors.change_authors_role(author_roles=author_roles, session=session)
+
+    for author_id in author_ids:
+        revocation_list.revoke_author(author_id=author_id)
 
     await delete_cache_in_redis()
 
-    return await repository_authors.change_author_role(author_role=author_role, session=session)
+    return {"ids": author_ids, "role": author_roles.role}
@@ -1,9 +1,9 @@
 import pickle
 
 from fastapi import APIRouter, status, HTTPException, Depends
-from fastapi_pagination import Page, paginate
+from fastapi_pagination import Page, Params, paginate
 
-from src.core.conf.caching import get_redis
+from src.core.conf.caching import cache
 from src.core.database import models
 from src.core.database.db_settings.db_helper import db_dependency
 from src.core.database.models.enums import Role
@@ -11,15 +11,18 @@ from src.core.database.models.enums import Role
 from src.repositories import categories as repository_categories
 from src.repositories import posts as repository_posts
 
-from src.schemas.categories import CategoryResponse, CategoryChange
-from src.schemas.posts import PostTagsResponse
+from src.schemas.categories import CategoryResponse, CategoryChange, CategoryPostsMoveResponse
+from src.schemas.posts import PostTagsResponse, PostFieldset
 
+from src.services import cache_warmer
 from src.services.cache_in_redis import delete_cache_in_redis
+from src.services.fieldsets import get_post_fieldset, render_posts_page
 from src.services.roles import RoleAccess
 
 router = APIRouter(tags=["Categories"])
 
 allowed_operation_admin_moderator = RoleAccess([Role["admin"], Role["moderator"]])
+allowed_operation_admin = RoleAccess([Role["admin"]])
 
 
 @router.post("/",
@@ -65,14 +68,9 @@ async def get_all_categories(session: db_dependency) -> list[models.Category]:
         A list of categories
     """
 
-    redis_client = get_redis()
+    key = cache_warmer.categories_key()
 
-    key = f"categories"
-
-    cached_categories = None
-
-    if redis_client:
-        cached_categories = redis_client.get(key)
+    cached_categories = cache.get(key)
 
     if not cached_categories:
 
@@ -81,9 +79,7 @@ async def get_all_categories(session: db_dependency) -> list[models.Category]:
         if len(categories) == 0:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Categories not found")
 
-        if redis_client:
-            redis_client.set(key, pickle.dumps(categories))
-            redis_client.expire(key, 1800)
+        cache.set(key, pickle.dumps(categories), ttl=1800)
 
     else:
         categories = pickle.loads(cached_categories)
@@ -93,7 +89,11 @@ async def get_all_categories(session: db_dependency) -> list[models.Category]:
 
 @router.get("/{category_id}/{category_slug}/posts", response_model=Page[PostTagsResponse])
 async def get_single_category_with_posts(
-    category_id: int, category_slug: str, session: db_dependency
+    category_id: int,
+    category_slug: str,
+    session: db_dependency,
+    params: Params = Depends(),
+    fieldset: PostFieldset = Depends(get_post_fieldset),
 ) -> list[models.Post]:
     """
     The function returns list of posts fot the single category in the database.
@@ -102,18 +102,18 @@ async def get_single_category_with_posts(
             category_id: int: Get the id of the category to be obtained
             category_slug: str: Get the slug of the category to be obtained
             session: db_dependency: Access the database
+            params: Params: The page and the size of the page
+            fieldset: PostFieldset: The fields and embeds requested by ?fields= and ?include=
 
     Returns:
         The category object
     """
-    redis_client = get_redis()
-
-    key = f"category_id-{category_id}-category_slug-{category_slug}_posts"
-
-    cached_category_posts = None
+    key = (
+        f"{cache_warmer.category_posts_key(category_id=category_id, category_slug=category_slug)}"
+        f"{fieldset.cache_key}"
+    )
 
-    if redis_client:
-        cached_category_posts = redis_client.get(key)
+    cached_category_posts = cache.get(key)
 
     if not cached_category_posts:
 
@@ -123,19 +123,22 @@ async def get_single_category_with_posts(
         if not category:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Category not found")
 
-        posts = await repository_posts.get_all_posts_by_category_id(category_id=category.id, session=session)
+        posts = await repository_posts.get_all_posts_by_category_id(
+            category_id=category.id, session=session, fieldset=fieldset
+        )
 
         if len(posts) == 0:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Posts not found")
 
-        if redis_client:
-            redis_client.set(key, pickle.dumps(posts))
-            redis_client.expire(key, 1800)
+        cache.set(key, pickle.dumps(posts), ttl=1800)
 
     else:
         posts = pickle.loads(cached_category_posts)
 
-    return paginate(posts)
+    if not fieldset.is_default:
+        return render_posts_page(posts=posts, fieldset=fieldset, params=params)
+
+    return paginate(posts, params)
 
 
 @router.put("/{category_id}/update",
@@ -172,6 +175,31 @@ async def update_category(
     return updated_category
 
 
+@router.post("/{category_id}/move_posts",
+             response_model=CategoryPostsMoveResponse,
+             dependencies=[Depends(allowed_operation_admin)])
+async def move_category_posts(category_id: int, target_category_id: int, session: db_dependency) -> dict:
+    """
+    The move_category_posts function moves all the posts of the category to another category,
+    e.g. before the category is deleted.
+
+        Args:
+            category_id: int: Get the id of the category the posts are moved from
+            target_category_id: int: Get the id of the category the posts are moved to
+            session: db_dependency: Access the database
+
+    Returns:
+        The number of the moved posts
+    """
+    moved = await repository_categories.move_category_posts(
+        session=session, category_id=category_id, target_category_id=target_category_id
+    )
+
+    await delete_cache_in_redis()
+
+    return {"moved": moved}
+
+
 @router.delete("/{category_id}/delete",
                status_code=status.HTTP_204_NO_CONTENT,
                dependencies=[Depends(allowed_operation_admin_moderator)])
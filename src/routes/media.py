@@ -0,0 +1,24 @@
+from fastapi import APIRouter, Request
+from fastapi.responses import Response
+
+from src.services import media as media_service
+
+router = APIRouter(tags=["Media"])
+
+
+@router.api_route("/{kind}/{filename}", methods=["GET", "HEAD"], response_class=Response)
+async def get_media(request: Request, kind: str, filename: str) -> Response:
+    """
+    The function serves the uploaded images of the posts and the profiles.
+    The content-hashed files are cached by the clients as immutable, the partial requests
+    (Range) and the conditional requests (If-None-Match) are supported.
+
+        Args:
+            request: Request: The headers of the request
+            kind: str: The media directory (posts or uploads)
+            filename: str: The name of the file
+
+    Returns:
+        The file, a part of it or 304 Not Modified
+    """
+    return await media_service.serve_media(request=request, kind=kind, filename=filename)
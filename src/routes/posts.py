@@ -1,28 +1,42 @@
 import pickle
+from datetime import datetime
 
-from fastapi import APIRouter, status, Depends, HTTPException, UploadFile
-from fastapi_pagination import Page, paginate
+from fastapi import APIRouter, status, Depends, HTTPException, UploadFile, Request
+from fastapi_pagination import Page, Params, paginate, create_page
 
-from src.core.conf.caching import get_redis
+from src.core.conf.caching import cache
 from src.core.database import models
 from src.core.database.db_settings.db_helper import db_dependency
+from src.core.database.models.enums import Role
 
 from src.schemas.posts import (
     PostResponse,
     PostCreate,
     PostPartialUpdate,
     PostMessageResponse,
+    PostBulkDeleteResponse,
     PostTagsResponse,
+    PostDetailResponse,
+    PostFieldset,
 )
+from src.schemas.authors import AuthorClaims
 
 from src.repositories import categories as repository_categories
 from src.repositories import posts as repository_posts
 
 from src.services.auth import auth_service
+from src.services import cache_warmer
+from src.services import related_posts as related_posts_service
+from src.services import trending as trending_service
+from src.services import views as views_service
 from src.services.cache_in_redis import delete_cache_in_redis
-from src.services.validation import validate_image
+from src.services.fieldsets import get_post_fieldset, render_post, render_posts_page
+from src.services.roles import RoleAccess
+from src.services.uploads import UploadLimitRoute, validate_post_image
 
-router = APIRouter(tags=["Posts"])
+router = APIRouter(tags=["Posts"], route_class=UploadLimitRoute)
+
+allowed_operation_admin = RoleAccess([Role["admin"]])
 
 
 @router.post("/", response_model=PostResponse, status_code=status.HTTP_201_CREATED)
@@ -30,7 +44,7 @@ async def create_post(
     post_data: PostCreate,
     category_id: int,
     session: db_dependency,
-    current_author: models.Author = Depends(auth_service.get_current_author),
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
 ) -> models.Post:
     """
     The create_post function creates a new post in the database.
@@ -39,7 +53,7 @@ async def create_post(
             post_data: schemas.PostCreate: Validate the request body
             category_id: int: get id of the category to create new post for its
             session: db_dependency: Pass the database session to the repository layer
-            current_author (Author): the current author
+            current_author (AuthorClaims): the current author
 
     Returns:
         A post object
@@ -64,76 +78,129 @@ async def create_post(
 
 
 @router.get("/", response_model=Page[PostTagsResponse])
-async def get_all_posts(session: db_dependency) -> list[models.Post]:
+async def get_all_posts(
+    session: db_dependency,
+    params: Params = Depends(),
+    fieldset: PostFieldset = Depends(get_post_fieldset),
+) -> list[models.Post]:
     """
     The function returns a list of all posts in the database.
 
         Args:
             session: db_dependency: Access the database
+            params: Params: The page and the size of the page
+            fieldset: PostFieldset: The fields and embeds requested by ?fields= and ?include=
 
     Returns:
         A list of posts
     """
-    redis_client = get_redis()
-
-    key = f"posts"
+    key = f"{cache_warmer.posts_key()}{fieldset.cache_key}"
 
-    cached_posts = None
-
-    if redis_client:
-        cached_posts = redis_client.get(key)
+    cached_posts = cache.get(key)
 
     if not cached_posts:
 
-        posts = await repository_posts.get_all_posts(session=session)
+        posts = await repository_posts.get_all_posts(session=session, fieldset=fieldset)
 
         if len(posts) == 0:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Posts not found")
 
-        if redis_client:
-            redis_client.set(key, pickle.dumps(posts))
-            redis_client.expire(key, 1800)
+        cache.set(key, pickle.dumps(posts), ttl=1800)
 
     else:
         posts = pickle.loads(cached_posts)
 
-    return paginate(posts)
+    if not fieldset.is_default:
+        return render_posts_page(posts=posts, fieldset=fieldset, params=params)
+
+    return paginate(posts, params)
+
 
+@router.get("/trending", response_model=Page[PostTagsResponse])
+async def get_trending_posts(
+    session: db_dependency,
+    params: Params = Depends(),
+    fieldset: PostFieldset = Depends(get_post_fieldset),
+) -> Page:
+    """
+    The function returns a page of the trending posts.
+    The posts are ranked by a time-decayed score of their views, tag activity and recency.
+
+        Args:
+            session: db_dependency: Access the database
+            params: Params: The page and the size of the page
+            fieldset: PostFieldset: The fields and embeds requested by ?fields= and ?include=
 
-@router.get("/{post_slug}", response_model=PostTagsResponse)
-async def get_single_post(session: db_dependency, post_slug: str) -> models.Post:
+    Returns:
+        A page of posts
+    """
+    post_ids, total = trending_service.get_trending_post_ids(
+        offset=(params.page - 1) * params.size, limit=params.size
+    )
+
+    posts = await repository_posts.get_posts_by_ids(session=session, post_ids=post_ids, fieldset=fieldset)
+
+    if not fieldset.is_default:
+        return render_posts_page(posts=posts, fieldset=fieldset, params=params, total=total)
+
+    return create_page(posts, total=total, params=params)
+
+
+@router.get("/{post_slug}", response_model=PostDetailResponse)
+async def get_single_post(
+    request: Request,
+    session: db_dependency,
+    post_slug: str,
+    fieldset: PostFieldset = Depends(get_post_fieldset),
+) -> models.Post:
     """
     The function returns a single post in the database.
 
         Args:
+            request: Request: Get the visitor data to count the view
             post_slug: str: Get the slug of the post
             session: db_dependency: Access the database
+            fieldset: PostFieldset: The fields and embeds requested by ?fields= and ?include=
 
     Returns:
         A single post
     """
-    redis_client = get_redis()
-
-    key = f"post_slug-{post_slug}"
-
-    cached_single_post = None
+    key = f"{cache_warmer.post_key(post_slug=post_slug)}{fieldset.cache_key}"
 
-    if redis_client:
-        cached_single_post = redis_client.get(key)
+    cached_single_post = cache.get(key)
 
     if not cached_single_post:
-        post = await repository_posts.get_single_post_by_slug(session=session, slug=post_slug)
+        post = await repository_posts.get_single_post_by_slug(session=session, slug=post_slug, fieldset=fieldset)
 
         if not post:
             raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Post not found")
 
-        if redis_client:
-            redis_client.set(key, pickle.dumps(post))
-            redis_client.expire(key, 1800)
+        cache.set(key, pickle.dumps(post), ttl=1800)
 
     else:
         post = pickle.loads(cached_single_post)
 
+    cache_warmer.record_hit(kind=cache_warmer.POST_HITS, member=post_slug)
+
+    # The view counters and related posts are attached after caching, so they are not frozen in the cached post
+    post.views, post.unique_views = views_service.track_view(
+        post=post,
+        visitor=views_service.visitor_fingerprint(
+            client_host=request.client.host if request.client else None,
+            user_agent=request.headers.get("user-agent"),
+        ),
+    )
+
+    trending_service.record_event(post_id=post.id, weight=trending_service.VIEW_WEIGHT)
+
+    if "related" in fieldset.fields:
+        post.related = await repository_posts.get_post_summaries_by_ids(
+            session=session, post_ids=related_posts_service.get_related_post_ids(post_id=post.id)
+        )
+
+    if not fieldset.is_default:
+        return render_post(post=post, fieldset=fieldset)
+
     return post
 
 
@@ -142,7 +209,7 @@ async def update_post(
     session: db_dependency,
     post_update: PostPartialUpdate,
     post_id: int,
-    current_author: models.Author = Depends(auth_service.get_current_author),
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
 ) -> models.Post:
     """
     The update_post function partial updates a post data in the database.
@@ -152,7 +219,7 @@ async def update_post(
             post_update: PostPartialUpdate: Receive the data of the post to be updated
             post_id: int: Get the id of the post to be updated its data
             session: AsyncSession: Access the database
-            current_author (Author): the current author
+            current_author (AuthorClaims): the current author
 
     Returns:
         The updated post data
@@ -171,11 +238,45 @@ async def update_post(
     return updated_post
 
 
+@router.delete("/", response_model=PostBulkDeleteResponse, dependencies=[Depends(allowed_operation_admin)])
+async def delete_posts(
+    session: db_dependency,
+    author_id: int | None = None,
+    category_id: int | None = None,
+    tag_id: int | None = None,
+    created_before: datetime | None = None,
+) -> dict[str, int]:
+    """
+    The delete_posts function deletes all the posts matching the filter (at least one is required).
+
+        Args:
+            session: db_dependency: Access the database
+            author_id: int: Delete the posts of the author
+            category_id: int: Delete the posts of the category
+            tag_id: int: Delete the posts with the tag
+            created_before: datetime: Delete the posts created before the time
+
+    Returns:
+        The number of the deleted posts
+    """
+    deleted = await repository_posts.delete_posts(
+        session=session,
+        author_id=author_id,
+        category_id=category_id,
+        tag_id=tag_id,
+        created_before=created_before,
+    )
+
+    await delete_cache_in_redis()
+
+    return {"deleted": deleted}
+
+
 @router.delete("/{post_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def delete_post(
     session: db_dependency,
     post_id: int,
-    current_author: models.Author = Depends(auth_service.get_current_author),
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
 ) -> None:
     """
     The delete_post function is used to delete the post.
@@ -184,7 +285,7 @@ async def delete_post(
         Args:
             post_id: int: Get the id of the post to be deleted
             session: db_dependency: Access the database
-            current_author (Author): the current author
+            current_author (AuthorClaims): the current author
 
     Returns:
         None
@@ -203,8 +304,8 @@ async def delete_post(
 async def upload_post_image(
     post_id: int,
     session: db_dependency,
-    file: UploadFile = Depends(validate_image),
-    current_author: models.Author = Depends(auth_service.get_current_author),
+    file: UploadFile = Depends(validate_post_image),
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
 ) -> dict[str, str]:
     """
     The upload_post_image function uploads post image.
@@ -213,7 +314,7 @@ async def upload_post_image(
             file: UploadFile: upload image
             post_id: int: Get the id of the post to upload image
             session: db_dependency: Access the database
-            current_author (Author): the current author
+            current_author (AuthorClaims): the current author
 
     Returns:
         A message about successful uploading post image
@@ -239,7 +340,7 @@ async def add_tags_to_post(
     post_id: int,
     tag_names: list[str],
     session: db_dependency,
-    current_author: models.Author = Depends(auth_service.get_current_author),
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
 ) -> dict[str, str]:
     """
     The add_tags_to_post function creates tag and adds it to association with post.
@@ -248,7 +349,7 @@ async def add_tags_to_post(
             tag_names: list[str]: Validate the request body
             post_id: int: Get the id of the post to be added it to association with tag
             session: db_dependency: Access the database
-            current_author (Author): the current author
+            current_author (AuthorClaims): the current author
 
     Returns:
         A message about successful adding tag to post
@@ -268,7 +369,7 @@ async def remove_tag_data_from_post(
     post_id: int,
     tag_id: int,
     session: db_dependency,
-    current_author: models.Author = Depends(auth_service.get_current_author),
+    current_author: AuthorClaims = Depends(auth_service.get_current_author),
 ) -> None:
     """
     The remove_tag_data_from_post function deletes an exists association between post and tag data.
@@ -277,7 +378,7 @@ async def remove_tag_data_from_post(
             tag_id: int: Validate the request body
             post_id: int: Get the id of the post to be deleted its association with tag
             session: db_dependency: Access the database
-            current_author (Author): the current author
+            current_author (AuthorClaims): the current author
 
     Returns:
         None
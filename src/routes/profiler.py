@@ -0,0 +1,49 @@
+from fastapi import APIRouter, Depends, HTTPException, status
+
+from src.core.database.models.enums import Role
+
+from src.services import profiler as profiler_service
+from src.services.roles import RoleAccess
+
+router = APIRouter(tags=["Profiler"])
+
+allowed_operation_admin = RoleAccess([Role["admin"]])
+
+
+@router.get("/{profile_id}", dependencies=[Depends(allowed_operation_admin)])
+async def get_profile(profile_id: str) -> dict:
+    """
+    The get_profile function returns the profile of a request in the speedscope format,
+    which is opened by https://www.speedscope.app (the id is returned in the X-Profile-Id header).
+
+        Args:
+            profile_id: str: The id of the profile
+
+    Returns:
+        The sampled stacks of the request
+    """
+    profile = profiler_service.read_profile(profile_id=profile_id, suffix="speedscope")
+
+    if profile is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Profile not found")
+
+    return profile
+
+
+@router.get("/{profile_id}/allocations", dependencies=[Depends(allowed_operation_admin)])
+async def get_profile_allocations(profile_id: str) -> dict:
+    """
+    The get_profile_allocations function returns the top allocation sites of a request profiled in the memory mode.
+
+        Args:
+            profile_id: str: The id of the profile
+
+    Returns:
+        The lines which allocated the most memory during the request
+    """
+    allocations = profiler_service.read_profile(profile_id=profile_id, suffix="allocations")
+
+    if allocations is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Allocations not found")
+
+    return allocations
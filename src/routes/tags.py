@@ -1,18 +1,63 @@
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, status, Query
 
 from src.core.database import models
 from src.core.database.db_settings.db_helper import db_dependency
 from src.core.database.models.enums import Role
 
-from src.schemas.tags import TagResponse, TagUpdate
+from src.schemas.tags import TagResponse, TagUpdate, TagWindow, PopularTagResponse, TagMerge, TagMergeResponse
 from src.repositories import tags as repository_tags
 
+from src.services import popular_tags as popular_tags_service
 from src.services.cache_in_redis import delete_cache_in_redis
 from src.services.roles import RoleAccess
 
 router = APIRouter(tags=["Tags"])
 
 allowed_operation_admin_moderator = RoleAccess([Role["admin"], Role["moderator"]])
+allowed_operation_admin = RoleAccess([Role["admin"]])
+
+
+@router.get("/popular", response_model=list[PopularTagResponse])
+async def get_popular_tags(
+    session: db_dependency,
+    limit: int = Query(default=20, ge=1, le=100),
+    window: TagWindow = TagWindow.all,
+) -> list[dict]:
+    """
+    The function returns the most used tags (tag cloud) for the time window.
+    The data is served from the precomputed aggregate of the tag usage.
+
+        Args:
+            session: db_dependency: Access the database
+            limit: int: The number of tags to return
+            window: TagWindow: The time window of the usage (all, 7d or 30d)
+
+    Returns:
+        A list of popular tags
+    """
+    return await popular_tags_service.get_popular_tags(session=session, window=window, limit=limit)
+
+
+@router.post("/merge",
+             response_model=TagMergeResponse,
+             dependencies=[Depends(allowed_operation_admin)],)
+async def merge_tags(session: db_dependency, tag_merge: TagMerge) -> dict:
+    """
+    The merge_tags function merges the tags into the tag with the given name (renames the first tag
+    if there is no tag with that name yet): their posts are tagged with it and the merged tags are deleted.
+
+        Args:
+            tag_merge: TagMerge: The ids of the tags to merge and the name of the resulting tag
+            session: db_dependency: Access the database
+
+    Returns:
+        The resulting tag with the number of the merged tags and of the retagged posts
+    """
+    merged = await repository_tags.merge_tags(session=session, tag_merge=tag_merge)
+
+    await delete_cache_in_redis()
+
+    return merged
 
 
 @router.put("/{tag_id}",
@@ -26,6 +26,8 @@ class AuthorResponse(AuthorBase):
     updated_at: datetime
     is_active: bool
     role: Role
+    post_count: int = 0
+    follower_count: int = 0
     id: int
 
 
@@ -36,6 +38,22 @@ class AuthorChangeRole(BaseModel):
     role: Role
 
 
+class AuthorBulkChangeRole(BaseModel):
+    ids: Annotated[list[int], MinLen(1), MaxLen(1000)]
+    role: Role
+
+
+class AuthorBulkChangeRoleResponse(BaseModel):
+    ids: list[int]
+    role: Role
+
+
+class AuthorClaims(BaseModel):
+    id: int
+    email: str
+    role: Role
+
+
 class AuthorMessageResponse(BaseModel):
     message: str
 
@@ -46,6 +64,13 @@ class TokenModel(BaseModel):
     author: AuthorResponse
 
 
+class SessionResponse(BaseModel):
+    sid: str
+    device: str
+    created_at: int
+    refreshed_at: int
+
+
 class PasswordChangeModel(BaseModel):
     old_password: str = Field(min_length=8, max_length=255)
     new_password: str = Field(min_length=8, max_length=255)
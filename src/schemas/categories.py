@@ -9,8 +9,13 @@ class CategoryChange(CategoryBase):
     pass
 
 
+class CategoryPostsMoveResponse(BaseModel):
+    moved: int
+
+
 class CategoryResponse(CategoryBase):
     model_config = ConfigDict(from_attributes=True)
 
     slug: str
+    post_count: int = 0
     id: int
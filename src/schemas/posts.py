@@ -1,15 +1,23 @@
+from dataclasses import dataclass
 from datetime import datetime
-from typing import Optional
+from functools import lru_cache
+from typing import Annotated, Optional
 
-from pydantic import BaseModel, ConfigDict
+from annotated_types import MaxLen
+from pydantic import BaseModel, ConfigDict, create_model
 
 from src.schemas.authors import AuthorResponse
+from src.schemas.categories import CategoryResponse
 from src.schemas.tags import TagResponse
+from src.services.media import PostImageUrl
+
+
+CONTENT_MAX_LENGTH = 500_000
 
 
 class PostBase(BaseModel):
     title: str
-    content: str
+    content: Annotated[str, MaxLen(CONTENT_MAX_LENGTH)]
 
 
 class PostCreate(PostBase):
@@ -18,35 +26,121 @@ class PostCreate(PostBase):
 
 class PostPartialUpdate(BaseModel):
     title: str | None = None
-    content: str | None = None
+    content: Annotated[str, MaxLen(CONTENT_MAX_LENGTH)] | None = None
 
 
 class PostMessageResponse(BaseModel):
     message: str
 
 
+class PostBulkDeleteResponse(BaseModel):
+    deleted: int
+
+
 class PostResponse(PostBase):
     model_config = ConfigDict(from_attributes=True)
 
     slug: str
+    excerpt: str = ""
+    word_count: int = 0
+    reading_time: int = 0
     author_id: int
     author: Optional[AuthorResponse] = {}
     category_id: int
-    image: Optional[str]
+    image: PostImageUrl
     created_at: datetime
     updated_at: datetime
     id: int
 
 
-class PostTagsResponse(PostBase):
+class PostTagsResponse(BaseModel):
+    """
+    A post in the listings: the excerpt instead of the content.
+    """
     model_config = ConfigDict(from_attributes=True)
 
+    title: str
     slug: str
+    excerpt: str = ""
+    word_count: int = 0
+    reading_time: int = 0
     author_id: int
     author: Optional[AuthorResponse] = {}
     category_id: int
-    image: Optional[str]
+    image: PostImageUrl
     created_at: datetime
     updated_at: datetime
     tags: Optional[list[TagResponse]] = []
+    views: int = 0
+    unique_views: int = 0
+    id: int
+
+
+class RelatedPostResponse(BaseModel):
     id: int
+    title: str
+    slug: str
+    image: PostImageUrl = None
+
+
+class PostDetailResponse(PostTagsResponse):
+    content: str
+    related: Optional[list[RelatedPostResponse]] = None
+
+
+class TimelineResponse(BaseModel):
+    items: list[PostTagsResponse]
+    next_cursor: Optional[str] = None
+
+
+POST_FIELDS = tuple(name for name in PostDetailResponse.model_fields if name not in ("author", "tags"))
+POST_LISTING_FIELDS = tuple(name for name in POST_FIELDS if name not in ("content", "related"))
+POST_EMBEDS = ("author", "tags", "category")
+POST_DEFAULT_EMBEDS = ("author", "tags")
+
+
+@dataclass(frozen=True)
+class PostFieldset:
+    """
+    The fields and the embedded entities of the posts requested by ?fields= and ?include=.
+    """
+    fields: tuple[str, ...] = POST_FIELDS
+    include: tuple[str, ...] = POST_DEFAULT_EMBEDS
+
+    @property
+    def is_default(self) -> bool:
+        return set(self.fields) == set(POST_FIELDS) and set(self.include) == set(POST_DEFAULT_EMBEDS)
+
+    @property
+    def cache_key(self) -> str:
+        if self.is_default:
+            return ""
+
+        return f":fields={','.join(sorted(self.fields))}:include={','.join(sorted(self.include))}"
+
+    def response_model(self, detail: bool = False) -> type[BaseModel]:
+        fields = self.fields if detail else tuple(name for name in self.fields if name in POST_LISTING_FIELDS)
+        return create_post_response_model(fields=tuple(sorted(fields)), include=tuple(sorted(self.include)))
+
+
+@lru_cache(maxsize=256)
+def create_post_response_model(fields: tuple[str, ...], include: tuple[str, ...]) -> type[BaseModel]:
+    """
+    Builds a response model with only the requested fields, one per field set.
+    """
+    # The field infos keep the validators of the fields (the image URL)
+    definitions = {
+        name: (PostDetailResponse.model_fields[name].annotation, PostDetailResponse.model_fields[name])
+        for name in fields
+    }
+
+    if "author" in include:
+        definitions["author"] = (Optional[AuthorResponse], None)
+    if "tags" in include:
+        definitions["tags"] = (Optional[list[TagResponse]], [])
+    if "category" in include:
+        definitions["category"] = (Optional[CategoryResponse], None)
+
+    return create_model(
+        "PostFieldsetResponse", __config__=ConfigDict(from_attributes=True), **definitions
+    )
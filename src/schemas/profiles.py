@@ -3,6 +3,8 @@ from datetime import datetime
 from typing import Optional
 from pydantic import BaseModel, ConfigDict, Field
 
+from src.services.media import ProfileImageUrl
+
 
 class ProfileBase(BaseModel):
     first_name: Optional[str] = ""
@@ -27,7 +29,7 @@ class ProfileResponse(ProfileBase):
     model_config = ConfigDict(from_attributes=True)
 
     phone_number: Optional[str] = ""
-    image: Optional[str] = ""
+    image: ProfileImageUrl = ""
     bio: Optional[str] = ""
     facebook: Optional[str] = ""
     twitter: Optional[str] = ""
@@ -1,3 +1,4 @@
+from enum import StrEnum
 from typing import Annotated
 from annotated_types import MinLen, MaxLen
 
@@ -16,6 +17,33 @@ class TagUpdate(TagBase):
     pass
 
 
+class TagMerge(TagBase):
+    tag_ids: Annotated[list[int], MinLen(1), MaxLen(1000)]
+
+
+class TagMergeResponse(BaseModel):
+    id: int
+    name: str
+    merged_tags: int
+    posts: int
+
+
 class TagResponse(TagBase):
     model_config = ConfigDict(from_attributes=True)
+    post_count: int = 0
+    id: int
+
+
+class TagWindow(StrEnum):
+    """
+    Time windows of the tag usage.
+    """
+    all: str = "all"
+    week: str = "7d"
+    month: str = "30d"
+
+
+class PopularTagResponse(BaseModel):
     id: int
+    name: str
+    post_count: int
@@ -1,3 +1,6 @@
+import time
+import uuid
+import logging
 from datetime import datetime, timedelta
 from typing import Optional
 
@@ -8,6 +11,10 @@ from jose import jwt, JWTError
 from src.core.conf.config import settings
 from src.core.database.db_settings.db_helper import db_dependency
 from src.repositories import authors as repository_authors
+from src.schemas.authors import AuthorClaims
+from src.services.revocation import revocation_list
+
+logger = logging.getLogger(__name__)
 
 
 class Auth:
@@ -16,6 +23,7 @@ class Auth:
     ACCESS_TOKEN_EXPIRE_MINUTES = settings.access_token_expire_minutes
     REFRESH_TOKEN_EXPIRE_MINUTES = settings.refresh_token_expire_minutes
     oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
+    optional_oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login", auto_error=False)
     credentials_exception = HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
@@ -50,12 +58,15 @@ class Auth:
             Expires_delta is an optional argument that specifies how long you want your access token to be valid
             for (in seconds). If no value is specified then it defaults to 48 hours.
 
+            Every token gets its own id (jti), so it can be revoked before it expires,
+            and the issue time keeps the fraction of a second to be compared with the revocations of the author.
+
         Arguments:
-            data (dict): A dictionary containing the user's id and username.
+            data (dict): A dictionary containing the user's id, email and role.
             expires_delta (Optional[int]): The number of minutes until the token expires, defaults to None.
 
         Returns:
-            A token that is encoded with the data, current time, expiry time and scope
+            A token that is encoded with the data, current time, expiry time, scope and token id
         """
         to_encode = data.copy()
         if expires_delta:
@@ -64,7 +75,9 @@ class Auth:
             expire = datetime.utcnow() + timedelta(
                 minutes=cls.ACCESS_TOKEN_EXPIRE_MINUTES
             )
-        to_encode.update({"iat": datetime.utcnow(), "exp": expire, "scope": "access_token"})
+        to_encode.update(
+            {"iat": time.time(), "exp": expire, "scope": "access_token", "jti": uuid.uuid4().hex}
+        )
         encoded_access_token = jwt.encode(
             to_encode, cls.JWT_SECRET_KEY, algorithm=cls.ALGORITHM
         )
@@ -98,10 +111,10 @@ class Auth:
         return encoded_refresh_token
 
     @classmethod
-    async def decode_refresh_token(cls, refresh_token: str):
+    async def decode_refresh_token(cls, refresh_token: str) -> dict:
         """
         The decode_refresh_token function is used to decode the refresh token.
-        It takes a refresh_token as an argument and returns the email of the user if it's valid.
+        It takes a refresh_token as an argument and returns its payload if it's valid.
         If not, it raises an HTTPException with status code 401 (UNAUTHORIZED)
         and detail 'Could not validate credentials'.
 
@@ -109,37 +122,31 @@ class Auth:
             refresh_token (str): Pass the refresh token to the function
 
         Returns:
-            The email of the user that is associated with the refresh token
+            The payload of the token: email (sub), author_id, session id (sid) and token id (jti)
         """
+        if not refresh_token:
+            raise cls.credentials_exception
+
         payload = cls.token_decode(refresh_token)
-        if payload["scope"] == "refresh_token":
-            email = payload["sub"]
-            return email
+        if payload.get("scope") == "refresh_token" and payload.get("sid") and payload.get("jti"):
+            return payload
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid scope for token"
         )
 
     @classmethod
-    async def get_current_author(
-        cls, session: db_dependency, token: str = Depends(oauth2_scheme)
-    ):
-        try:
-            payload = cls.token_decode(token)
-            if payload.get("scope") == "access_token":
-                email: str = payload.get("sub")
-                if email is None:
-                    raise cls.credentials_exception
-            else:
-                raise cls.credentials_exception
-
-            author = await repository_authors.get_author_by_email(email=email, session=session)
-            if author is None:
-                raise HTTPException(
-                    status_code=status.HTTP_401_UNAUTHORIZED, detail="Author not found"
-                )
+    def decode_access_token(cls, token: str) -> dict:
+        """
+        Decodes the access token and checks it carries all the claims the author is resolved from.
 
-            return author
+        Arguments:
+            token (str): The access token
 
+        Returns:
+            dict: The payload of the token
+        """
+        try:
+            payload = jwt.decode(token, cls.JWT_SECRET_KEY, algorithms=[cls.ALGORITHM])
         except jwt.ExpiredSignatureError:
             raise HTTPException(
                 status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has expired"
@@ -150,5 +157,95 @@ class Auth:
                 detail="Could not validate token",
             )
 
+        if payload.get("scope") != "access_token" or not all(
+            payload.get(claim) is not None for claim in ("sub", "author_id", "role", "jti", "iat")
+        ):
+            raise cls.credentials_exception
+
+        return payload
+
+    @classmethod
+    async def get_current_author(
+        cls, session: db_dependency, token: str = Depends(oauth2_scheme)
+    ) -> AuthorClaims:
+        """
+        Resolves the current author from the claims of the access token.
+        The claims are trusted unless the token is revoked, which is checked against the in-process
+        Bloom filter of the revocation list, so the common case needs neither Postgres nor Redis.
+        The author is loaded from the database only while the revocation list cannot be checked.
+
+        Arguments:
+            session (db_dependency): SQLAlchemy session object for accessing the database
+            token (str): The access token
+
+        Returns:
+            AuthorClaims: The id, email and role of the current author
+        """
+        payload = cls.decode_access_token(token)
+
+        revoked = revocation_list.is_revoked(
+            jti=payload["jti"], author_id=payload["author_id"], issued_at=payload["iat"]
+        )
+
+        if revoked:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Token has been revoked"
+            )
+
+        if revoked is None:
+            logger.warning("Revocation list is unavailable, the author is loaded from the database")
+
+            author = await repository_authors.get_author_by_id(author_id=payload["author_id"], session=session)
+            if author is None:
+                raise HTTPException(
+                    status_code=status.HTTP_401_UNAUTHORIZED, detail="Author not found"
+                )
+
+            return AuthorClaims(id=author.id, email=author.email, role=author.role)
+
+        return AuthorClaims(id=payload["author_id"], email=payload["sub"], role=payload["role"])
+
+    @classmethod
+    async def get_current_author_record(
+        cls, session: db_dependency, token: str = Depends(oauth2_scheme)
+    ):
+        """
+        Loads the full row of the current author for the handlers which return it.
+
+        Arguments:
+            session (db_dependency): SQLAlchemy session object for accessing the database
+            token (str): The access token
+
+        Returns:
+            Author: The current author object
+        """
+        current_author = await cls.get_current_author(session=session, token=token)
+
+        author = await repository_authors.get_author_by_id(author_id=current_author.id, session=session)
+        if author is None:
+            raise HTTPException(
+                status_code=status.HTTP_401_UNAUTHORIZED, detail="Author not found"
+            )
+
+        return author
+
+    @classmethod
+    def revoke_access_token(cls, token: str) -> None:
+        """
+        Revokes the access token until it expires. Invalid or expired tokens are ignored.
+
+        Arguments:
+            token (str): The access token
+
+        Returns:
+            None
+        """
+        try:
+            payload = cls.decode_access_token(token)
+        except HTTPException:
+            return
+
+        revocation_list.revoke_token(jti=payload["jti"], expires_at=payload["exp"])
+
 
 auth_service = Auth()
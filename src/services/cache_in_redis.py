@@ -1,8 +1,9 @@
-from src.core.conf.caching import get_redis
+from src.core.conf.caching import cache
+from src.services.cache_warmer import cache_warmer
 
 
 async def delete_cache_in_redis():
-    # Redis client
-    redis_client = get_redis()
-    # Delete cache in redis
-    redis_client.flushdb()
+    # Delete cache in redis, the flush is retried later if redis is unavailable
+    if cache.flush():
+        # The hot keys are computed again in the background, so the next requests do not all miss
+        cache_warmer.schedule()
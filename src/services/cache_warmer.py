@@ -0,0 +1,313 @@
+import asyncio
+import logging
+import pickle
+import time
+import uuid
+from typing import Awaitable, Callable
+
+import redis
+
+from src.core.conf.caching import cache, get_redis_data
+from src.core.conf.config import settings
+from src.core.conf.metrics import metrics
+from src.core.database.db_settings.db_helper import async_session
+from src.repositories import categories as repository_categories
+from src.repositories import posts as repository_posts
+
+logger = logging.getLogger(__name__)
+
+HITS_KEY_PREFIX = "cache_warmer:hits:"
+LOCK_KEY = "cache_warmer:lock"
+MARKER_KEY_PREFIX = "cache_warmer:marker:"
+
+POST_HITS = "post"
+AUTHOR_HITS = "author"
+
+# Writes the value only while the marker of the run exists: a flush during the run drops the marker,
+# so the data read from the database before the flush is not written back over it.
+SET_IF_MARKER_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    return redis.call("SET", KEYS[2], ARGV[1], "EX", ARGV[2])
+end
+return false
+"""
+
+metrics.describe("cache_warm_runs_total", "counter", "Cache warm-up runs by result (done, aborted, skipped, error)")
+metrics.describe("cache_warm_keys_total", "gauge", "Keys planned by the current or last cache warm-up run")
+metrics.describe("cache_warm_keys_done", "gauge", "Keys warmed by the current or last cache warm-up run")
+metrics.describe("cache_warm_keys_failed", "gauge", "Keys failed in the current or last cache warm-up run")
+metrics.describe("cache_warm_duration_seconds", "gauge", "Duration of the last finished cache warm-up run")
+
+
+def posts_key() -> str:
+    return "posts"
+
+
+def categories_key() -> str:
+    return "categories"
+
+
+def category_posts_key(category_id: int, category_slug: str) -> str:
+    return f"category_id-{category_id}-category_slug-{category_slug}_posts"
+
+
+def author_posts_key(author_id: int) -> str:
+    return f"author_id-{author_id}_posts"
+
+
+def post_key(post_slug: str) -> str:
+    return f"post_slug-{post_slug}"
+
+
+def record_hit(kind: str, member: str | int) -> None:
+    """
+    Counts a request of a cached entity, the warmer learns the hot posts and listings from these counters.
+
+    Arguments:
+        kind (str): The kind of the entity (post, author)
+        member (str | int): The post slug or the author id
+
+    Returns:
+        None
+    """
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return
+
+    try:
+        redis_client.zincrby(f"{HITS_KEY_PREFIX}{kind}", 1, member)
+    except redis.exceptions.RedisError as error:
+        logger.warning("Unable to record a hit of %s %s: %s", kind, member, str(error))
+
+
+def get_top_hits(kind: str, limit: int) -> list[str]:
+    redis_client = get_redis_data()
+
+    if not redis_client or limit <= 0:
+        return []
+
+    members = redis_client.zrevrange(f"{HITS_KEY_PREFIX}{kind}", 0, limit - 1)
+    return [member.decode() for member in members]
+
+
+class CacheWarmer:
+    def __init__(
+        self,
+        concurrency: int = settings.cache_warm_concurrency,
+        top_posts: int = settings.cache_warm_top_posts,
+        top_authors: int = settings.cache_warm_top_authors,
+        delay: float = settings.cache_warm_delay_seconds,
+        hits_decay_interval: int = settings.cache_warm_hits_decay_interval_seconds,
+    ):
+        """
+        Precomputes the hot keys of the response cache in the background, at the startup and after
+        the cache is flushed, so the first requests after a deploy or a write hit the cache instead
+        of all missing at once. The hot keys are the posts listing, the categories, the posts of every
+        category, and the most requested authors and posts learned from the hit counters.
+        The listings are cached whole (the routes paginate them in process), so one key covers all the pages.
+
+        Arguments:
+            concurrency (int): The maximum number of keys computed at the same time
+            top_posts (int): The number of the most requested posts to warm
+            top_authors (int): The number of the most requested author listings to warm
+            delay (float): The seconds to wait after a flush, so a burst of writes is warmed once
+            hits_decay_interval (int): The seconds between halving the hit counters, so they follow the traffic
+
+        Returns:
+            None
+        """
+        self.concurrency = concurrency
+        self.top_posts = top_posts
+        self.top_authors = top_authors
+        self.delay = delay
+        self.hits_decay_interval = hits_decay_interval
+        self.task: asyncio.Task | None = None
+        self.rerun = False
+        self.decayed_at = time.monotonic()
+
+    def schedule(self) -> None:
+        """
+        Starts a warm-up run in the background of the running event loop, it never delays the caller.
+        A flush during a run schedules one more run after it.
+        """
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            # Called outside of the app (scripts), there is nothing to warm for
+            return
+
+        if self.task and not self.task.done():
+            self.rerun = True
+            return
+
+        self.task = loop.create_task(self._run())
+
+    async def stop(self) -> None:
+        if self.task and not self.task.done():
+            self.task.cancel()
+            await asyncio.gather(self.task, return_exceptions=True)
+
+    async def _run(self) -> None:
+        while True:
+            self.rerun = False
+
+            await asyncio.sleep(self.delay)
+
+            try:
+                await self.warm()
+            except Exception as error:
+                logger.error("Unable to warm the cache: %s", str(error))
+                metrics.inc("cache_warm_runs_total", result="error")
+
+            if not self.rerun:
+                return
+
+    async def warm(self) -> bool:
+        """
+        Warms the hot keys. Only one worker warms at a time, the others skip the run.
+
+        Returns:
+            bool: Whether the run finished and was not aborted by a flush
+        """
+        cache_client = cache.get_client()
+        data_client = get_redis_data()
+
+        if not cache_client or not data_client:
+            metrics.inc("cache_warm_runs_total", result="skipped")
+            return False
+
+        run_id = uuid.uuid4().hex
+
+        if not data_client.set(LOCK_KEY, run_id, nx=True, ex=settings.cache_warm_lock_timeout_seconds):
+            metrics.inc("cache_warm_runs_total", result="skipped")
+            return False
+
+        marker_key = f"{MARKER_KEY_PREFIX}{run_id}"
+        started_at = time.monotonic()
+
+        try:
+            cache_client.set(marker_key, 1, ex=settings.cache_warm_lock_timeout_seconds)
+
+            self.decay_hits()
+
+            jobs = await self.plan()
+
+            metrics.set("cache_warm_keys_total", len(jobs))
+            metrics.set("cache_warm_keys_done", 0)
+            metrics.set("cache_warm_keys_failed", 0)
+
+            semaphore = asyncio.Semaphore(self.concurrency)
+            set_if_marker = cache_client.register_script(SET_IF_MARKER_SCRIPT)
+            aborted = asyncio.Event()
+
+            async def warm_key(key: str, load: Callable[..., Awaitable]) -> None:
+                async with semaphore:
+                    if aborted.is_set():
+                        return
+
+                    try:
+                        async with async_session() as session:
+                            value = await load(session)
+
+                        if value and not set_if_marker(keys=[marker_key, key], args=[pickle.dumps(value), 1800]):
+                            aborted.set()
+                            return
+                    except Exception as error:
+                        logger.warning("Unable to warm %s: %s", key, str(error))
+                        metrics.inc("cache_warm_keys_failed")
+                        return
+
+                    metrics.inc("cache_warm_keys_done")
+
+            await asyncio.gather(*(warm_key(key, load) for key, load in jobs))
+
+            if not cache_client.exists(marker_key):
+                aborted.set()
+        finally:
+            try:
+                cache_client.delete(marker_key)
+
+                if data_client.get(LOCK_KEY) == run_id.encode():
+                    data_client.delete(LOCK_KEY)
+            except redis.exceptions.RedisError as error:
+                logger.warning("Unable to release the cache warm-up lock: %s", str(error))
+
+        duration = time.monotonic() - started_at
+        metrics.set("cache_warm_duration_seconds", round(duration, 3))
+
+        if aborted.is_set():
+            # The worker which flushed may have skipped its run while this one held the lock
+            self.rerun = True
+            logger.info("Cache warm-up aborted by a flush after %.2f s", duration)
+            metrics.inc("cache_warm_runs_total", result="aborted")
+            return False
+
+        logger.info(
+            "Cache warm-up: %s of %s keys in %.2f s",
+            int(metrics.get("cache_warm_keys_done")), len(jobs), duration,
+        )
+        metrics.inc("cache_warm_runs_total", result="done")
+        return True
+
+    async def plan(self) -> list[tuple[str, Callable[..., Awaitable]]]:
+        """
+        Returns the hot keys with the functions loading their values from the database.
+        """
+        jobs = [
+            (posts_key(), lambda session: repository_posts.get_all_posts(session=session)),
+            (categories_key(), lambda session: repository_categories.get_all_categories(session=session)),
+        ]
+
+        async with async_session() as session:
+            categories = await repository_categories.get_all_categories(session=session)
+
+        for category in categories:
+            jobs.append((
+                category_posts_key(category_id=category.id, category_slug=category.slug),
+                lambda session, category_id=category.id: repository_posts.get_all_posts_by_category_id(
+                    category_id=category_id, session=session
+                ),
+            ))
+
+        for author_id in get_top_hits(kind=AUTHOR_HITS, limit=self.top_authors):
+            jobs.append((
+                author_posts_key(author_id=int(author_id)),
+                lambda session, author_id=int(author_id): repository_posts.get_all_posts_by_author_id(
+                    author_id=author_id, session=session
+                ),
+            ))
+
+        for post_slug in get_top_hits(kind=POST_HITS, limit=self.top_posts):
+            jobs.append((
+                post_key(post_slug=post_slug),
+                lambda session, post_slug=post_slug: repository_posts.get_single_post_by_slug(
+                    session=session, slug=post_slug
+                ),
+            ))
+
+        return jobs
+
+    def decay_hits(self) -> None:
+        """
+        Halves the hit counters and drops the long tail, at most once per the decay interval.
+        """
+        if time.monotonic() - self.decayed_at < self.hits_decay_interval:
+            return
+
+        self.decayed_at = time.monotonic()
+
+        redis_client = get_redis_data()
+
+        if not redis_client:
+            return
+
+        pipe = redis_client.pipeline(transaction=False)
+        for kind, limit in ((POST_HITS, self.top_posts), (AUTHOR_HITS, self.top_authors)):
+            key = f"{HITS_KEY_PREFIX}{kind}"
+            pipe.zunionstore(key, {key: 0.5})
+            pipe.zremrangebyrank(key, 0, -(limit * 10) - 1)
+        pipe.execute()
+
+
+cache_warmer = CacheWarmer()
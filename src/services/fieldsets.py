@@ -0,0 +1,76 @@
+import math
+
+from fastapi import HTTPException, Query, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from fastapi_pagination import Params
+
+from src.core.database import models
+from src.schemas.posts import PostFieldset, POST_FIELDS, POST_EMBEDS, POST_DEFAULT_EMBEDS
+
+
+def parse_names(value: str, allowed: tuple[str, ...], parameter: str) -> tuple[str, ...]:
+    names = tuple(dict.fromkeys(name.strip() for name in value.split(",") if name.strip()))
+    unknown = [name for name in names if name not in allowed]
+
+    if unknown:
+        raise HTTPException(
+            status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+            detail=f"Unknown {parameter}: {', '.join(unknown)}. Allowed: {', '.join(allowed)}",
+        )
+
+    return names
+
+
+def get_post_fieldset(
+    fields: str | None = Query(
+        default=None, description=f"Comma-separated fields of the posts: {', '.join(POST_FIELDS)}"
+    ),
+    include: str | None = Query(
+        default=None,
+        description=(
+            f"Comma-separated embedded entities: {', '.join(POST_EMBEDS)} "
+            f"(default {','.join(POST_DEFAULT_EMBEDS)} without ?fields=, none with it)"
+        ),
+    ),
+) -> PostFieldset:
+    """
+    The fields and embeds of the posts requested by the client. Without both parameters
+    the posts are returned whole with their author and tags, as before.
+    """
+    if fields is None and include is None:
+        return PostFieldset()
+
+    return PostFieldset(
+        fields=parse_names(fields, POST_FIELDS, "fields") if fields is not None else POST_FIELDS,
+        include=parse_names(include, POST_EMBEDS, "include") if include is not None else (),
+    )
+
+
+def render_post(post: models.Post, fieldset: PostFieldset) -> JSONResponse:
+    response_model = fieldset.response_model(detail=True)
+    return JSONResponse(content=jsonable_encoder(response_model.model_validate(post)))
+
+
+def render_posts_page(
+    posts: list[models.Post], fieldset: PostFieldset, params: Params, total: int | None = None
+) -> JSONResponse:
+    """
+    Returns the page of the posts with only the requested fields, in the same shape as Page.
+    The posts are either all the posts (paginated here) or, with total, the posts of the page.
+    """
+    if total is None:
+        total = len(posts)
+        posts = posts[(params.page - 1) * params.size:params.page * params.size]
+
+    response_model = fieldset.response_model()
+
+    return JSONResponse(
+        content={
+            "items": [jsonable_encoder(response_model.model_validate(post)) for post in posts],
+            "total": total,
+            "page": params.page,
+            "size": params.size,
+            "pages": math.ceil(total / params.size) if total else 0,
+        }
+    )
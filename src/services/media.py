@@ -0,0 +1,427 @@
+import asyncio
+import hashlib
+import logging
+import mimetypes
+import os
+import re
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from email.utils import formatdate
+from functools import partial
+from io import BytesIO
+from typing import Annotated, Optional
+
+from fastapi import HTTPException, Request, UploadFile, status
+from fastapi.responses import RedirectResponse, Response
+from pydantic import BeforeValidator
+from sqlalchemy.ext.asyncio import AsyncSession
+from starlette.types import Receive, Scope, Send
+
+from src.core.conf.config import settings
+from src.core.conf.tracing import tracer
+from src.repositories import media as repository_media
+from src.services.storage import get_storage
+
+logger = logging.getLogger(__name__)
+
+POSTS_MEDIA = "posts"
+PROFILES_MEDIA = "uploads"
+MEDIA_KINDS = (POSTS_MEDIA, PROFILES_MEDIA)
+
+# The media directory of the images of every table
+TABLE_MEDIA = {"posts": POSTS_MEDIA, "profiles": PROFILES_MEDIA}
+
+DIGEST_LENGTH = 32
+IMMUTABLE_MAX_AGE = 365 * 24 * 3600
+CHUNK_SIZE = 64 * 1024
+
+# The uploaded files are named <digest>.<extension>: the same content is stored once, a new content gets
+# a new name (and URL). The names with a digest after a dash were given before the files were deduplicated.
+hashed_name_pattern = re.compile(r"(?:^|-)([0-9a-f]{16,64})\.\w+$")
+range_pattern = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+# The precompressed variants stored next to the file (e.g. image.svg.br), in the order of preference
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def content_hashed_filename(data: bytes, extension: str) -> str:
+    digest = hashlib.sha256(data).hexdigest()[:DIGEST_LENGTH]
+    return f"{digest}.{extension}".lower()
+
+
+def get_media_url(kind: str, filename: str | None) -> str | None:
+    """
+    The URL of the stored file: the filenames are stored in the database, the responses carry the URLs.
+    The URLs are passed through, so the value can be validated again.
+    """
+    if not filename or "/" in filename:
+        return filename
+
+    return f"{settings.media_url.rstrip('/')}/{kind}/{filename}"
+
+
+# The image fields of the responses: the URL of the stored file
+PostImageUrl = Annotated[Optional[str], BeforeValidator(partial(get_media_url, POSTS_MEDIA))]
+ProfileImageUrl = Annotated[Optional[str], BeforeValidator(partial(get_media_url, PROFILES_MEDIA))]
+
+
+def get_media_key(kind: str, filename: str) -> str:
+    if kind not in MEDIA_KINDS or filename.startswith(".") or os.path.basename(filename) != filename:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    return f"{kind}/{filename}"
+
+
+async def save_image(session: AsyncSession, file: UploadFile, kind: str, previous: str | None = None) -> str:
+    """
+    Stores the uploaded image once per content under its hash, so it can be cached by the clients forever,
+    and counts the reference to it. The previous image of the post or profile is released, its file is deleted
+    by the garbage collector when nothing refers to it. The caller commits the references.
+
+    Arguments:
+        session (AsyncSession): The session of the transaction which stores the filename
+        file (UploadFile): The uploaded image
+        kind (str): The media directory (posts or uploads)
+        previous (str): The filename of the image being replaced
+
+    Returns:
+        str: The filename
+    """
+    # PIL is imported on the first upload, not at the startup
+    from PIL import Image
+
+    # Decoded from the spooled upload, the size and the pixels were checked by the upload validator
+    await file.seek(0)
+
+    with tracer.span("image.reencode") as span:
+        image = Image.open(file.file)
+
+        buffer = BytesIO()
+        image.save(buffer, format=image.format)
+        data = buffer.getvalue()
+
+        if span is not None:
+            span.set_attribute("image.format", image.format)
+            span.set_attribute("image.size_bytes", len(data))
+
+    filename = content_hashed_filename(data=data, extension=file.filename.split(".")[-1])
+
+    if filename == previous:
+        return filename
+
+    key = get_media_key(kind=kind, filename=filename)
+
+    # Acquired before the file is checked, so the collector does not delete it after the check
+    created = await repository_media.acquire_media_file(session=session, key=key, size=len(data))
+
+    storage = get_storage()
+
+    # A new row: the file may be left by an upload which was never committed and be collected, it is written again
+    if created or not await storage.exists(key):
+        await storage.save(key, data, content_type=Image.MIME.get(image.format, "application/octet-stream"))
+
+    if previous:
+        await release_image(session=session, kind=kind, filename=previous)
+
+    return filename
+
+
+async def release_images(session: AsyncSession, kind: str, filenames: list[str | None]) -> None:
+    references = Counter(f"{kind}/{filename}" for filename in filenames if filename)
+    await repository_media.release_media_files(session=session, references=dict(references))
+
+
+async def release_image(session: AsyncSession, kind: str, filename: str | None) -> None:
+    await release_images(session=session, kind=kind, filenames=[filename])
+
+
+async def count_image_references(session: AsyncSession) -> dict[str, int]:
+    references = await repository_media.get_image_references(session=session)
+    return {f"{TABLE_MEDIA[table]}/{filename}": count for (table, filename), count in references.items()}
+
+
+async def collect_garbage(session: AsyncSession, grace_hours: float, batch_size: int = 500) -> dict[str, int]:
+    """
+    Deletes the files which have had no references for the grace period (the cached pages may still refer to them)
+    and the files left by the uploads which were never committed.
+
+    Arguments:
+        session (AsyncSession): The session
+        grace_hours (float): The hours a file is kept after it lost its last reference
+        batch_size (int): The number of files deleted in one transaction
+
+    Returns:
+        dict: The number of the deleted orphaned and untracked files
+    """
+    storage = get_storage()
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    deleted = {"orphaned": 0, "untracked": 0}
+
+    while True:
+        media_files = await repository_media.get_orphaned_media_files(
+            session=session, orphaned_before=cutoff, limit=batch_size
+        )
+
+        if not media_files:
+            break
+
+        # The rows are locked: an upload of the same content waits, then stores the file again
+        for media_file in media_files:
+            await storage.delete(media_file.key)
+
+        await repository_media.delete_media_files(
+            session=session, media_file_ids=[media_file.id for media_file in media_files]
+        )
+        await session.commit()
+
+        deleted["orphaned"] += len(media_files)
+
+    tracked_keys = await repository_media.get_media_file_keys(session=session)
+    referenced_keys = set(await count_image_references(session=session))
+    await session.commit()
+
+    for kind in MEDIA_KINDS:
+        for key, modified_at in await storage.list(kind):
+            filename = key.rsplit("/", 1)[-1]
+
+            # Only the content-hashed files are managed, the files uploaded before are referenced by their names
+            if not hashed_name_pattern.fullmatch(filename) or key in tracked_keys or key in referenced_keys:
+                continue
+
+            if modified_at < cutoff.replace(tzinfo=timezone.utc):
+                await storage.delete(key)
+                deleted["untracked"] += 1
+
+    logger.info(f"Media garbage collected: {deleted}")
+
+    return deleted
+
+
+def get_etag(filename: str, stat: os.stat_result) -> str:
+    match = hashed_name_pattern.search(filename)
+
+    if match:
+        return f'"{match.group(1)}"'
+
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+
+def get_cache_control(filename: str) -> str:
+    if hashed_name_pattern.search(filename):
+        return f"public, max-age={IMMUTABLE_MAX_AGE}, immutable"
+
+    # The files uploaded before the names were hashed are overwritten in place
+    return f"public, max-age={settings.media_max_age_seconds}"
+
+
+def etag_matches(header: str | None, etag: str) -> bool:
+    if not header:
+        return False
+
+    tags = [tag.strip().removeprefix("W/") for tag in header.split(",")]
+    return "*" in tags or etag in tags
+
+
+def accepts_encoding(header: str | None, encoding: str) -> bool:
+    for item in (header or "").split(","):
+        name, _, params = item.strip().partition(";")
+
+        if name.strip() == encoding:
+            quality = params.strip().removeprefix("q=")
+            try:
+                return not params or float(quality) > 0
+            except ValueError:
+                return False
+
+    return False
+
+
+def parse_range(header: str, size: int) -> tuple[int, int] | None:
+    """
+    Returns the first and the last byte of a single range, None for the whole file
+    (the invalid and the multiple ranges are ignored, as allowed for the servers).
+    """
+    match = range_pattern.match(header.strip())
+
+    if not match or not any(match.groups()):
+        return None
+
+    start, end = match.groups()
+
+    if not start:
+        length = int(end)
+        if length == 0:
+            raise HTTPException(
+                status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+                headers={"Content-Range": f"bytes */{size}"},
+            )
+        return max(size - length, 0), size - 1
+
+    first, last = int(start), min(int(end), size - 1) if end else size - 1
+
+    if first > last or first >= size:
+        raise HTTPException(
+            status_code=status.HTTP_416_REQUESTED_RANGE_NOT_SATISFIABLE,
+            headers={"Content-Range": f"bytes */{size}"},
+        )
+
+    return first, last
+
+
+class MediaResponse(Response):
+    def __init__(
+        self,
+        path: str,
+        offset: int,
+        count: int,
+        status_code: int = status.HTTP_200_OK,
+        headers: dict | None = None,
+        media_type: str | None = None,
+        send_body: bool = True,
+    ):
+        """
+        Sends a part of the file: with sendfile(2) when the server supports the zero-copy
+        ASGI extension, otherwise in chunks read in a thread.
+
+        Arguments:
+            path (str): The path of the file
+            offset (int): The first byte to send
+            count (int): The number of bytes to send
+            status_code (int): 200 or 206
+            headers (dict): The headers of the response
+            media_type (str): The content type
+            send_body (bool): False for HEAD requests
+
+        Returns:
+            None
+        """
+        super().__init__(status_code=status_code, headers=headers, media_type=media_type)
+        self.path = path
+        self.offset = offset
+        self.count = count
+        self.send_body = send_body
+        self.headers["content-length"] = str(count)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+
+        if not self.send_body or self.count == 0:
+            await send({"type": "http.response.body", "body": b""})
+            return
+
+        with open(self.path, "rb") as file:
+            if "http.response.zerocopysend" in scope.get("extensions", {}):
+                await send({
+                    "type": "http.response.zerocopysend",
+                    "file": file,
+                    "offset": self.offset,
+                    "count": self.count,
+                })
+                return
+
+            await asyncio.to_thread(file.seek, self.offset)
+            remaining = self.count
+
+            while remaining > 0:
+                chunk = await asyncio.to_thread(file.read, min(CHUNK_SIZE, remaining))
+                # The file is never shorter than its stat, unless it is replaced while sent
+                remaining = remaining - len(chunk) if chunk else 0
+                await send({"type": "http.response.body", "body": chunk, "more_body": remaining > 0})
+
+
+async def serve_media(request: Request, kind: str, filename: str) -> Response:
+    """
+    Serves the stored file with the validators (ETag, If-None-Match), the byte ranges and the precompressed
+    variants. The content-hashed files are cached as immutable. The files in a bucket are redirected to.
+
+    Arguments:
+        request (Request): The GET or HEAD request
+        kind (str): The media directory (posts or uploads)
+        filename (str): The name of the file
+
+    Returns:
+        Response: The file, a part of it, or 304
+    """
+    key = get_media_key(kind=kind, filename=filename)
+    cache_control = get_cache_control(filename)
+
+    storage = get_storage()
+    path = storage.get_path(key)
+
+    if path is None:
+        # The presigned URLs expire, the redirects to them are cached for a shorter time
+        if not settings.storage_s3_public_url:
+            cache_control = f"private, max-age={settings.storage_s3_url_expire_seconds // 2}"
+
+        return RedirectResponse(
+            url=storage.get_url(key),
+            status_code=status.HTTP_307_TEMPORARY_REDIRECT,
+            headers={"Cache-Control": cache_control},
+        )
+
+    if settings.media_accel_redirect:
+        # The proxy sends the file itself (sendfile, ranges and validators), the worker only checks the path
+        return Response(
+            headers={
+                "X-Accel-Redirect": f"{settings.media_accel_redirect.rstrip('/')}/{kind}/{filename}",
+                "Cache-Control": cache_control,
+            }
+        )
+
+    try:
+        stat = await asyncio.to_thread(os.stat, path)
+    except (FileNotFoundError, NotADirectoryError):
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="File not found")
+
+    etag = get_etag(filename=filename, stat=stat)
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(stat.st_mtime, usegmt=True),
+        "Cache-Control": cache_control,
+        "Accept-Ranges": "bytes",
+    }
+
+    range_header = request.headers.get("range")
+    if range_header and request.headers.get("if-range") not in (None, etag):
+        range_header = None
+
+    variants = [
+        (encoding, path + suffix) for encoding, suffix in ENCODINGS if os.path.isfile(path + suffix)
+    ]
+
+    if variants:
+        headers["Vary"] = "Accept-Encoding"
+
+    # The ranges are served from the identity file, the compressed variants are sent whole
+    for encoding, variant_path in variants if not range_header else []:
+        if accepts_encoding(request.headers.get("accept-encoding"), encoding):
+            path, stat = variant_path, await asyncio.to_thread(os.stat, variant_path)
+            etag = headers["ETag"] = f'{etag[:-1]}-{encoding}"'
+            headers["Content-Encoding"] = encoding
+            break
+
+    if etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+
+    media_type = mimetypes.guess_type(filename)[0] or "application/octet-stream"
+    send_body = request.method != "HEAD"
+
+    byte_range = parse_range(header=range_header, size=stat.st_size) if range_header else None
+
+    if byte_range is None:
+        return MediaResponse(
+            path=path, offset=0, count=stat.st_size, headers=headers, media_type=media_type, send_body=send_body
+        )
+
+    first, last = byte_range
+    headers["Content-Range"] = f"bytes {first}-{last}/{stat.st_size}"
+
+    return MediaResponse(
+        path=path,
+        offset=first,
+        count=last - first + 1,
+        status_code=status.HTTP_206_PARTIAL_CONTENT,
+        headers=headers,
+        media_type=media_type,
+        send_body=send_body,
+    )
@@ -0,0 +1,324 @@
+import json
+import asyncio
+import logging
+import time
+from collections import defaultdict
+from datetime import datetime, timedelta
+from typing import Awaitable, Callable
+
+from sqlalchemy.engine import make_url
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.conf.caching import get_redis_data
+from src.core.conf.config import settings
+from src.core.database import models
+from src.core.database.db_settings.db_helper import async_session
+from src.repositories import outbox as repository_outbox
+
+logger = logging.getLogger(__name__)
+
+CHANNEL = "outbox"
+STREAM_KEY = "outbox:events"
+
+Subscriber = Callable[[AsyncSession, models.OutboxEvent], Awaitable[None]]
+
+subscribers: dict[str, list[Subscriber]] = defaultdict(list)
+
+
+def subscribe(event_type: str, handler: Subscriber) -> None:
+    """
+    Registers an in-process subscriber of the events.
+
+    Arguments:
+        event_type (str): The event type (post.created), all the events of an aggregate (post.*) or all events (*)
+        handler (Subscriber): Coroutine function called with a session and the event
+
+    Returns:
+        None
+    """
+    if handler not in subscribers[event_type]:
+        subscribers[event_type].append(handler)
+
+
+def get_subscriber_name(handler: Subscriber) -> str:
+    return f"{handler.__module__}.{handler.__qualname__}"
+
+
+def get_subscribers(event_type: str) -> list[Subscriber]:
+    aggregate_type = event_type.split(".", 1)[0]
+    return subscribers[event_type] + subscribers[f"{aggregate_type}.*"] + subscribers["*"]
+
+
+def serialize_event(event: models.OutboxEvent) -> dict[str, str]:
+    return {
+        "id": str(event.id),
+        "event_type": event.event_type,
+        "aggregate_type": event.aggregate_type,
+        "aggregate_id": str(event.aggregate_id),
+        "payload": json.dumps(event.payload),
+        "created_at": event.created_at.isoformat(),
+    }
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        batch_size: int = settings.outbox_batch_size,
+        poll_interval: float = settings.outbox_poll_interval_seconds,
+        stream_max_length: int = settings.outbox_stream_max_length,
+        retention: timedelta = timedelta(hours=settings.outbox_retention_hours),
+    ):
+        """
+        Relays the committed outbox events to the Redis stream and to the in-process subscribers.
+        It wakes up on the Postgres notifications of new events and polls the table as a fallback,
+        so an event committed before a crash is still relayed after the restart.
+        The delivery is at least once: an event is marked published only after all its subscribers handled it,
+        an event with a failed subscriber is retried with an exponential backoff (only the failed subscribers
+        are called again) and is left unpublished after OUTBOX_MAX_ATTEMPTS failures.
+
+        Arguments:
+            batch_size (int): The maximum number of events relayed in one transaction
+            poll_interval (float): The seconds between the polls without notifications
+            stream_max_length (int): The approximate number of events kept in the Redis stream
+            retention (timedelta): How long the published events are kept in the table
+
+        Returns:
+            None
+        """
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.stream_max_length = stream_max_length
+        self.retention = retention
+        self.wakeup = asyncio.Event()
+        self.listener = None
+        self.purged_at = 0.0
+
+    async def relay_batch(self) -> int:
+        """
+        Relays one batch of the unpublished events.
+
+        Returns:
+            int: The number of relayed events, 0 if there were none or Redis is unavailable
+        """
+        redis_client = get_redis_data()
+
+        if not redis_client:
+            return 0
+
+        async with async_session() as session:
+            events = await repository_outbox.claim_unpublished_events(
+                session=session, limit=self.batch_size, max_attempts=settings.outbox_max_attempts
+            )
+
+            if not events:
+                await session.commit()
+                return 0
+
+            # The retried events were added to the stream on their first attempt
+            new_events = [event for event in events if event.attempts == 0]
+
+            if new_events:
+                pipe = redis_client.pipeline(transaction=False)
+                for event in new_events:
+                    pipe.xadd(
+                        STREAM_KEY, serialize_event(event), maxlen=self.stream_max_length, approximate=True
+                    )
+                pipe.execute()
+
+            failures = await self.dispatch(events=events)
+
+            for event in events:
+                if event.id in failures:
+                    handled, error = failures[event.id]
+                    repository_outbox.record_event_failure(
+                        event=event, handled=handled, error=error, next_attempt_at=self.get_retry_time(event)
+                    )
+
+            await repository_outbox.mark_events_published(
+                session=session, event_ids=[event.id for event in events if event.id not in failures]
+            )
+            await session.commit()
+
+        return len(events)
+
+    @staticmethod
+    def get_retry_time(event: models.OutboxEvent) -> datetime:
+        delay = min(settings.outbox_retry_base_seconds * 2 ** event.attempts, settings.outbox_retry_max_seconds)
+        return datetime.utcnow() + timedelta(seconds=delay)
+
+    @staticmethod
+    async def dispatch(events: list[models.OutboxEvent]) -> dict[int, tuple[list[str], str]]:
+        """
+        Calls the in-process subscribers in the order of the events, skipping the ones which handled
+        the event on a previous attempt. A failing subscriber is logged and does not hold back the others.
+
+        Returns:
+            dict: The subscribers which handled and the error of every event with a failed subscriber, by its id
+        """
+        failures = {}
+
+        async with async_session() as session:
+            for event in events:
+                handled = list(event.handled or [])
+                errors = []
+
+                for handler in get_subscribers(event.event_type):
+                    name = get_subscriber_name(handler)
+
+                    if name in handled:
+                        continue
+
+                    try:
+                        await handler(session, event)
+                    except Exception as error:
+                        logger.exception("Subscriber %s failed on event %s: %s", name, event.id, str(error))
+                        errors.append(f"{name}: {error}")
+                        await session.rollback()
+                        continue
+
+                    handled.append(name)
+
+                if errors:
+                    failures[event.id] = (handled, "; ".join(errors))
+
+        return failures
+
+    async def listen(self) -> None:
+        """
+        Subscribes to the notifications of new events. Only asyncpg supports them,
+        with any other driver (or if the connection fails) the relay keeps polling.
+        """
+        url = make_url(settings.database_url)
+
+        if url.get_driver_name() != "asyncpg":
+            return
+
+        import asyncpg
+
+        try:
+            self.listener = await asyncpg.connect(
+                url.set(drivername="postgresql").render_as_string(hide_password=False)
+            )
+            await self.listener.add_listener(CHANNEL, lambda *args: self.wakeup.set())
+        except Exception as error:
+            logger.error("Unable to listen to the outbox notifications: %s", str(error))
+            self.listener = None
+
+    async def purge(self) -> None:
+        if time.monotonic() - self.purged_at < 3600:
+            return
+
+        self.purged_at = time.monotonic()
+
+        async with async_session() as session:
+            deleted = await repository_outbox.delete_published_events(session=session, older_than=self.retention)
+
+        if deleted:
+            logger.info("Purged %s published outbox events", deleted)
+
+    async def run(self) -> None:
+        """
+        Background task relaying the events until it is cancelled.
+        """
+        try:
+            while True:
+                if self.listener is None or self.listener.is_closed():
+                    await self.listen()
+
+                try:
+                    while await self.relay_batch() == self.batch_size:
+                        pass
+
+                    await self.purge()
+                except asyncio.CancelledError:
+                    raise
+                except Exception as error:
+                    logger.error("Unable to relay outbox events: %s", str(error))
+
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+
+                self.wakeup.clear()
+        finally:
+            if self.listener is not None and not self.listener.is_closed():
+                await self.listener.close()
+
+
+class OutboxStreamConsumer:
+    def __init__(self, group: str, consumer: str, get_client: Callable = get_redis_data):
+        """
+        Reads the outbox events from the Redis stream in batches for a derived-data worker.
+        Every consumer group receives all the events, the consumers of one group share them.
+        The events are redelivered to the consumer until they are acknowledged.
+
+        Arguments:
+            group (str): The consumer group (one per derived-data worker kind)
+            consumer (str): The name of this consumer in the group
+            get_client (Callable): Returns a Redis client or None
+
+        Returns:
+            None
+        """
+        self.group = group
+        self.consumer = consumer
+        self.get_client = get_client
+        self.group_created = False
+        self.pending_checked = False
+
+    def read(self, count: int = 100, block_ms: int = 5000) -> list[tuple[str, dict]]:
+        """
+        Returns up to count events: the events delivered before but not acknowledged first, then new ones.
+
+        Returns:
+            list: The stream ids and the events
+        """
+        redis_client = self.get_client()
+
+        if not redis_client:
+            return []
+
+        if not self.group_created:
+            try:
+                redis_client.xgroup_create(STREAM_KEY, self.group, id="0", mkstream=True)
+            except Exception as error:
+                if "BUSYGROUP" not in str(error):
+                    raise
+
+            self.group_created = True
+
+        if not self.pending_checked:
+            response = redis_client.xreadgroup(self.group, self.consumer, {STREAM_KEY: "0"}, count=count)
+            entries = response[0][1] if response else []
+
+            if entries:
+                return self._decode(entries)
+
+            self.pending_checked = True
+
+        response = redis_client.xreadgroup(
+            self.group, self.consumer, {STREAM_KEY: ">"}, count=count, block=block_ms
+        )
+
+        return self._decode(response[0][1] if response else [])
+
+    def ack(self, stream_ids: list[str]) -> None:
+        redis_client = self.get_client()
+
+        if redis_client and stream_ids:
+            redis_client.xack(STREAM_KEY, self.group, *stream_ids)
+
+    @staticmethod
+    def _decode(entries: list) -> list[tuple[str, dict]]:
+        events = []
+
+        for stream_id, fields in entries:
+            event = {key.decode(): value.decode() for key, value in fields.items()}
+            event["payload"] = json.loads(event["payload"])
+            events.append((stream_id.decode(), event))
+
+        return events
+
+
+outbox_relay = OutboxRelay()
@@ -0,0 +1,101 @@
+from datetime import datetime
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.database import models
+from src.repositories import posts as repository_posts
+from src.services import outbox as outbox_service
+from src.services import popular_tags as popular_tags_service
+from src.services import related_posts as related_posts_service
+from src.services import trending as trending_service
+from src.services import views as views_service
+from src.services.timeline import timeline_service
+
+
+async def on_post_created(session: AsyncSession, event: models.OutboxEvent) -> None:
+    post = await repository_posts.get_specific_post_by_id(session=session, post_id=event.aggregate_id)
+
+    if not post:
+        return
+
+    await timeline_service.fan_out_post(session=session, post=post)
+
+    await related_posts_service.refresh_related_posts(session=session, post_id=post.id)
+
+    trending_service.record_event(post_id=post.id, weight=trending_service.NEW_POST_WEIGHT)
+
+
+async def on_post_tags_added(session: AsyncSession, event: models.OutboxEvent) -> None:
+    tag_names = {int(tag_id): tag_name for tag_id, tag_name in event.payload["tag_names"].items()}
+
+    popular_tags_service.record_tag_usage(
+        tag_ids=list(tag_names),
+        post_created_at=datetime.fromisoformat(event.payload["post_created_at"]),
+        delta=1,
+        tag_names=tag_names,
+    )
+
+    trending_service.record_event(
+        post_id=event.aggregate_id, weight=trending_service.TAG_WEIGHT * len(tag_names)
+    )
+
+    await related_posts_service.refresh_related_posts(session=session, post_id=event.aggregate_id)
+
+
+async def on_post_tag_removed(session: AsyncSession, event: models.OutboxEvent) -> None:
+    popular_tags_service.record_tag_usage(
+        tag_ids=[event.payload["tag_id"]],
+        post_created_at=datetime.fromisoformat(event.payload["post_created_at"]),
+        delta=-1,
+    )
+
+    await related_posts_service.refresh_related_posts(session=session, post_id=event.aggregate_id)
+
+
+async def on_post_deleted(session: AsyncSession, event: models.OutboxEvent) -> None:
+    popular_tags_service.record_tag_usage(
+        tag_ids=event.payload["tag_ids"],
+        post_created_at=datetime.fromisoformat(event.payload["created_at"]),
+        delta=-1,
+    )
+
+    await timeline_service.remove_post(
+        session=session, post_id=event.aggregate_id, author_id=event.payload["author_id"]
+    )
+
+    related_posts_service.remove_related_post(post_id=event.aggregate_id)
+
+    views_service.forget_post(post_id=event.aggregate_id)
+
+    trending_service.remove_post(post_id=event.aggregate_id)
+
+
+async def on_tag_updated(session: AsyncSession, event: models.OutboxEvent) -> None:
+    popular_tags_service.rename_tag(tag_id=event.aggregate_id, tag_name=event.payload["name"])
+
+
+async def on_tag_merged(session: AsyncSession, event: models.OutboxEvent) -> None:
+    # The usage of the merged tags moves to the target, the buckets are rebuilt from the database
+    await popular_tags_service.rebuild_popular_tags(session=session)
+
+    for post_id in event.payload["post_ids"]:
+        await related_posts_service.refresh_related_posts(session=session, post_id=post_id)
+
+
+async def on_category_posts_moved(session: AsyncSession, event: models.OutboxEvent) -> None:
+    for post_id in event.payload["post_ids"]:
+        await related_posts_service.refresh_related_posts(session=session, post_id=post_id)
+
+
+def register_subscribers() -> None:
+    """
+    Subscribes the derived data (timelines, related posts, popular tags, trending posts, views)
+    to the change events of the outbox.
+    """
+    outbox_service.subscribe("post.created", on_post_created)
+    outbox_service.subscribe("post.tags_added", on_post_tags_added)
+    outbox_service.subscribe("post.tag_removed", on_post_tag_removed)
+    outbox_service.subscribe("post.deleted", on_post_deleted)
+    outbox_service.subscribe("tag.updated", on_tag_updated)
+    outbox_service.subscribe("tag.merged", on_tag_merged)
+    outbox_service.subscribe("category.posts_moved", on_category_posts_moved)
@@ -0,0 +1,285 @@
+import logging
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import select, func, DateTime
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.conf.caching import get_redis_data
+from src.core.database import models
+from src.core.database.models.post_tag_association import post_tag_association_table
+from src.schemas.tags import TagWindow
+
+logger = logging.getLogger(__name__)
+
+WINDOW_DAYS = {TagWindow.week: 7, TagWindow.month: 30}
+
+NAMES_KEY = "tags:popular:names"
+BUILT_KEY = "tags:popular:built_at"
+REBUILD_LOCK_KEY = "tags:popular:rebuild_lock"
+REBUILD_LOCK_TIMEOUT = 300
+DAY_BUCKET_TTL = 60 * 60 * 24 * 31
+
+# Releases the lock only if it is still held by the caller (it may have expired and been taken by another worker)
+RELEASE_LOCK_SCRIPT = """
+if redis.call("GET", KEYS[1]) == ARGV[1] then
+    return redis.call("DEL", KEYS[1])
+end
+return 0
+"""
+
+
+def popular_key(window: TagWindow) -> str:
+    return f"tags:popular:{window.value}"
+
+
+def day_bucket_key(day: datetime) -> str:
+    return f"tags:usage:day:{day:%Y%m%d}"
+
+
+def record_tag_usage(
+    tag_ids: list[int], post_created_at: datetime, delta: int, tag_names: dict[int, str] | None = None
+) -> None:
+    """
+    Incrementally refreshes the tag usage aggregates after associations are inserted or deleted.
+    The rolling windows are only touched when the post is still inside of them.
+
+    Arguments:
+        tag_ids (list[int]): The tags whose associations were changed
+        post_created_at (datetime): Creation time of the post the tags belong to
+        delta (int): 1 for inserted associations, -1 for deleted ones
+        tag_names (dict[int, str] | None): Names of the tags to keep the names hash up to date
+
+    Returns:
+        None
+    """
+    redis_client = get_redis_data()
+
+    if not redis_client or not tag_ids:
+        return
+
+    now = datetime.utcnow()
+    bucket_key = day_bucket_key(post_created_at)
+    bucket_is_alive = now - post_created_at < timedelta(days=max(WINDOW_DAYS.values()))
+
+    pipe = redis_client.pipeline()
+
+    for tag_id in tag_ids:
+        pipe.zincrby(popular_key(TagWindow.all), delta, tag_id)
+
+        for window, days in WINDOW_DAYS.items():
+            if now - post_created_at < timedelta(days=days):
+                pipe.zincrby(popular_key(window), delta, tag_id)
+
+        if bucket_is_alive:
+            pipe.zincrby(bucket_key, delta, tag_id)
+
+    if bucket_is_alive:
+        pipe.expire(bucket_key, DAY_BUCKET_TTL)
+
+    for window in TagWindow:
+        pipe.zremrangebyscore(popular_key(window), "-inf", 0)
+
+    if tag_names:
+        pipe.hset(NAMES_KEY, mapping=tag_names)
+
+    pipe.execute()
+
+
+def rename_tag(tag_id: int, tag_name: str) -> None:
+    redis_client = get_redis_data()
+
+    if redis_client:
+        redis_client.hset(NAMES_KEY, tag_id, tag_name)
+
+
+def refresh_windows() -> None:
+    """
+    Recomputes the rolling windows from the per-day buckets, so the posts
+    that have aged out of a window stop counting. It does not touch Postgres.
+
+    Returns:
+        None
+    """
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return
+
+    today = datetime.utcnow()
+
+    for window, days in WINDOW_DAYS.items():
+        buckets = [day_bucket_key(today - timedelta(days=day)) for day in range(days)]
+        tmp_key = f"{popular_key(window)}:tmp"
+
+        pipe = redis_client.pipeline()
+        pipe.zunionstore(tmp_key, buckets)
+        pipe.zremrangebyscore(tmp_key, "-inf", 0)
+        pipe.execute()
+
+        if redis_client.exists(tmp_key):
+            redis_client.rename(tmp_key, popular_key(window))
+        else:
+            redis_client.delete(popular_key(window))
+
+
+async def count_tag_usage(
+    session: AsyncSession, since: datetime | None = None, limit: int | None = None
+) -> list[tuple[int, str, int]]:
+    """
+    Counts tag usage with GROUP BY over the association table.
+    It is used for the periodic rebuild and as a fallback when Redis is unavailable.
+    """
+    usage = func.count(post_tag_association_table.c.id).label("usage")
+
+    stmt = (
+        select(models.Tag.id, models.Tag.name, usage)
+        .join(post_tag_association_table, post_tag_association_table.c.tag_id == models.Tag.id)
+        .group_by(models.Tag.id, models.Tag.name)
+        .order_by(usage.desc(), models.Tag.id)
+    )
+
+    if since is not None:
+        stmt = stmt.join(
+            models.Post, models.Post.id == post_tag_association_table.c.post_id
+        ).where(models.Post.created_at >= since)
+
+    if limit is not None:
+        stmt = stmt.limit(limit)
+
+    result = await session.execute(stmt)
+    return [(tag_id, name, count) for tag_id, name, count in result.all()]
+
+
+async def rebuild_popular_tags(session: AsyncSession) -> None:
+    """
+    Rebuilds all the tag usage aggregates from Postgres.
+    The new sorted sets are built under temporary keys and renamed, so readers never see a partial set.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+
+    Returns:
+        None
+    """
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return
+
+    now = datetime.utcnow()
+    names = {}
+
+    all_time = await count_tag_usage(session=session)
+    _replace_sorted_set(redis_client, popular_key(TagWindow.all), all_time, names)
+
+    for window, days in WINDOW_DAYS.items():
+        usage = await count_tag_usage(session=session, since=now - timedelta(days=days))
+        _replace_sorted_set(redis_client, popular_key(window), usage, names)
+
+    day_stmt = (
+        select(
+            func.date_trunc("day", models.Post.created_at, type_=DateTime).label("day"),
+            post_tag_association_table.c.tag_id,
+            func.count(post_tag_association_table.c.id),
+        )
+        .join(models.Post, models.Post.id == post_tag_association_table.c.post_id)
+        .where(models.Post.created_at >= now - timedelta(days=max(WINDOW_DAYS.values())))
+        .group_by("day", post_tag_association_table.c.tag_id)
+    )
+    result = await session.execute(day_stmt)
+
+    buckets: dict[str, dict[int, int]] = {}
+    for day, tag_id, count in result.all():
+        buckets.setdefault(day_bucket_key(day), {})[tag_id] = count
+
+    pipe = redis_client.pipeline()
+    for day in range(max(WINDOW_DAYS.values()) + 1):
+        pipe.delete(day_bucket_key(now - timedelta(days=day)))
+    for bucket_key, scores in buckets.items():
+        pipe.zadd(bucket_key, scores)
+        pipe.expire(bucket_key, DAY_BUCKET_TTL)
+
+    pipe.delete(NAMES_KEY)
+    if names:
+        pipe.hset(NAMES_KEY, mapping=names)
+    pipe.set(BUILT_KEY, now.isoformat())
+    pipe.execute()
+
+    logger.info("Popular tags rebuilt: %s tags, %s day buckets", len(all_time), len(buckets))
+
+
+def _replace_sorted_set(redis_client, key: str, usage: list[tuple[int, str, int]], names: dict) -> None:
+    tmp_key = f"{key}:tmp"
+
+    pipe = redis_client.pipeline()
+    pipe.delete(tmp_key)
+
+    if usage:
+        pipe.zadd(tmp_key, {tag_id: count for tag_id, _, count in usage})
+        pipe.rename(tmp_key, key)
+    else:
+        pipe.delete(key)
+
+    pipe.execute()
+
+    names.update({tag_id: name for tag_id, name, _ in usage})
+
+
+async def count_popular_tags(session: AsyncSession, window: TagWindow, limit: int) -> list[dict]:
+    """
+    Counts the most used tags of the window in Postgres, only the top of them is returned.
+    """
+    since = None
+    if window in WINDOW_DAYS:
+        since = datetime.utcnow() - timedelta(days=WINDOW_DAYS[window])
+
+    usage = await count_tag_usage(session=session, since=since, limit=limit)
+    return [{"id": tag_id, "name": name, "post_count": count} for tag_id, name, count in usage]
+
+
+async def get_popular_tags(
+    session: AsyncSession, window: TagWindow, limit: int
+) -> list[dict]:
+    """
+    Returns the most used tags of the window from the Redis sorted set in O(log n + limit).
+    If the aggregates are missing (e.g. after a Redis restart), one worker rebuilds them under a lock
+    while the others count the top tags in Postgres, and so does every worker if Redis is not available at all.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+        window (TagWindow): The time window of the usage
+        limit (int): The number of tags to return
+
+    Returns:
+        list[dict]: id - name - post_count of the popular tags
+    """
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return await count_popular_tags(session=session, window=window, limit=limit)
+
+    if not redis_client.exists(BUILT_KEY):
+        lock_id = uuid.uuid4().hex
+
+        if not redis_client.set(REBUILD_LOCK_KEY, lock_id, nx=True, ex=REBUILD_LOCK_TIMEOUT):
+            return await count_popular_tags(session=session, window=window, limit=limit)
+
+        try:
+            await rebuild_popular_tags(session=session)
+        finally:
+            redis_client.register_script(RELEASE_LOCK_SCRIPT)(keys=[REBUILD_LOCK_KEY], args=[lock_id])
+
+    top_tags = redis_client.zrevrange(popular_key(window), 0, limit - 1, withscores=True)
+
+    if not top_tags:
+        return []
+
+    tag_ids = [int(tag_id) for tag_id, _ in top_tags]
+    names = redis_client.hmget(NAMES_KEY, tag_ids)
+
+    return [
+        {"id": tag_id, "name": name.decode(), "post_count": int(score)}
+        for tag_id, name, (_, score) in zip(tag_ids, names, top_tags)
+        if name is not None
+    ]
@@ -0,0 +1,373 @@
+import asyncio
+import json
+import logging
+import os
+import re
+import secrets
+import sys
+import threading
+import time
+import tracemalloc
+from types import FrameType
+from urllib.parse import parse_qs
+
+from fastapi import HTTPException, Request
+from fastapi.responses import JSONResponse
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.conf.config import settings
+from src.core.database.db_settings.db_helper import async_session
+from src.core.database.models.enums import Role
+from src.services.auth import auth_service
+from src.services.roles import RoleAccess
+
+logger = logging.getLogger(__name__)
+
+PROFILE_HEADER = b"x-profile"
+PROFILE_QUERY = "profile"
+
+WALL_MODE = "wall"
+MEMORY_MODE = "memory"
+
+PROFILE_ID_PATTERN = re.compile(r"^\d{14}-[0-9a-f]{8}$")
+
+# The leaf of the samples taken while the request waits (for the database, redis, a thread)
+AWAIT_FRAME = ("[await]", "", 0)
+
+TRACEMALLOC_FRAMES = 25
+
+allowed_operation_admin = RoleAccess([Role["admin"]])
+
+
+def short_path(filename: str) -> str:
+    # The files of the project relative to it, the libraries as they are
+    return os.path.relpath(filename) if filename.startswith(os.getcwd()) else filename
+
+
+def frame_key(frame: FrameType) -> tuple[str, str, int]:
+    code = frame.f_code
+    return code.co_qualname, code.co_filename, code.co_firstlineno
+
+
+def get_await_chain(coro) -> list[tuple[str, str, int]]:
+    """
+    The stack of a suspended coroutine, from the task down to the awaited future.
+    """
+    stack = []
+
+    while coro is not None:
+        frame = getattr(coro, "cr_frame", None) or getattr(coro, "gi_frame", None) or getattr(coro, "ag_frame", None)
+
+        if frame is None:
+            break
+
+        stack.append(frame_key(frame))
+        coro = getattr(coro, "cr_await", None) or getattr(coro, "gi_yieldfrom", None) or getattr(coro, "ag_await", None)
+
+    stack.append(AWAIT_FRAME)
+    return stack
+
+
+def get_thread_stack(frame: FrameType, root: FrameType | None) -> list[tuple[str, str, int]]:
+    """
+    The stack of the running thread, cut at the frame of the task, so the event loop frames are left out.
+    """
+    stack = []
+
+    while frame is not None:
+        stack.append(frame_key(frame))
+
+        if frame is root:
+            break
+
+        frame = frame.f_back
+
+    stack.reverse()
+    return stack
+
+
+class SamplingProfiler:
+    def __init__(self, task: asyncio.Task, interval: float, max_seconds: float):
+        """
+        Wall-clock sampling profiler of one request. A thread samples the stack of the event loop thread
+        while the task of the request runs, and the await chain of the task while it is suspended,
+        so the time spent waiting for I/O is attributed to the awaiting code, not to the event loop.
+
+        Arguments:
+            task (asyncio.Task): The task which serves the request
+            interval (float): The seconds between the samples
+            max_seconds (float): The sampling stops after this time
+
+        Returns:
+            None
+        """
+        self.task = task
+        self.interval = interval
+        self.max_seconds = max_seconds
+        self.thread_id = threading.get_ident()
+        self.samples: list[list[tuple[str, str, int]]] = []
+        self.weights: list[float] = []
+        self.stopped = threading.Event()
+        self.thread = threading.Thread(target=self.run, name="request-profiler", daemon=True)
+        self.started_at = 0.0
+        self.duration = 0.0
+        self.switch_interval = sys.getswitchinterval()
+
+    def start(self) -> None:
+        # The sampler waits for the GIL held by the event loop, it is handed over as often as the samples are taken
+        sys.setswitchinterval(min(self.switch_interval, self.interval))
+        self.started_at = time.perf_counter()
+        self.thread.start()
+
+    def stop(self) -> None:
+        self.stopped.set()
+        self.thread.join()
+        self.duration = time.perf_counter() - self.started_at
+        sys.setswitchinterval(self.switch_interval)
+
+    def sample(self) -> list[tuple[str, str, int]] | None:
+        coro = self.task.get_coro()
+
+        if coro is None or self.task.done():
+            return None
+
+        if getattr(coro, "cr_running", False):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is not None:
+                return get_thread_stack(frame=frame, root=coro.cr_frame)
+
+        return get_await_chain(coro)
+
+    def run(self) -> None:
+        last = time.perf_counter()
+        deadline = last + self.max_seconds
+
+        while not self.stopped.wait(self.interval):
+            now = time.perf_counter()
+
+            if now > deadline:
+                return
+
+            stack = self.sample()
+            if stack:
+                self.samples.append(stack)
+                self.weights.append((now - last) * 1000)
+
+            last = now
+
+    def to_speedscope(self, name: str) -> dict:
+        """
+        The samples in the speedscope format (https://www.speedscope.app), the weights are milliseconds.
+        """
+        frames: dict[tuple[str, str, int], int] = {}
+        samples = [[frames.setdefault(key, len(frames)) for key in stack] for stack in self.samples]
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "activeProfileIndex": 0,
+            "exporter": "blog-api",
+            "shared": {
+                "frames": [
+                    {"name": function, "file": short_path(file) if file else "", "line": line}
+                    for function, file, line in frames
+                ]
+            },
+            "profiles": [{
+                "type": "sampled",
+                "name": name,
+                "unit": "milliseconds",
+                "startValue": 0,
+                "endValue": sum(self.weights),
+                "samples": samples,
+                "weights": self.weights,
+            }],
+        }
+
+
+def get_top_allocations(before: tracemalloc.Snapshot, after: tracemalloc.Snapshot, limit: int) -> list[dict]:
+    # The samples of the profiler are not the allocations of the request
+    filters = [tracemalloc.Filter(False, __file__), tracemalloc.Filter(False, tracemalloc.__file__)]
+    statistics = after.filter_traces(filters).compare_to(before.filter_traces(filters), "lineno")
+
+    return [
+        {
+            "file": short_path(statistic.traceback[0].filename),
+            "line": statistic.traceback[0].lineno,
+            "size_diff": statistic.size_diff,
+            "count_diff": statistic.count_diff,
+        }
+        for statistic in statistics[:limit]
+        if statistic.size_diff > 0
+    ]
+
+
+def get_profile_modes(scope: Scope) -> set[str] | None:
+    """
+    The modes requested by the X-Profile header or the profile query parameter (wall, memory), None without them.
+    """
+    value = None
+
+    for header, header_value in scope["headers"]:
+        if header == PROFILE_HEADER:
+            value = header_value.decode("latin-1")
+            break
+
+    if value is None and b"profile=" in scope["query_string"]:
+        values = parse_qs(scope["query_string"].decode("latin-1")).get(PROFILE_QUERY)
+        value = values[0] if values else None
+
+    if value is None:
+        return None
+
+    modes = {mode.strip().lower() for mode in value.split(",") if mode.strip()}
+    return (modes & {WALL_MODE, MEMORY_MODE}) | {WALL_MODE}
+
+
+def get_profile_path(profile_id: str, suffix: str) -> str:
+    return os.path.join(settings.profiler_dir, f"{profile_id}.{suffix}.json")
+
+
+def write_profile(profile_id: str, suffix: str, data: dict) -> None:
+    os.makedirs(settings.profiler_dir, exist_ok=True)
+
+    with open(get_profile_path(profile_id=profile_id, suffix=suffix), "w", encoding="utf-8") as file:
+        json.dump(data, file, separators=(",", ":"))
+
+
+def read_profile(profile_id: str, suffix: str) -> dict | None:
+    if not PROFILE_ID_PATTERN.match(profile_id):
+        return None
+
+    try:
+        with open(get_profile_path(profile_id=profile_id, suffix=suffix), encoding="utf-8") as file:
+            return json.load(file)
+    except FileNotFoundError:
+        return None
+
+
+async def authorize(scope: Scope) -> None:
+    """
+    Lets only the admins profile the requests, by the same access token and role check as the admin endpoints.
+    """
+    request = Request(scope)
+
+    async with async_session() as session:
+        token = await auth_service.oauth2_scheme(request)
+        current_author = await auth_service.get_current_author(session=session, token=token)
+
+    await allowed_operation_admin(request=request, current_author=current_author)
+
+
+class ProfilerMiddleware:
+    def __init__(self, app: ASGIApp):
+        """
+        Profiles a single request of an admin on demand, when it carries the X-Profile header
+        or the profile query parameter (wall, or wall,memory for the allocations too).
+        The profile is stored in PROFILER_DIR and its id is returned in the X-Profile-Id header,
+        it is downloaded from /api/v1/profiler/{profile_id}. The other requests only have their headers checked.
+
+        Arguments:
+            app (ASGIApp): The application
+
+        Returns:
+            None
+        """
+        self.app = app
+        # One profile at a time per worker: the allocations are traced for the whole process
+        self.lock = asyncio.Lock()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        modes = get_profile_modes(scope)
+
+        if modes is None:
+            await self.app(scope, receive, send)
+            return
+
+        try:
+            await authorize(scope)
+        except HTTPException as error:
+            response = JSONResponse({"detail": error.detail}, status_code=error.status_code, headers=error.headers)
+            await response(scope, receive, send)
+            return
+
+        if self.lock.locked():
+            response = JSONResponse({"detail": "Another request is being profiled"}, status_code=409)
+            await response(scope, receive, send)
+            return
+
+        async with self.lock:
+            await self.profile(scope, receive, send, modes=modes)
+
+    async def profile(self, scope: Scope, receive: Receive, send: Send, modes: set[str]) -> None:
+        profile_id = f"{time.strftime('%Y%m%d%H%M%S')}-{secrets.token_hex(4)}"
+
+        async def profiled_send(message: Message) -> None:
+            if message["type"] == "http.response.start":
+                message["headers"] = [*message.get("headers", []), (b"x-profile-id", profile_id.encode())]
+
+            await send(message)
+
+        started_tracemalloc = False
+        before = None
+
+        if MEMORY_MODE in modes:
+            if not tracemalloc.is_tracing():
+                tracemalloc.start(TRACEMALLOC_FRAMES)
+                started_tracemalloc = True
+            before = tracemalloc.take_snapshot()
+
+        profiler = SamplingProfiler(
+            task=asyncio.current_task(),
+            interval=settings.profiler_interval_ms / 1000,
+            max_seconds=settings.profiler_max_seconds,
+        )
+        profiler.start()
+
+        try:
+            await self.app(scope, receive, profiled_send)
+        finally:
+            profiler.stop()
+
+            after = tracemalloc.take_snapshot() if before is not None else None
+
+            if started_tracemalloc:
+                tracemalloc.stop()
+
+            name = f"{scope['method']} {scope['path']}"
+
+            try:
+                await asyncio.to_thread(
+                    self.store, profile_id=profile_id, name=name, profiler=profiler, before=before, after=after
+                )
+            except Exception as error:
+                logger.error("Unable to store the profile %s: %s", profile_id, str(error))
+
+    @staticmethod
+    def store(
+        profile_id: str,
+        name: str,
+        profiler: SamplingProfiler,
+        before: tracemalloc.Snapshot | None,
+        after: tracemalloc.Snapshot | None,
+    ) -> None:
+        write_profile(profile_id=profile_id, suffix="speedscope", data=profiler.to_speedscope(name=name))
+
+        if before is not None and after is not None:
+            write_profile(
+                profile_id=profile_id,
+                suffix="allocations",
+                data={
+                    "name": name,
+                    "duration_ms": profiler.duration * 1000,
+                    # The allocations of the other requests served meanwhile by the worker are included
+                    "top": get_top_allocations(before=before, after=after, limit=settings.profiler_top_allocations),
+                },
+            )
+
+        logger.info("Profiled %s in %.1f ms (%s samples): %s", name, profiler.duration * 1000,
+                    len(profiler.samples), profile_id)
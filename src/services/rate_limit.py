@@ -0,0 +1,175 @@
+import math
+import time
+import logging
+import threading
+
+from fastapi import HTTPException, Request, Depends, status
+from fastapi.security import OAuth2PasswordRequestForm
+
+from src.core.conf.caching import get_redis_data
+
+logger = logging.getLogger(__name__)
+
+# Budgets of every route class: scope -> (capacity, period in seconds).
+# The bucket holds up to capacity tokens and refills at capacity / period tokens per second.
+RATE_LIMITS = {
+    "login": {"ip": (10, 60), "account": (5, 300), "global": (100, 1)},
+    "register": {"ip": (5, 3600), "global": (20, 1)},
+}
+
+# Token buckets for all the scopes of a request are checked and consumed atomically:
+# the request takes one token from each bucket only if every bucket has one.
+# Returns 0 if allowed, otherwise the number of milliseconds to wait.
+TOKEN_BUCKET_SCRIPT = """
+local now_parts = redis.call("TIME")
+local now = tonumber(now_parts[1]) * 1000 + math.floor(tonumber(now_parts[2]) / 1000)
+local wait = 0
+local states = {}
+
+for index, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[index * 2 - 1])
+    local rate = tonumber(ARGV[index * 2]) / 1000
+    local bucket = redis.call("HMGET", key, "tokens", "ts")
+    local tokens = tonumber(bucket[1]) or capacity
+    local ts = tonumber(bucket[2]) or now
+
+    tokens = math.min(capacity, tokens + (now - ts) * rate)
+    states[index] = tokens
+
+    if tokens < 1 then
+        wait = math.max(wait, math.ceil((1 - tokens) / rate))
+    end
+end
+
+for index, key in ipairs(KEYS) do
+    local capacity = tonumber(ARGV[index * 2 - 1])
+    local rate = tonumber(ARGV[index * 2]) / 1000
+    local tokens = states[index]
+
+    if wait == 0 then
+        tokens = tokens - 1
+    end
+
+    redis.call("HSET", key, "tokens", tostring(tokens), "ts", now)
+    redis.call("PEXPIRE", key, math.ceil(capacity / rate))
+end
+
+return wait
+"""
+
+
+class InProcessTokenBuckets:
+    def __init__(self, max_size: int = 100_000):
+        """
+        Fallback token buckets kept in the worker memory while Redis is unavailable.
+        The limits become per worker, which is still enough to keep the hashing CPU bounded.
+
+        Arguments:
+            max_size (int): The number of buckets after which the full buckets are evicted
+
+        Returns:
+            None
+        """
+        self.max_size = max_size
+        self.buckets: dict[str, tuple[float, float]] = {}
+        self.lock = threading.Lock()
+
+    def acquire(self, limits: list[tuple[str, int, float]]) -> float:
+        now = time.monotonic()
+
+        with self.lock:
+            if len(self.buckets) > self.max_size:
+                self._evict(now=now)
+
+            wait = 0.0
+            states = []
+
+            for key, capacity, rate in limits:
+                tokens, ts = self.buckets.get(key, (capacity, now))
+                tokens = min(capacity, tokens + (now - ts) * rate)
+                states.append(tokens)
+
+                if tokens < 1:
+                    wait = max(wait, (1 - tokens) / rate)
+
+            for (key, _, _), tokens in zip(limits, states):
+                self.buckets[key] = (tokens - 1 if not wait else tokens, now)
+
+            return wait
+
+    def _evict(self, now: float) -> None:
+        # Buckets idle for more than an hour are full again for any of the configured budgets
+        self.buckets = {
+            key: (tokens, ts) for key, (tokens, ts) in self.buckets.items() if now - ts < 3600
+        }
+
+
+in_process_buckets = InProcessTokenBuckets()
+
+
+class RateLimiter:
+    def __init__(self, route_class: str):
+        """
+        Dependency which limits the requests of a route class per IP, per account and globally.
+        It runs before the route handler, so the rejected requests never reach the password hashing.
+
+        Arguments:
+            route_class (str): The key of the budgets in RATE_LIMITS
+
+        Returns:
+            None
+        """
+        self.route_class = route_class
+        self.budgets = RATE_LIMITS[route_class]
+
+    def get_identities(self, request: Request, account: str | None = None) -> dict[str, str]:
+        identities = {"global": "all"}
+
+        if "ip" in self.budgets:
+            identities["ip"] = request.client.host if request.client else "unknown"
+
+        if "account" in self.budgets and account:
+            identities["account"] = account.lower()
+
+        return identities
+
+    def check(self, request: Request, account: str | None = None) -> None:
+        limits = []
+
+        for scope, identity in self.get_identities(request=request, account=account).items():
+            capacity, period = self.budgets[scope]
+            key = f"ratelimit:{self.route_class}:{scope}:{identity}"
+            limits.append((key, capacity, capacity / period))
+
+        redis_client = get_redis_data()
+        wait = None
+
+        if redis_client:
+            try:
+                token_bucket = redis_client.register_script(TOKEN_BUCKET_SCRIPT)
+                wait_ms = token_bucket(
+                    keys=[key for key, _, _ in limits],
+                    args=[value for _, capacity, rate in limits for value in (capacity, rate)],
+                )
+                wait = wait_ms / 1000
+            except Exception as error:
+                logger.error("Unable to check the rate limit in Redis: %s", str(error))
+
+        if wait is None:
+            wait = in_process_buckets.acquire(limits=limits)
+
+        if wait > 0:
+            logger.warning("Rate limit exceeded for %s: %s", self.route_class, request.url.path)
+            raise HTTPException(
+                status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+                detail="Too many requests, try again later",
+                headers={"Retry-After": str(math.ceil(wait))},
+            )
+
+    async def __call__(self, request: Request) -> None:
+        self.check(request=request)
+
+
+class LoginRateLimiter(RateLimiter):
+    async def __call__(self, request: Request, form_data: OAuth2PasswordRequestForm = Depends()) -> None:
+        self.check(request=request, account=form_data.username)
@@ -0,0 +1,280 @@
+import math
+import logging
+
+from sqlalchemy import select, func, desc
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.conf.caching import get_redis_data
+from src.core.conf.config import settings
+from src.core.database import models
+from src.core.database.models.post_tag_association import post_tag_association_table
+
+logger = logging.getLogger(__name__)
+
+CATEGORY_CANDIDATES_LIMIT = 100
+TAG_CANDIDATES_LIMIT = 500
+
+
+def related_key(post_id: int) -> str:
+    return f"related:{post_id}"
+
+
+def idf(tag_post_count: int, total_posts: int) -> float:
+    return math.log(1 + total_posts / (1 + tag_post_count))
+
+
+def similarity(
+    tags: set[int], other_tags: set[int], tag_weights: dict[int, float], same_category: bool
+) -> float:
+    """
+    IDF weighted Jaccard similarity of two tag sets plus a bonus for the same category.
+    Rare tags weigh more than the tags used by almost every post.
+    """
+    score = settings.related_posts_category_weight if same_category else 0.0
+
+    union = sum(tag_weights.get(tag_id, 0.0) for tag_id in tags | other_tags)
+
+    if union:
+        intersection = sum(tag_weights.get(tag_id, 0.0) for tag_id in tags & other_tags)
+        score += intersection / union
+
+    return score
+
+
+async def refresh_related_posts(session: AsyncSession, post_id: int) -> None:
+    """
+    Recomputes the related posts of one post after its tags or category were changed.
+    The post is also added to (or removed from) the lists of the posts it is related to,
+    so the index stays symmetric without a full rebuild.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+        post_id (int): The changed post
+
+    Returns:
+        None
+    """
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return
+
+    # Only the category of the post is needed, not its content and eager relations
+    category_id = (
+        await session.execute(select(models.Post.category_id).where(models.Post.id == post_id))
+    ).scalar_one_or_none()
+
+    if category_id is None:
+        return
+
+    result = await session.execute(
+        select(post_tag_association_table.c.tag_id)
+        .where(post_tag_association_table.c.post_id == post_id)
+    )
+    tags = set(result.scalars().all())
+
+    # The posts sharing the most tags (the most recent first among equals), not every post with a common tag
+    shared_tags = func.count(post_tag_association_table.c.tag_id)
+    tag_candidates = (
+        select(post_tag_association_table.c.post_id)
+        .where(
+            post_tag_association_table.c.tag_id.in_(tags),
+            post_tag_association_table.c.post_id != post_id,
+        )
+        .group_by(post_tag_association_table.c.post_id)
+        .order_by(desc(shared_tags), desc(post_tag_association_table.c.post_id))
+        .limit(TAG_CANDIDATES_LIMIT)
+    )
+    category_candidates = (
+        select(models.Post.id)
+        .where(models.Post.category_id == category_id, models.Post.id != post_id)
+        .order_by(desc(models.Post.created_at))
+        .limit(CATEGORY_CANDIDATES_LIMIT)
+    )
+
+    candidate_ids = set((await session.execute(tag_candidates)).scalars().all())
+    candidate_ids.update((await session.execute(category_candidates)).scalars().all())
+
+    result = await session.execute(
+        select(models.Post.id, models.Post.category_id).where(models.Post.id.in_(candidate_ids))
+    )
+    categories = dict(result.all())
+
+    result = await session.execute(
+        select(post_tag_association_table.c.post_id, post_tag_association_table.c.tag_id)
+        .where(post_tag_association_table.c.post_id.in_(candidate_ids))
+    )
+    candidate_tags: dict[int, set[int]] = {candidate_id: set() for candidate_id in categories}
+    for candidate_id, tag_id in result.all():
+        candidate_tags[candidate_id].add(tag_id)
+
+    all_tags = tags.union(*candidate_tags.values())
+
+    total_posts = (await session.execute(select(func.count(models.Post.id)))).scalar_one()
+    result = await session.execute(
+        select(models.Tag.id, models.Tag.post_count).where(models.Tag.id.in_(all_tags))
+    )
+    tag_weights = {tag_id: idf(count, total_posts) for tag_id, count in result.all()}
+
+    scores = {
+        candidate_id: similarity(
+            tags=tags,
+            other_tags=other_tags,
+            tag_weights=tag_weights,
+            same_category=categories[candidate_id] == category_id,
+        )
+        for candidate_id, other_tags in candidate_tags.items()
+    }
+    scores = {candidate_id: score for candidate_id, score in scores.items() if score > 0}
+
+    limit = settings.related_posts_limit
+    key = related_key(post_id)
+    previous_ids = {int(related_id) for related_id in redis_client.zrange(key, 0, -1)}
+
+    pipe = redis_client.pipeline()
+    pipe.delete(key)
+
+    if scores:
+        pipe.zadd(key, scores)
+        pipe.zremrangebyrank(key, 0, -limit - 1)
+
+    for candidate_id, score in scores.items():
+        pipe.zadd(related_key(candidate_id), {post_id: score})
+        pipe.zremrangebyrank(related_key(candidate_id), 0, -limit - 1)
+
+    for related_id in previous_ids - scores.keys():
+        pipe.zrem(related_key(related_id), post_id)
+
+    pipe.execute()
+
+
+def remove_related_post(post_id: int) -> None:
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return
+
+    key = related_key(post_id)
+
+    pipe = redis_client.pipeline()
+    for related_id in redis_client.zrange(key, 0, -1):
+        pipe.zrem(related_key(int(related_id)), post_id)
+    pipe.delete(key)
+    pipe.execute()
+
+
+def get_related_post_ids(post_id: int) -> list[int]:
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return []
+
+    return [int(related_id) for related_id in redis_client.zrevrange(related_key(post_id), 0, -1)]
+
+
+async def rebuild_related_posts(session: AsyncSession) -> int:
+    """
+    Rebuilds the whole related posts index in batch.
+    The tag overlap of all the post pairs is one sparse matrix product (posts x tags) * (tags x posts),
+    so only the pairs which share at least one tag are ever materialized.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+
+    Returns:
+        int: The number of indexed posts
+    """
+    import numpy as np
+    from scipy import sparse
+
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return 0
+
+    result = await session.execute(
+        select(models.Post.id, models.Post.category_id).order_by(desc(models.Post.created_at))
+    )
+    posts = result.all()
+
+    if not posts:
+        return 0
+
+    post_ids = np.array([post_id for post_id, _ in posts])
+    post_categories = np.array([category_id for _, category_id in posts])
+    post_index = {post_id: index for index, post_id in enumerate(post_ids.tolist())}
+
+    result = await session.execute(
+        select(post_tag_association_table.c.post_id, post_tag_association_table.c.tag_id)
+    )
+    associations = [
+        (post_index[post_id], tag_id) for post_id, tag_id in result.all() if post_id in post_index
+    ]
+
+    tag_ids = sorted({tag_id for _, tag_id in associations})
+    tag_index = {tag_id: index for index, tag_id in enumerate(tag_ids)}
+
+    rows = np.array([row for row, _ in associations], dtype=np.int64)
+    columns = np.array([tag_index[tag_id] for _, tag_id in associations], dtype=np.int64)
+
+    tagged = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, columns)), shape=(len(post_ids), len(tag_ids))
+    )
+
+    document_frequency = np.asarray(tagged.sum(axis=0)).ravel()
+    weights = np.log(1 + len(post_ids) / (1 + document_frequency))
+
+    weighted = tagged.multiply(weights).tocsr()
+    post_weights = np.asarray(weighted.sum(axis=1)).ravel()
+
+    intersection = (weighted @ tagged.T).tocoo()
+    mask = intersection.row != intersection.col
+    pair_rows, pair_columns = intersection.row[mask], intersection.col[mask]
+
+    union = post_weights[pair_rows] + post_weights[pair_columns] - intersection.data[mask]
+    scores = intersection.data[mask] / union
+    scores += settings.related_posts_category_weight * (
+        post_categories[pair_rows] == post_categories[pair_columns]
+    )
+
+    similar = sparse.csr_matrix(
+        (scores, (pair_rows, pair_columns)), shape=(len(post_ids), len(post_ids))
+    )
+
+    category_members: dict[int, list[int]] = {}
+    for index, category_id in enumerate(post_categories.tolist()):
+        members = category_members.setdefault(category_id, [])
+        if len(members) < CATEGORY_CANDIDATES_LIMIT:
+            members.append(index)
+
+    limit = settings.related_posts_limit
+
+    pipe = redis_client.pipeline(transaction=False)
+
+    for index, post_id in enumerate(post_ids.tolist()):
+        start, end = similar.indptr[index], similar.indptr[index + 1]
+        row_columns, row_scores = similar.indices[start:end], similar.data[start:end]
+
+        if len(row_scores) > limit:
+            top = np.argpartition(-row_scores, limit)[:limit]
+            row_columns, row_scores = row_columns[top], row_scores[top]
+
+        related = dict(zip(post_ids[row_columns].tolist(), row_scores.tolist()))
+
+        # Posts without enough shared tags are padded with the recent posts of the same category
+        for member in category_members[post_categories[index]]:
+            if len(related) >= limit:
+                break
+            if member != index and post_ids[member] not in related:
+                related[int(post_ids[member])] = settings.related_posts_category_weight
+
+        key = related_key(post_id)
+        pipe.delete(key)
+        if related:
+            pipe.zadd(key, related)
+
+    pipe.execute()
+
+    logger.info("Related posts rebuilt for %s posts", len(post_ids))
+
+    return len(post_ids)
@@ -0,0 +1,229 @@
+import math
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Callable
+
+from src.core.conf.caching import get_redis_data
+from src.core.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+
+class BloomFilter:
+    def __init__(self, capacity: int, error_rate: float):
+        """
+        Probabilistic set: contains() never answers False for an added item
+        and answers True for a missing one with the probability of about error_rate.
+
+        Arguments:
+            capacity (int): The expected number of items
+            error_rate (float): The false positive rate at the capacity
+
+        Returns:
+            None
+        """
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hash_count = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray(math.ceil(self.size / 8))
+        # The items are added both by the request handlers and by the pub/sub thread
+        self.lock = threading.Lock()
+
+    def _positions(self, item: str):
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        first, second = int.from_bytes(digest[:8], "big"), int.from_bytes(digest[8:], "big")
+        return ((first + index * second) % self.size for index in range(self.hash_count))
+
+    def add(self, item: str) -> None:
+        with self.lock:
+            for position in self._positions(item):
+                self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+
+class RevocationList:
+    KEY_PREFIX = "revoked:"
+    CHANNEL = "revocations"
+
+    def __init__(
+        self,
+        get_client: Callable = get_redis_data,
+        capacity: int = settings.revocation_bloom_capacity,
+        error_rate: float = 0.001,
+    ):
+        """
+        Denylist of the revoked access tokens.
+        The entries are kept in Redis until the revoked tokens expire, and mirrored into an in-process
+        Bloom filter which is synced by pub/sub, so checking a token which is not revoked
+        (the common case) needs no network I/O at all.
+
+        The entries are either single tokens (jti:<jti>) or all the tokens of an author
+        issued before the revocation (author:<author_id>, e.g. after a role or password change).
+
+        Arguments:
+            get_client (Callable): Returns a Redis client or None
+            capacity (int): The expected number of revoked entries at the same time
+            error_rate (float): The false positive rate of the Bloom filter
+
+        Returns:
+            None
+        """
+        self.get_client = get_client
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.bloom = BloomFilter(capacity=capacity, error_rate=error_rate)
+        self.ready = False
+        self.pubsub_thread = None
+
+    def load(self) -> None:
+        """
+        Rebuilds the Bloom filter from Redis, which also drops the expired entries from it.
+        """
+        redis_client = self.get_client()
+
+        if not redis_client:
+            self.ready = False
+            return
+
+        bloom = BloomFilter(capacity=self.capacity, error_rate=self.error_rate)
+
+        for key in redis_client.scan_iter(match=f"{self.KEY_PREFIX}*", count=1000):
+            bloom.add(key.decode()[len(self.KEY_PREFIX):])
+
+        self.bloom = bloom
+        self.ready = True
+
+    def start(self) -> None:
+        redis_client = self.get_client()
+
+        if not redis_client:
+            logger.error("Revocation list is not synced, Redis is unavailable")
+            return
+
+        try:
+            pubsub = redis_client.pubsub(ignore_subscribe_messages=True)
+            pubsub.subscribe(**{self.CHANNEL: self._on_message})
+            self.pubsub_thread = pubsub.run_in_thread(
+                sleep_time=1, daemon=True, exception_handler=self._on_pubsub_error
+            )
+
+            # Loaded after subscribing, so no entry published in between is missed
+            self.load()
+        except Exception as error:
+            logger.error("Unable to sync the revocation list: %s", str(error))
+            self.stop()
+
+    def stop(self) -> None:
+        if self.pubsub_thread:
+            self.pubsub_thread.stop()
+            self.pubsub_thread = None
+
+        self.ready = False
+
+    def _on_pubsub_error(self, error: BaseException, pubsub, thread) -> None:
+        # The messages published from now on are missed: the tokens are checked in Redis until the resync
+        logger.error("Revocation list is not synced, the subscription failed: %s", str(error))
+        self.ready = False
+        thread.stop()
+
+    def is_synced(self) -> bool:
+        return self.ready and self.pubsub_thread is not None and self.pubsub_thread.is_alive()
+
+    def resync(self) -> None:
+        """
+        Subscribes again and reloads the filter after the subscription was lost (or never started).
+        """
+        self.stop()
+        self.start()
+
+    def _on_message(self, message: dict) -> None:
+        self.bloom.add(message["data"].decode())
+
+    def _revoke(self, entry: str, value: int | float, ttl: int) -> None:
+        # The entry is added locally at once, the other workers receive it from the channel
+        self.bloom.add(entry)
+
+        redis_client = self.get_client()
+
+        if not redis_client:
+            logger.error("Unable to revoke %s, Redis is unavailable", entry)
+            return
+
+        pipe = redis_client.pipeline()
+        pipe.set(f"{self.KEY_PREFIX}{entry}", value, ex=max(1, ttl))
+        pipe.publish(self.CHANNEL, entry)
+        pipe.execute()
+
+    def revoke_token(self, jti: str, expires_at: int) -> None:
+        self._revoke(entry=f"jti:{jti}", value=1, ttl=expires_at - int(time.time()))
+
+    def revoke_author(self, author_id: int) -> None:
+        """
+        Revokes all the access tokens of the author issued until now.
+        """
+        self._revoke(
+            entry=f"author:{author_id}",
+            value=time.time(),
+            ttl=settings.access_token_expire_minutes * 60,
+        )
+
+    def is_revoked(self, jti: str, author_id: int, issued_at: float) -> bool | None:
+        """
+        Checks the token against the denylist.
+
+        Arguments:
+            jti (str): The token id
+            author_id (int): The author of the token
+            issued_at (float): The time the token was issued (iat)
+
+        Returns:
+            bool | None: Whether the token is revoked, None if it cannot be known (the list is not synced
+            and Redis is unavailable)
+        """
+        jti_entry, author_entry = f"jti:{jti}", f"author:{author_id}"
+
+        if self.ready and jti_entry not in self.bloom and author_entry not in self.bloom:
+            return False
+
+        redis_client = self.get_client()
+
+        if not redis_client:
+            return None
+
+        revoked_token, revoked_before = redis_client.mget(
+            f"{self.KEY_PREFIX}{jti_entry}", f"{self.KEY_PREFIX}{author_entry}"
+        )
+
+        return bool(revoked_token) or (revoked_before is not None and issued_at <= float(revoked_before))
+
+    async def run_reloader(
+        self,
+        interval: int = settings.revocation_reload_interval_seconds,
+        resync_interval: int = settings.revocation_resync_interval_seconds,
+    ) -> None:
+        """
+        Background task rebuilding the Bloom filter every interval seconds until it is cancelled.
+        It drops the expired entries and repairs the filter if some pub/sub messages were lost.
+        A lost subscription (a Redis failure stops the pub/sub thread) is restored within resync_interval seconds.
+        """
+        reloaded_at = time.monotonic()
+
+        while True:
+            await asyncio.sleep(resync_interval)
+
+            try:
+                if not self.is_synced():
+                    self.resync()
+                    reloaded_at = time.monotonic()
+                elif time.monotonic() - reloaded_at >= interval:
+                    self.load()
+                    reloaded_at = time.monotonic()
+            except Exception as error:
+                logger.error("Unable to reload the revocation list: %s", str(error))
+
+
+revocation_list = RevocationList()
@@ -1,7 +1,7 @@
 from fastapi import Depends, HTTPException, status, Request
 
-from src.core.database.models import Author
 from src.core.database.models.enums import Role
+from src.schemas.authors import AuthorClaims
 
 from src.services.auth import auth_service
 
@@ -21,7 +21,7 @@ class RoleAccess:
         """
         self.allowed_roles = allowed_roles
 
-    async def __call__(self, request: Request, current_author: Author = Depends(auth_service.get_current_author)):
+    async def __call__(self, request: Request, current_author: AuthorClaims = Depends(auth_service.get_current_author)):
         """
         The __call__ function is the function that will be called when a user tries to access an endpoint.
         It takes in two arguments: request and current_author. The request argument is the Request object, which contains
@@ -30,7 +30,7 @@ class RoleAccess:
         auth_service's getCurrentAuthor() function and pass its return value as an argument to __call__.
 
         Arguments:
-            current_author (Author): Get the current author from the auth_service
+            current_author (AuthorClaims): Get the current author from the claims of the access token
             request (Request): Get the request object
 
         Returns:
@@ -1,11 +1,21 @@
-from passlib.context import CryptContext
+from functools import lru_cache
 
-bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+from src.core.conf.tracing import tracer
+
+
+@lru_cache(maxsize=None)
+def get_bcrypt_context():
+    # passlib (with the bcrypt backend) is imported on the first use, not at the startup
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 
 def get_password_hash(password: str) -> str:
-    return bcrypt_context.hash(password)
+    with tracer.span("bcrypt.hash"):
+        return get_bcrypt_context().hash(password)
 
 
 def verify_password(plain_password: str, hashed_password: str) -> str:
-    return bcrypt_context.verify(plain_password, hashed_password)
+    with tracer.span("bcrypt.verify"):
+        return get_bcrypt_context().verify(plain_password, hashed_password)
@@ -0,0 +1,169 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime, timezone
+from functools import lru_cache
+
+from src.core.conf.config import settings
+
+LOCAL_STORAGE = "local"
+S3_STORAGE = "s3"
+
+
+class LocalStorage:
+    def __init__(self, root: str):
+        """
+        The files in a local directory, shared by the workers of one node.
+
+        Arguments:
+            root (str): The directory of the files
+
+        Returns:
+            None
+        """
+        self.root = root
+
+    def get_path(self, key: str) -> str:
+        return os.path.join(self.root, *key.split("/"))
+
+    def get_url(self, key: str) -> str | None:
+        # Served by the app (or by the proxy) from the path
+        return None
+
+    def write(self, key: str, data: bytes) -> None:
+        path = self.get_path(key)
+        directory = os.path.dirname(path)
+        os.makedirs(directory, exist_ok=True)
+
+        # Written next to the target and renamed over it, so a reader never sees a partial file
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".upload-")
+        try:
+            with os.fdopen(fd, "wb") as temp_file:
+                temp_file.write(data)
+                temp_file.flush()
+                os.fsync(temp_file.fileno())
+            os.chmod(temp_path, 0o644)
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+    async def save(self, key: str, data: bytes, content_type: str) -> None:
+        await asyncio.to_thread(self.write, key, data)
+
+    async def exists(self, key: str) -> bool:
+        return await asyncio.to_thread(os.path.isfile, self.get_path(key))
+
+    async def delete(self, key: str) -> None:
+        try:
+            await asyncio.to_thread(os.unlink, self.get_path(key))
+        except FileNotFoundError:
+            pass
+
+    def scan(self, prefix: str) -> list[tuple[str, datetime]]:
+        directory = self.get_path(prefix)
+
+        if not os.path.isdir(directory):
+            return []
+
+        return [
+            (f"{prefix}/{entry.name}", datetime.fromtimestamp(entry.stat().st_mtime, tz=timezone.utc))
+            for entry in os.scandir(directory)
+            if entry.is_file() and not entry.name.startswith(".")
+        ]
+
+    async def list(self, prefix: str) -> list[tuple[str, datetime]]:
+        return await asyncio.to_thread(self.scan, prefix)
+
+
+class S3Storage:
+    def __init__(self, bucket: str, prefix: str = "", endpoint_url: str = "", region: str = ""):
+        """
+        The objects in an S3-compatible bucket (AWS S3, MinIO), shared by all the nodes.
+        The credentials are read by boto3 from the environment (AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY).
+
+        Arguments:
+            bucket (str): The name of the bucket
+            prefix (str): The prefix of the keys in the bucket
+            endpoint_url (str): The URL of an S3-compatible server, AWS S3 by default
+            region (str): The region of the bucket
+
+        Returns:
+            None
+        """
+        # boto3 is needed only with this backend: poetry install --with s3
+        import boto3
+
+        self.bucket = bucket
+        self.prefix = prefix.strip("/") + "/" if prefix.strip("/") else ""
+        self.client = boto3.client("s3", endpoint_url=endpoint_url or None, region_name=region or None)
+
+    def get_path(self, key: str) -> str | None:
+        return None
+
+    def get_url(self, key: str) -> str | None:
+        if settings.storage_s3_public_url:
+            return f"{settings.storage_s3_public_url.rstrip('/')}/{self.prefix}{key}"
+
+        return self.client.generate_presigned_url(
+            "get_object",
+            Params={"Bucket": self.bucket, "Key": self.prefix + key},
+            ExpiresIn=settings.storage_s3_url_expire_seconds,
+        )
+
+    async def save(self, key: str, data: bytes, content_type: str) -> None:
+        # A PUT is atomic, the object is visible whole or not at all
+        await asyncio.to_thread(
+            self.client.put_object,
+            Bucket=self.bucket,
+            Key=self.prefix + key,
+            Body=data,
+            ContentType=content_type,
+            CacheControl="public, max-age=31536000, immutable",
+        )
+
+    async def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            await asyncio.to_thread(self.client.head_object, Bucket=self.bucket, Key=self.prefix + key)
+        except ClientError as error:
+            if error.response["Error"]["Code"] in ("404", "NoSuchKey", "NotFound"):
+                return False
+            raise
+
+        return True
+
+    async def delete(self, key: str) -> None:
+        await asyncio.to_thread(self.client.delete_object, Bucket=self.bucket, Key=self.prefix + key)
+
+    def scan(self, prefix: str) -> list[tuple[str, datetime]]:
+        paginator = self.client.get_paginator("list_objects_v2")
+
+        return [
+            (item["Key"].removeprefix(self.prefix), item["LastModified"])
+            for page in paginator.paginate(Bucket=self.bucket, Prefix=f"{self.prefix}{prefix}/")
+            for item in page.get("Contents", [])
+        ]
+
+    async def list(self, prefix: str) -> list[tuple[str, datetime]]:
+        return await asyncio.to_thread(self.scan, prefix)
+
+
+@lru_cache
+def get_storage() -> LocalStorage | S3Storage:
+    """
+    The storage of the uploaded files chosen by STORAGE_BACKEND.
+    """
+    if settings.storage_backend == S3_STORAGE:
+        return S3Storage(
+            bucket=settings.storage_s3_bucket,
+            prefix=settings.storage_s3_prefix,
+            endpoint_url=settings.storage_s3_endpoint_url,
+            region=settings.storage_s3_region,
+        )
+
+    if settings.storage_backend != LOCAL_STORAGE:
+        raise ValueError(f"Unknown storage backend: {settings.storage_backend}")
+
+    return LocalStorage(root=settings.media_dir)
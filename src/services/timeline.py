@@ -0,0 +1,373 @@
+import heapq
+import logging
+from datetime import datetime, timezone
+from typing import Callable
+
+from sqlalchemy import select, desc, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.conf.caching import get_redis_data
+from src.core.conf.config import settings
+from src.core.database import models
+from src.repositories import follows as repository_follows
+
+logger = logging.getLogger(__name__)
+
+# Adds the post to the timeline only if the timeline is already built,
+# otherwise the next read builds the whole timeline from the database.
+FAN_OUT_SCRIPT = """
+if redis.call("EXISTS", KEYS[2]) == 1 then
+    redis.call("ZADD", KEYS[1], ARGV[1], ARGV[2])
+    redis.call("ZREMRANGEBYRANK", KEYS[1], 0, -tonumber(ARGV[3]) - 1)
+end
+return 0
+"""
+
+# The cursor of the next page: the score and the id of the last post of the page,
+# the id breaks the ties of the posts created at the same time
+CURSOR_PATTERN = r"^\d+(\.\d+)?:\d+$"
+
+# The timelines a deleted post is removed from per pipeline
+REMOVE_BATCH_SIZE = 1000
+
+
+class Timeline:
+    TIMELINE_TTL = 60 * 60 * 24 * 7
+
+    def __init__(
+        self,
+        get_client: Callable = get_redis_data,
+        max_length: int = settings.timeline_max_length,
+        fanout_max_followers: int = settings.timeline_fanout_max_followers,
+    ):
+        """
+        Home timelines of the authors stored as capped Redis sorted sets (post id scored by creation time).
+        New posts are fanned out on write to the followers' timelines,
+        except for the authors with a huge follower count, whose posts are merged in on read.
+
+        Arguments:
+            get_client (Callable): Returns a Redis client or None (fakeredis can be passed in tests)
+            max_length (int): The maximum number of posts kept per timeline
+            fanout_max_followers (int): Authors with more followers are fanned in on read
+
+        Returns:
+            None
+        """
+        self.get_client = get_client
+        self.max_length = max_length
+        self.fanout_max_followers = fanout_max_followers
+
+    @staticmethod
+    def timeline_key(follower_id: int) -> str:
+        return f"timeline:{follower_id}"
+
+    @staticmethod
+    def author_posts_key(author_id: int) -> str:
+        return f"timeline:author:{author_id}"
+
+    @staticmethod
+    def ready_key(key: str) -> str:
+        return f"{key}:ready"
+
+    @staticmethod
+    def score(created_at: datetime) -> float:
+        return created_at.replace(tzinfo=timezone.utc).timestamp()
+
+    @staticmethod
+    def encode_cursor(score: float, post_id: int) -> str:
+        # repr keeps every digit, so the score of the cursor is equal to the stored one
+        return f"{score!r}:{post_id}"
+
+    @staticmethod
+    def decode_cursor(cursor: str) -> tuple[float, int]:
+        score, _, post_id = cursor.partition(":")
+        return float(score), int(post_id)
+
+    @staticmethod
+    def is_after(score: float, post_id: int, cursor: tuple[float, int] | None) -> bool:
+        return cursor is None or (score, post_id) < cursor
+
+    async def fan_out_post(self, session: AsyncSession, post: models.Post) -> None:
+        """
+        Pushes the new post to the timelines of the author's followers.
+
+        Arguments:
+            session (AsyncSession): SQLAlchemy session object for accessing the database
+            post (Post): The created post
+
+        Returns:
+            None
+        """
+        redis_client = self.get_client()
+
+        if not redis_client:
+            return
+
+        score = self.score(post.created_at)
+        author_key = self.author_posts_key(post.author_id)
+        fan_out = redis_client.register_script(FAN_OUT_SCRIPT)
+
+        fan_out(
+            keys=[author_key, self.ready_key(author_key)], args=[score, post.id, self.max_length]
+        )
+
+        followers = await repository_follows.count_followers(session=session, author_id=post.author_id)
+
+        if followers > self.fanout_max_followers:
+            return
+
+        follower_ids = await repository_follows.get_follower_ids(
+            session=session, author_id=post.author_id
+        )
+
+        pipe = redis_client.pipeline(transaction=False)
+
+        for follower_id in follower_ids:
+            key = self.timeline_key(follower_id)
+            fan_out(
+                keys=[key, self.ready_key(key)], args=[score, post.id, self.max_length], client=pipe
+            )
+
+        pipe.execute()
+
+    async def remove_post(self, session: AsyncSession, post_id: int, author_id: int) -> None:
+        """
+        Removes the deleted post from the author's posts and from the timelines of the author's followers,
+        so their pages are not short of it until it ages out.
+
+        Arguments:
+            session (AsyncSession): SQLAlchemy session object for accessing the database
+            post_id (int): The deleted post
+            author_id (int): The author of the post
+
+        Returns:
+            None
+        """
+        redis_client = self.get_client()
+
+        if not redis_client:
+            return
+
+        redis_client.zrem(self.author_posts_key(author_id), post_id)
+
+        follower_ids = await repository_follows.get_follower_ids(session=session, author_id=author_id)
+
+        for start in range(0, len(follower_ids), REMOVE_BATCH_SIZE):
+            pipe = redis_client.pipeline(transaction=False)
+
+            for follower_id in follower_ids[start:start + REMOVE_BATCH_SIZE]:
+                pipe.zrem(self.timeline_key(follower_id), post_id)
+
+            pipe.execute()
+
+    async def follow(self, session: AsyncSession, follower_id: int, author_id: int) -> None:
+        """
+        Merges the recent posts of the newly followed author into the follower's timeline.
+        """
+        redis_client = self.get_client()
+
+        if not redis_client:
+            return
+
+        key = self.timeline_key(follower_id)
+
+        if not redis_client.exists(self.ready_key(key)):
+            return
+
+        followers = await repository_follows.count_followers(session=session, author_id=author_id)
+
+        if followers > self.fanout_max_followers:
+            return
+
+        author_key = await self._ensure_author_posts(
+            redis_client=redis_client, session=session, author_id=author_id
+        )
+
+        pipe = redis_client.pipeline()
+        pipe.zunionstore(key, [key, author_key], aggregate="MAX")
+        pipe.zremrangebyrank(key, 0, -self.max_length - 1)
+        pipe.expire(key, self.TIMELINE_TTL)
+        pipe.execute()
+
+    async def unfollow(self, session: AsyncSession, follower_id: int, author_id: int) -> None:
+        """
+        Removes the posts of the unfollowed author from the follower's timeline.
+        """
+        redis_client = self.get_client()
+
+        if not redis_client:
+            return
+
+        key = self.timeline_key(follower_id)
+
+        if not redis_client.exists(self.ready_key(key)):
+            return
+
+        author_key = await self._ensure_author_posts(
+            redis_client=redis_client, session=session, author_id=author_id
+        )
+        post_ids = redis_client.zrange(author_key, 0, -1)
+
+        if post_ids:
+            redis_client.zrem(key, *post_ids)
+
+    async def get_timeline(
+        self, session: AsyncSession, follower_id: int, cursor: str | None, limit: int
+    ) -> tuple[list[int], str | None]:
+        """
+        Returns one page of the follower's timeline, newest posts first (the posts created at the same time
+        by their ids, descending).
+
+        Arguments:
+            session (AsyncSession): SQLAlchemy session object for accessing the database
+            follower_id (int): The author who reads the timeline
+            cursor (str | None): The cursor returned with the previous page
+            limit (int): The page size
+
+        Returns:
+            tuple: post ids of the page and the cursor of the next page (None on the last page)
+        """
+        followed = await repository_follows.get_followed_authors_with_follower_counts(
+            session=session, follower_id=follower_id
+        )
+
+        if not followed:
+            return [], None
+
+        position = self.decode_cursor(cursor) if cursor is not None else None
+
+        fanned_out = [author_id for author_id, count in followed if count <= self.fanout_max_followers]
+        fanned_in = [author_id for author_id, count in followed if count > self.fanout_max_followers]
+
+        redis_client = self.get_client()
+
+        if not redis_client:
+            return await self._get_timeline_from_db(
+                session=session,
+                author_ids=[author_id for author_id, _ in followed],
+                position=position,
+                limit=limit,
+            )
+
+        timeline_key = await self._ensure_timeline(
+            redis_client=redis_client, session=session, follower_id=follower_id, author_ids=fanned_out
+        )
+        keys = [timeline_key]
+
+        for author_id in fanned_in:
+            author_key = await self._ensure_author_posts(
+                redis_client=redis_client, session=session, author_id=author_id
+            )
+            keys.append(author_key)
+
+        pipe = redis_client.pipeline(transaction=False)
+        for key in keys:
+            if position is None:
+                pipe.zrevrangebyscore(key, "+inf", "-inf", start=0, num=limit, withscores=True)
+            else:
+                # The posts with the score of the cursor (a few at most), then a page of the older ones
+                cursor_score = repr(position[0])
+                pipe.zrangebyscore(key, cursor_score, cursor_score, withscores=True)
+                pipe.zrevrangebyscore(key, f"({cursor_score}", "-inf", start=0, num=limit, withscores=True)
+        pipe.expire(timeline_key, self.TIMELINE_TTL)
+        pipe.expire(self.ready_key(timeline_key), self.TIMELINE_TTL)
+        pages = pipe.execute()[:-2]
+
+        entries = heapq.nlargest(
+            limit,
+            {
+                (score, int(post_id))
+                for page in pages
+                for post_id, score in page
+                if self.is_after(score=score, post_id=int(post_id), cursor=position)
+            },
+        )
+
+        next_cursor = self.encode_cursor(*entries[-1]) if len(entries) == limit else None
+
+        return [post_id for _, post_id in entries], next_cursor
+
+    async def _ensure_timeline(
+        self, redis_client, session: AsyncSession, follower_id: int, author_ids: list[int]
+    ) -> str:
+        key = self.timeline_key(follower_id)
+
+        if redis_client.exists(self.ready_key(key)):
+            return key
+
+        posts = await self._get_recent_posts(session=session, author_ids=author_ids)
+        self._store(redis_client=redis_client, key=key, posts=posts, ttl=self.TIMELINE_TTL)
+
+        return key
+
+    async def _ensure_author_posts(self, redis_client, session: AsyncSession, author_id: int) -> str:
+        key = self.author_posts_key(author_id)
+
+        if redis_client.exists(self.ready_key(key)):
+            return key
+
+        posts = await self._get_recent_posts(session=session, author_ids=[author_id])
+        self._store(redis_client=redis_client, key=key, posts=posts)
+
+        return key
+
+    @staticmethod
+    def _store(redis_client, key: str, posts: list[tuple[int, datetime]], ttl: int | None = None) -> None:
+        pipe = redis_client.pipeline()
+        pipe.delete(key)
+
+        if posts:
+            pipe.zadd(key, {post_id: Timeline.score(created_at) for post_id, created_at in posts})
+
+        pipe.set(Timeline.ready_key(key), 1)
+
+        if ttl:
+            pipe.expire(key, ttl)
+            pipe.expire(Timeline.ready_key(key), ttl)
+
+        pipe.execute()
+
+    async def _get_recent_posts(
+        self, session: AsyncSession, author_ids: list[int]
+    ) -> list[tuple[int, datetime]]:
+        if not author_ids:
+            return []
+
+        stmt = (
+            select(models.Post.id, models.Post.created_at)
+            .where(models.Post.author_id.in_(author_ids))
+            .order_by(desc(models.Post.created_at), desc(models.Post.id))
+            .limit(self.max_length)
+        )
+        result = await session.execute(stmt)
+        return [(post_id, created_at) for post_id, created_at in result.all()]
+
+    async def _get_timeline_from_db(
+        self, session: AsyncSession, author_ids: list[int], position: tuple[float, int] | None, limit: int
+    ) -> tuple[list[int], str | None]:
+        stmt = (
+            select(models.Post.id, models.Post.created_at)
+            .where(models.Post.author_id.in_(author_ids))
+            .order_by(desc(models.Post.created_at), desc(models.Post.id))
+            .limit(limit)
+        )
+
+        if position is not None:
+            score, post_id = position
+            created_at = datetime.fromtimestamp(score, tz=timezone.utc).replace(tzinfo=None)
+            stmt = stmt.where(
+                or_(
+                    models.Post.created_at < created_at,
+                    and_(models.Post.created_at == created_at, models.Post.id < post_id),
+                )
+            )
+
+        result = await session.execute(stmt)
+        entries = [(self.score(created_at), post_id) for post_id, created_at in result.all()]
+
+        next_cursor = self.encode_cursor(*entries[-1]) if len(entries) == limit else None
+
+        return [post_id for _, post_id in entries], next_cursor
+
+
+timeline_service = Timeline()
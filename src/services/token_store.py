@@ -0,0 +1,204 @@
+import time
+import uuid
+import logging
+from typing import Callable
+
+from fastapi import HTTPException, status
+
+from src.core.conf.caching import get_redis_data
+from src.core.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Rotates a refresh token of a session: the presented token is marked as used (it is kept until it expires
+# to detect its reuse) and the new token becomes the only valid one of the session.
+ROTATE_SCRIPT = """
+local token = redis.call("HMGET", KEYS[1], "sid", "used")
+if not token[1] then
+    return "missing"
+end
+if token[1] ~= ARGV[1] then
+    return "missing"
+end
+if redis.call("EXISTS", KEYS[3]) == 0 then
+    return "revoked"
+end
+if token[2] == "1" then
+    return "reused"
+end
+redis.call("HSET", KEYS[1], "used", "1")
+redis.call("HSET", KEYS[2], "sid", ARGV[1], "used", "0")
+redis.call("EXPIRE", KEYS[2], ARGV[3])
+redis.call("HSET", KEYS[3], "jti", ARGV[2], "refreshed_at", ARGV[4])
+redis.call("EXPIRE", KEYS[3], ARGV[3])
+return "ok"
+"""
+
+
+class RefreshTokenStore:
+    invalid_token_exception = HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED, detail="Invalid refresh token"
+    )
+
+    def __init__(
+        self,
+        get_client: Callable = get_redis_data,
+        ttl: int = settings.refresh_token_expire_minutes * 60,
+    ):
+        """
+        Refresh token state kept in Redis instead of the authors table.
+        Every login opens a session (one per device), the session holds its current token id (jti)
+        and every refresh rotates it. Presenting an already rotated token revokes the whole session.
+
+        Arguments:
+            get_client (Callable): Returns a Redis client or None
+            ttl (int): Lifetime of the sessions and tokens in seconds
+
+        Returns:
+            None
+        """
+        self.get_client = get_client
+        self.ttl = ttl
+
+    @staticmethod
+    def token_key(jti: str) -> str:
+        return f"refresh:token:{jti}"
+
+    @staticmethod
+    def session_key(sid: str) -> str:
+        return f"refresh:session:{sid}"
+
+    @staticmethod
+    def sessions_key(author_id: int) -> str:
+        return f"refresh:sessions:{author_id}"
+
+    def get_client_or_raise(self):
+        redis_client = self.get_client()
+
+        if not redis_client:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE, detail="Session store is unavailable"
+            )
+
+        return redis_client
+
+    def open_session(self, author_id: int, device: str | None) -> tuple[str, str]:
+        """
+        Opens a new session of the author.
+
+        Arguments:
+            author_id (int): The author who logged in
+            device (str | None): The device description (user agent)
+
+        Returns:
+            tuple: The session id (sid) and the id of its first refresh token (jti)
+        """
+        redis_client = self.get_client_or_raise()
+
+        sid = uuid.uuid4().hex
+        jti = uuid.uuid4().hex
+
+        pipe = redis_client.pipeline()
+        pipe.hset(self.token_key(jti), mapping={"sid": sid, "used": "0"})
+        pipe.expire(self.token_key(jti), self.ttl)
+        pipe.hset(
+            self.session_key(sid),
+            mapping={
+                "author_id": author_id,
+                "jti": jti,
+                "device": (device or "")[:255],
+                "created_at": int(time.time()),
+                "refreshed_at": int(time.time()),
+            },
+        )
+        pipe.expire(self.session_key(sid), self.ttl)
+        pipe.sadd(self.sessions_key(author_id), sid)
+        pipe.expire(self.sessions_key(author_id), self.ttl)
+        pipe.execute()
+
+        return sid, jti
+
+    def rotate(self, author_id: int, sid: str, jti: str) -> str:
+        """
+        Rotates the refresh token of the session.
+
+        Arguments:
+            author_id (int): The author of the token
+            sid (str): The session id from the token
+            jti (str): The token id from the token
+
+        Returns:
+            str: The id of the new refresh token
+        """
+        redis_client = self.get_client_or_raise()
+
+        new_jti = uuid.uuid4().hex
+        rotate_token = redis_client.register_script(ROTATE_SCRIPT)
+
+        result = rotate_token(
+            keys=[self.token_key(jti), self.token_key(new_jti), self.session_key(sid)],
+            args=[sid, new_jti, self.ttl, int(time.time())],
+        )
+        result = result.decode() if isinstance(result, bytes) else result
+
+        if result == "reused":
+            logger.warning("Refresh token reuse detected, session %s of author %s revoked", sid, author_id)
+            self.revoke_session(author_id=author_id, sid=sid)
+
+        if result != "ok":
+            raise self.invalid_token_exception
+
+        redis_client.expire(self.sessions_key(author_id), self.ttl)
+
+        return new_jti
+
+    def get_sessions(self, author_id: int) -> list[dict]:
+        redis_client = self.get_client_or_raise()
+
+        sids = [sid.decode() for sid in redis_client.smembers(self.sessions_key(author_id))]
+
+        pipe = redis_client.pipeline(transaction=False)
+        for sid in sids:
+            pipe.hgetall(self.session_key(sid))
+        sessions = pipe.execute()
+
+        expired = [sid for sid, session in zip(sids, sessions) if not session]
+        if expired:
+            redis_client.srem(self.sessions_key(author_id), *expired)
+
+        return [
+            {
+                "sid": sid,
+                "device": session[b"device"].decode(),
+                "created_at": int(session[b"created_at"]),
+                "refreshed_at": int(session[b"refreshed_at"]),
+            }
+            for sid, session in zip(sids, sessions)
+            if session
+        ]
+
+    def revoke_session(self, author_id: int, sid: str) -> None:
+        redis_client = self.get_client_or_raise()
+
+        pipe = redis_client.pipeline()
+        pipe.delete(self.session_key(sid))
+        pipe.srem(self.sessions_key(author_id), sid)
+        pipe.execute()
+
+    def revoke_all_sessions(self, author_id: int) -> None:
+        """
+        Revokes all the sessions of the author (e.g. after the password change),
+        so none of the issued refresh tokens can be used anymore.
+        """
+        redis_client = self.get_client_or_raise()
+
+        sids = [sid.decode() for sid in redis_client.smembers(self.sessions_key(author_id))]
+
+        pipe = redis_client.pipeline()
+        for sid in sids:
+            pipe.delete(self.session_key(sid))
+        pipe.delete(self.sessions_key(author_id))
+        pipe.execute()
+
+
+refresh_token_store = RefreshTokenStore()
@@ -0,0 +1,184 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import random
+import time
+from logging.handlers import RotatingFileHandler
+from urllib.parse import parse_qsl
+
+from jose import jwt, JWTError
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+
+from src.core.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Sent by the replay, so the replayed traffic is not captured again
+REPLAY_HEADER = b"x-replay"
+
+ANONYMOUS = "anonymous"
+INVALID_TOKEN = "invalid"
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def get_capture_logger() -> logging.Logger:
+    """
+    The logger of the captured requests, one NDJSON file per worker rotated by its size.
+    """
+    capture_logger = logging.getLogger("traffic_capture")
+
+    if not capture_logger.handlers:
+        os.makedirs(settings.capture_dir, exist_ok=True)
+
+        handler = RotatingFileHandler(
+            os.path.join(settings.capture_dir, f"traffic-{os.getpid()}.ndjson"),
+            maxBytes=settings.capture_max_bytes,
+            backupCount=settings.capture_backup_count,
+            encoding="utf-8",
+        )
+        handler.setFormatter(logging.Formatter("%(message)s"))
+
+        capture_logger.addHandler(handler)
+        capture_logger.setLevel(logging.INFO)
+        capture_logger.propagate = False
+
+    return capture_logger
+
+
+def anonymize(value: str) -> str:
+    # Equal values stay equal, so the cache hits of the replay match the captured ones
+    return "~" + hmac.new(settings.secret_key.encode(), value.encode(), hashlib.sha256).hexdigest()[:12]
+
+
+def anonymize_query(query_string: bytes, kept_keys: set[str]) -> list[tuple[str, str]]:
+    """
+    The query parameters with their values kept only for the listed keys and the numbers,
+    the other values (e.g. the search terms) are replaced by their keyed hashes.
+    """
+    return [
+        (key, value if key in kept_keys or value.isdigit() else anonymize(value))
+        for key, value in parse_qsl(query_string.decode("latin-1"), keep_blank_values=True)
+    ]
+
+
+def get_auth_class(scope: Scope) -> str:
+    """
+    The role claimed by the access token (anonymous without one), the token is not verified and not recorded.
+    """
+    for header, value in scope["headers"]:
+        if header == b"authorization":
+            scheme, _, token = value.decode("latin-1").partition(" ")
+
+            if scheme.lower() != "bearer" or not token:
+                return INVALID_TOKEN
+
+            try:
+                return str(jwt.get_unverified_claims(token).get("role") or INVALID_TOKEN)
+            except JWTError:
+                return INVALID_TOKEN
+
+    return ANONYMOUS
+
+
+class TrafficCaptureMiddleware:
+    def __init__(self, app: ASGIApp, sample_ratio: float):
+        """
+        Records the shape of a sample of the requests for the load tests (script_replay_traffic.py):
+        the method, the route template, the path parameters, the anonymized query, the sizes of the bodies,
+        the role of the author, the status and the time. The bodies, the tokens, the ids of the authors
+        and the addresses of the clients are not recorded.
+
+        Arguments:
+            app (ASGIApp): The application
+            sample_ratio (float): The share of the recorded requests (0..1)
+
+        Returns:
+            None
+        """
+        self.app = app
+        self.sample_ratio = sample_ratio
+        self.kept_query_keys = {key.strip() for key in settings.capture_query_keys.split(",") if key.strip()}
+        self.capture_logger = get_capture_logger()
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or random.random() >= self.sample_ratio:
+            await self.app(scope, receive, send)
+            return
+
+        if any(header == REPLAY_HEADER for header, _ in scope["headers"]):
+            await self.app(scope, receive, send)
+            return
+
+        started_at = time.time()
+        start = time.perf_counter()
+        request_bytes = 0
+        response_bytes = 0
+        status_code = 500
+
+        async def counted_receive() -> Message:
+            nonlocal request_bytes
+
+            message = await receive()
+
+            if message["type"] == "http.request":
+                request_bytes += len(message.get("body", b""))
+
+            return message
+
+        async def counted_send(message: Message) -> None:
+            nonlocal response_bytes, status_code
+
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            elif message["type"] == "http.response.body":
+                response_bytes += len(message.get("body", b""))
+
+            await send(message)
+
+        try:
+            await self.app(scope, counted_receive, counted_send)
+        finally:
+            self.record(
+                scope=scope,
+                started_at=started_at,
+                duration=time.perf_counter() - start,
+                status_code=status_code,
+                request_bytes=request_bytes,
+                response_bytes=response_bytes,
+            )
+
+    def record(
+        self,
+        scope: Scope,
+        started_at: float,
+        duration: float,
+        status_code: int,
+        request_bytes: int,
+        response_bytes: int,
+    ) -> None:
+        # Set by the router of FastAPI when the path matches a route
+        route = scope.get("route")
+        route_path = getattr(route, "path", None)
+
+        headers = dict(scope["headers"])
+
+        entry = {
+            "ts": round(started_at, 6),
+            "method": scope["method"],
+            "route": route_path or UNMATCHED_ROUTE,
+            "path_params": scope.get("path_params", {}) if route_path else {},
+            "query": anonymize_query(scope["query_string"], self.kept_query_keys),
+            "content_type": headers.get(b"content-type", b"").decode("latin-1").split(";")[0],
+            "request_bytes": request_bytes,
+            "auth": get_auth_class(scope),
+            "status": status_code,
+            "response_bytes": response_bytes,
+            "duration_ms": round(duration * 1000, 3),
+        }
+
+        try:
+            self.capture_logger.info(json.dumps(entry, separators=(",", ":"), default=str))
+        except Exception as error:
+            logger.warning("Unable to record the request: %s", str(error))
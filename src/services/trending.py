@@ -0,0 +1,118 @@
+import asyncio
+import math
+import logging
+import time
+
+from src.core.conf.caching import get_redis_data
+from src.core.conf.config import settings
+
+logger = logging.getLogger(__name__)
+
+TRENDING_KEY = "trending:posts"
+EPOCH_KEY = "trending:epoch"
+
+NEW_POST_WEIGHT = 10.0
+TAG_WEIGHT = 2.0
+VIEW_WEIGHT = 1.0
+
+MIN_SCORE = 0.01
+
+DECAY_RATE = math.log(2) / (settings.trending_half_life_hours * 3600)
+
+# The scores are stored relative to the epoch: an event is worth weight * e^(rate * (now - epoch)),
+# so the older events lose their weight relative to the new ones without rewriting the whole set.
+RECORD_EVENT_SCRIPT = """
+local epoch = tonumber(redis.call("GET", KEYS[2]))
+if not epoch then
+    epoch = tonumber(ARGV[2])
+    redis.call("SET", KEYS[2], ARGV[2])
+end
+local score = tonumber(ARGV[3]) * math.exp(tonumber(ARGV[4]) * (tonumber(ARGV[2]) - epoch))
+return tostring(redis.call("ZINCRBY", KEYS[1], score, ARGV[1]))
+"""
+
+# Moves the epoch to now and scales all the scores down accordingly, so they stay bounded.
+RESCALE_SCRIPT = """
+local epoch = tonumber(redis.call("GET", KEYS[2]))
+if not epoch then
+    return 0
+end
+local factor = math.exp(-tonumber(ARGV[2]) * (tonumber(ARGV[1]) - epoch))
+redis.call("ZUNIONSTORE", KEYS[1], 1, KEYS[1], "WEIGHTS", tostring(factor))
+redis.call("ZREMRANGEBYSCORE", KEYS[1], "-inf", "(" .. ARGV[3])
+redis.call("SET", KEYS[2], ARGV[1])
+return redis.call("ZCARD", KEYS[1])
+"""
+
+
+def record_event(post_id: int, weight: float) -> None:
+    """
+    Adds a time-decayed event (new post, tag activity or view) to the trending score of the post.
+
+    Arguments:
+        post_id (int): The post of the event
+        weight (float): The weight of the event at the moment it happens
+
+    Returns:
+        None
+    """
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return
+
+    record = redis_client.register_script(RECORD_EVENT_SCRIPT)
+    record(keys=[TRENDING_KEY, EPOCH_KEY], args=[post_id, time.time(), weight, DECAY_RATE])
+
+
+def remove_post(post_id: int) -> None:
+    redis_client = get_redis_data()
+
+    if redis_client:
+        redis_client.zrem(TRENDING_KEY, post_id)
+
+
+def rescale() -> int:
+    """
+    Applies the decay accumulated since the last epoch and drops the posts that are not trending anymore.
+
+    Returns:
+        int: The number of posts left in the ranking
+    """
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return 0
+
+    rescale_scores = redis_client.register_script(RESCALE_SCRIPT)
+    return rescale_scores(keys=[TRENDING_KEY, EPOCH_KEY], args=[time.time(), DECAY_RATE, MIN_SCORE])
+
+
+def get_trending_post_ids(offset: int, limit: int) -> tuple[list[int], int]:
+    """
+    Returns one page of the trending post ids in O(log n + limit) and the total size of the ranking.
+    """
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return [], 0
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.zrevrange(TRENDING_KEY, offset, offset + limit - 1)
+    pipe.zcard(TRENDING_KEY)
+    post_ids, total = pipe.execute()
+
+    return [int(post_id) for post_id in post_ids], total
+
+
+async def run_rescaler(interval: int = settings.trending_rescale_interval_seconds) -> None:
+    """
+    Background task rescaling the trending scores every interval seconds until it is cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+
+        try:
+            rescale()
+        except Exception as error:
+            logger.error("Unable to rescale trending posts: %s", str(error))
@@ -0,0 +1,211 @@
+import os
+import struct
+from typing import BinaryIO, Callable
+
+from fastapi import HTTPException, Request, Response, UploadFile, status
+from fastapi.concurrency import run_in_threadpool
+from fastapi.dependencies.models import Dependant
+from fastapi.routing import APIRoute
+from starlette.types import Message, Receive
+
+from src.core.conf.config import settings
+
+# The multipart boundaries and headers around the file
+MULTIPART_OVERHEAD_BYTES = 16 * 1024
+
+PNG_SIGNATURE = b"\x89PNG\r\n\x1a\n"
+JPEG_SIGNATURE = b"\xff\xd8\xff"
+
+# The allowed extensions of the uploaded images and their formats
+IMAGE_FORMATS = {"jpg": "JPEG", "png": "PNG"}
+
+# The start of frame markers of the JPEG, which carry the dimensions (the others are DHT, JPG and DAC)
+JPEG_SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+JPEG_STANDALONE_MARKERS = frozenset(range(0xD0, 0xD8)) | {0x01}
+
+
+def probe_png(file: BinaryIO, head: bytes) -> tuple[str, int, int] | None:
+    # IHDR is the first chunk: its length, type, width and height
+    if len(head) < 24 or head[12:16] != b"IHDR":
+        return None
+
+    width, height = struct.unpack(">II", head[16:24])
+    return "PNG", width, height
+
+
+def probe_jpeg(file: BinaryIO) -> tuple[str, int, int] | None:
+    # The segments before the frame (EXIF, ICC profiles, ...) are skipped by their lengths, not read
+    file.seek(2)
+
+    while True:
+        prefix = file.read(1)
+
+        if prefix != b"\xff":
+            return None
+
+        marker = file.read(1)
+        while marker == b"\xff":
+            marker = file.read(1)
+
+        if not marker:
+            return None
+
+        code = marker[0]
+
+        if code in JPEG_STANDALONE_MARKERS:
+            continue
+
+        # The scan or the end of the image without a frame
+        if code in (0xDA, 0xD9):
+            return None
+
+        length_bytes = file.read(2)
+        if len(length_bytes) < 2:
+            return None
+
+        length = struct.unpack(">H", length_bytes)[0]
+        if length < 2:
+            return None
+
+        if code in JPEG_SOF_MARKERS:
+            frame = file.read(5)
+            if len(frame) < 5:
+                return None
+
+            _, height, width = struct.unpack(">BHH", frame)
+            return "JPEG", width, height
+
+        file.seek(length - 2, os.SEEK_CUR)
+
+
+def probe_image(file: BinaryIO) -> tuple[str, int, int] | None:
+    """
+    Reads the format and the dimensions of the image from its headers, without decoding it.
+
+    Arguments:
+        file (BinaryIO): The uploaded file
+
+    Returns:
+        tuple: The format, the width and the height, None if the file is not a PNG or JPEG image
+    """
+    file.seek(0)
+    head = file.read(32)
+
+    try:
+        if head.startswith(PNG_SIGNATURE):
+            return probe_png(file=file, head=head)
+        if head.startswith(JPEG_SIGNATURE):
+            return probe_jpeg(file=file)
+        return None
+    finally:
+        file.seek(0)
+
+
+def too_large(detail: str) -> HTTPException:
+    return HTTPException(status_code=status.HTTP_413_REQUEST_ENTITY_TOO_LARGE, detail=detail)
+
+
+class ImageValidator:
+    def __init__(self, max_bytes: int, max_pixels: int):
+        """
+        Admits the uploaded image only if it is a PNG or JPEG within the limits. The body of the request is capped
+        while it is received (by UploadLimitRoute), the dimensions are read from the headers before it is decoded.
+
+        Arguments:
+            max_bytes (int): The maximum size of the file
+            max_pixels (int): The maximum number of pixels (width * height) of the image
+
+        Returns:
+            None
+        """
+        self.max_bytes = max_bytes
+        self.max_pixels = max_pixels
+
+    async def __call__(self, file: UploadFile) -> UploadFile:
+        extension = file.filename.rsplit(".", 1)[-1].lower() if "." in file.filename else ""
+
+        if extension not in IMAGE_FORMATS:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is not a .jpg or .png image"
+            )
+
+        if file.size is not None and file.size > self.max_bytes:
+            raise too_large(detail=f"Uploaded file is larger than {self.max_bytes} bytes")
+
+        probe = await run_in_threadpool(probe_image, file.file)
+
+        if probe is None or probe[0] != IMAGE_FORMATS[extension] or not probe[1] or not probe[2]:
+            raise HTTPException(
+                status_code=status.HTTP_400_BAD_REQUEST, detail=f"Uploaded file is not a valid .{extension} image"
+            )
+
+        _, width, height = probe
+
+        if width * height > self.max_pixels:
+            raise too_large(detail=f"Uploaded image of {width}x{height} pixels is larger than {self.max_pixels} pixels")
+
+        return file
+
+
+validate_post_image = ImageValidator(
+    max_bytes=settings.upload_post_image_max_bytes, max_pixels=settings.upload_post_image_max_pixels
+)
+validate_profile_image = ImageValidator(
+    max_bytes=settings.upload_profile_image_max_bytes, max_pixels=settings.upload_profile_image_max_pixels
+)
+
+
+def get_upload_limit(dependant: Dependant) -> int | None:
+    for dependency in dependant.dependencies:
+        if isinstance(dependency.call, ImageValidator):
+            return dependency.call.max_bytes + MULTIPART_OVERHEAD_BYTES
+
+        limit = get_upload_limit(dependency)
+        if limit is not None:
+            return limit
+
+    return None
+
+
+def limit_receive(receive: Receive, max_bytes: int) -> Receive:
+    received = 0
+
+    async def limited_receive() -> Message:
+        nonlocal received
+
+        message = await receive()
+
+        if message["type"] == "http.request":
+            received += len(message.get("body", b""))
+            if received > max_bytes:
+                raise too_large(detail=f"Request body is larger than {max_bytes} bytes")
+
+        return message
+
+    return limited_receive
+
+
+class UploadLimitRoute(APIRoute):
+    """
+    The route which stops receiving the body of an upload as soon as it exceeds the limit of its ImageValidator,
+    before the body is parsed, so a huge file is neither buffered nor spooled to the disk whole.
+    The other routes are not changed.
+    """
+
+    def get_route_handler(self) -> Callable:
+        route_handler = super().get_route_handler()
+        max_bytes = get_upload_limit(self.dependant)
+
+        if max_bytes is None:
+            return route_handler
+
+        async def limited_route_handler(request: Request) -> Response:
+            content_length = request.headers.get("content-length", "")
+
+            if content_length.isdigit() and int(content_length) > max_bytes:
+                raise too_large(detail=f"Request body is larger than {max_bytes} bytes")
+
+            request = Request(scope=request.scope, receive=limit_receive(request.receive, max_bytes))
+            return await route_handler(request)
+
+        return limited_route_handler
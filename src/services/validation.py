@@ -1,7 +1,5 @@
 import re
 
-from fastapi import UploadFile, HTTPException, status
-
 phone_pattern = re.compile(r'^\+?\d{12,15}$')
 password_pattern = re.compile(r"^(?=.*[A-Z])(?=.*\d)(?=.*[^\w\s]).+$")
 
@@ -20,11 +18,3 @@ def validate_password(password: str):
             "Password is not valid! The password must consist of at least one lowercase, "
             "uppercase letter, number and symbols."
         )
-
-
-async def validate_image(file: UploadFile) -> UploadFile:
-    if not (file.filename.endswith(".jpg") or file.filename.endswith(".png")):
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST, detail="Uploaded file is not a .jpg or .png image"
-        )
-    return file
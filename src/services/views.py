@@ -0,0 +1,206 @@
+import asyncio
+import hashlib
+import logging
+import time
+import uuid
+
+from sqlalchemy import update, bindparam, func
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from src.core.conf.caching import get_redis_data
+from src.core.conf.config import settings
+from src.core.database import models
+from src.core.database.db_settings.db_helper import async_session
+
+logger = logging.getLogger(__name__)
+
+TOTAL_KEY = "views:total"
+PENDING_KEY = "views:pending"
+# The deltas claimed by a flush: views:pending:flushing:<claimed at>:<uuid>
+FLUSHING_KEY_PREFIX = f"{PENDING_KEY}:flushing:"
+REQUEUE_LOCK_KEY = "views:requeue_lock"
+
+# Renames the pending hash only if it exists, the views counted meanwhile go to a new pending hash
+CLAIM_PENDING_SCRIPT = """
+if redis.call("EXISTS", KEYS[1]) == 1 then
+    redis.call("RENAME", KEYS[1], KEYS[2])
+    return 1
+end
+return 0
+"""
+
+# Adds the claimed deltas back to the pending hash and drops the claim, atomically,
+# so a claim requeued by two workers at once is counted only once
+REQUEUE_DELTAS_SCRIPT = """
+local deltas = redis.call("HGETALL", KEYS[1])
+for index = 1, #deltas, 2 do
+    redis.call("HINCRBY", KEYS[2], deltas[index], deltas[index + 1])
+end
+redis.call("DEL", KEYS[1])
+return #deltas / 2
+"""
+
+
+def visitors_key(post_id: int) -> str:
+    return f"views:visitors:{post_id}"
+
+
+def visitor_fingerprint(client_host: str | None, user_agent: str | None) -> str:
+    """
+    Anonymized visitor id, the raw IP address and user agent are never stored.
+    """
+    raw = f"{client_host}|{user_agent}|{settings.secret_key}"
+    return hashlib.sha256(raw.encode()).hexdigest()[:32]
+
+
+def track_view(post: models.Post, visitor: str) -> tuple[int, int]:
+    """
+    Counts one view of the post in Redis: the total counter, the delta pending for Postgres
+    and the HyperLogLog of unique visitors are updated in one round trip.
+    The database is written only by the flusher.
+
+    Arguments:
+        post (Post): The viewed post (its stored counters seed Redis after a restart)
+        visitor (str): Anonymized visitor id
+
+    Returns:
+        tuple: The total views and the estimated unique viewers of the post
+    """
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return post.views, post.unique_views
+
+    pipe = redis_client.pipeline(transaction=False)
+    pipe.hsetnx(TOTAL_KEY, post.id, post.views)
+    pipe.hincrby(TOTAL_KEY, post.id, 1)
+    pipe.hincrby(PENDING_KEY, post.id, 1)
+    pipe.pfadd(visitors_key(post.id), visitor)
+    pipe.pfcount(visitors_key(post.id))
+    _, views, _, _, unique_views = pipe.execute()
+
+    return views, max(unique_views, post.unique_views)
+
+
+def forget_post(post_id: int) -> None:
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return
+
+    pipe = redis_client.pipeline()
+    pipe.hdel(TOTAL_KEY, post_id)
+    pipe.hdel(PENDING_KEY, post_id)
+    pipe.delete(visitors_key(post_id))
+    pipe.execute()
+
+
+def requeue_stale_flushes(redis_client, stale_after: int) -> int:
+    """
+    Returns the deltas claimed by the flushes which never finished (e.g. the worker died) to the pending hash.
+
+    Arguments:
+        redis_client: The client of the data database
+        stale_after (int): The seconds after which a claim is considered abandoned
+
+    Returns:
+        int: The number of requeued post deltas
+    """
+    requeue = redis_client.register_script(REQUEUE_DELTAS_SCRIPT)
+    now = time.time()
+    requeued = 0
+
+    for key in redis_client.scan_iter(match=f"{FLUSHING_KEY_PREFIX}*", count=1000):
+        claimed_at = key.decode().removeprefix(FLUSHING_KEY_PREFIX).split(":")[0]
+
+        if claimed_at.isdigit() and now - int(claimed_at) < stale_after:
+            continue
+
+        requeued += requeue(keys=[key, PENDING_KEY])
+
+    return requeued
+
+
+async def flush_views(session: AsyncSession) -> int:
+    """
+    Writes the buffered view deltas to Postgres in one batched UPDATE.
+    The pending hash is claimed first (renamed), so the views counted during the flush are kept for the next one,
+    and the deltas are returned to the pending hash if the write fails. The claims left by the flushes
+    which never finished are returned to it too, checked once per VIEWS_FLUSH_STALE_SECONDS by one of the workers.
+
+    Arguments:
+        session (AsyncSession): SQLAlchemy session object for accessing the database
+
+    Returns:
+        int: The number of updated posts
+    """
+    redis_client = get_redis_data()
+
+    if not redis_client:
+        return 0
+
+    stale_after = settings.views_flush_stale_seconds
+
+    if redis_client.set(REQUEUE_LOCK_KEY, 1, nx=True, ex=stale_after):
+        requeued = requeue_stale_flushes(redis_client=redis_client, stale_after=stale_after)
+        if requeued:
+            logger.warning("Requeued the views of %s posts claimed by an unfinished flush", requeued)
+
+    flushing_key = f"{FLUSHING_KEY_PREFIX}{int(time.time())}:{uuid.uuid4().hex}"
+    claim = redis_client.register_script(CLAIM_PENDING_SCRIPT)
+
+    if not claim(keys=[PENDING_KEY, flushing_key]):
+        return 0
+
+    deltas = {int(post_id): int(delta) for post_id, delta in redis_client.hgetall(flushing_key).items()}
+
+    pipe = redis_client.pipeline(transaction=False)
+    for post_id in deltas:
+        pipe.pfcount(visitors_key(post_id))
+    unique_views = pipe.execute()
+
+    rows = [
+        {"b_id": post_id, "b_delta": delta, "b_unique": unique}
+        for (post_id, delta), unique in zip(deltas.items(), unique_views)
+    ]
+
+    stmt = (
+        update(models.Post.__table__)
+        .where(models.Post.__table__.c.id == bindparam("b_id"))
+        .values(
+            views=models.Post.__table__.c.views + bindparam("b_delta"),
+            unique_views=func.greatest(models.Post.__table__.c.unique_views, bindparam("b_unique")),
+        )
+    )
+
+    try:
+        await session.execute(stmt, rows)
+        await session.commit()
+    except Exception:
+        await session.rollback()
+
+        redis_client.register_script(REQUEUE_DELTAS_SCRIPT)(keys=[flushing_key, PENDING_KEY])
+
+        raise
+
+    redis_client.delete(flushing_key)
+
+    return len(rows)
+
+
+async def run_views_flusher(interval: int = settings.views_flush_interval_seconds) -> None:
+    """
+    Background task flushing the buffered views every interval seconds until it is cancelled.
+    """
+    while True:
+        await asyncio.sleep(interval)
+
+        try:
+            async with async_session() as session:
+                flushed = await flush_views(session=session)
+            if flushed:
+                logger.info("Views flushed for %s posts", flushed)
+        except asyncio.CancelledError:
+            raise
+        except Exception as error:
+            logger.error("Unable to flush views: %s", str(error))
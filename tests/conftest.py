@@ -0,0 +1,107 @@
+import asyncio
+import os
+import tempfile
+from datetime import datetime
+
+import fakeredis
+import pytest
+import redis
+
+# The tests run against SQLite and an in-memory Redis, set before the settings are loaded
+TEST_DATABASE_PATH = os.path.join(tempfile.gettempdir(), "blog_api_tests.db")
+os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{TEST_DATABASE_PATH}"
+
+from sqlalchemy import event, update  # noqa: E402
+
+from src.core.conf import caching  # noqa: E402
+from src.core.database import models  # noqa: E402
+from src.core.database.db_settings import db_helper  # noqa: E402
+from src.core.database.db_settings.base import Base  # noqa: E402
+
+redis_server = fakeredis.FakeServer()
+fake_connection_pools: dict[int, redis.ConnectionPool] = {}
+
+
+def get_fake_connection_pool(db: int) -> redis.ConnectionPool:
+    if db not in fake_connection_pools:
+        fake_connection_pools[db] = redis.ConnectionPool(
+            server=redis_server, db=db, connection_class=fakeredis.FakeRedisConnection
+        )
+
+    return fake_connection_pools[db]
+
+
+caching.get_connection_pool = get_fake_connection_pool
+
+db_helper.async_engine.echo = False
+
+
+@event.listens_for(db_helper.async_engine.sync_engine, "connect")
+def add_postgres_functions(dbapi_connection, connection_record) -> None:
+    # The Postgres functions used by the queries
+    dbapi_connection.create_function("date_trunc", 2, lambda unit, value: value[:10] + " 00:00:00.000000" if value else value)
+    dbapi_connection.create_function("greatest", 2, max)
+    dbapi_connection.create_function("now", 0, lambda: datetime.utcnow().isoformat(" "))
+
+
+async def recreate_tables() -> None:
+    async with db_helper.async_engine.begin() as connection:
+        await connection.run_sync(Base.metadata.drop_all)
+        await connection.run_sync(Base.metadata.create_all)
+
+    await db_helper.async_engine.dispose()
+
+
+@pytest.fixture(autouse=True)
+def clean_state():
+    asyncio.run(recreate_tables())
+    redis_server.connected = True
+
+    for db in (0, 1):
+        redis.Redis(connection_pool=get_fake_connection_pool(db)).flushdb()
+
+    yield
+
+    asyncio.run(db_helper.async_engine.dispose())
+
+
+@pytest.fixture
+def fake_redis_server() -> fakeredis.FakeServer:
+    # The tests get the server from here: importing this module again would patch in another server
+    return redis_server
+
+
+@pytest.fixture(scope="session")
+def client():
+    from fastapi.testclient import TestClient
+
+    import main
+
+    # Without the lifespan: no background tasks, the tests call the services themselves
+    return TestClient(main.app)
+
+
+@pytest.fixture
+def register(client):
+    def register_author(name: str, role: str | None = None) -> dict[str, str]:
+        response = client.post(
+            "/api/auth/register", json={"username": name, "email": f"{name}@example.com", "password": "Passw0rd!"}
+        )
+        assert response.status_code == 201, response.text
+
+        if role:
+            async def set_role() -> None:
+                async with db_helper.async_session() as session:
+                    await session.execute(
+                        update(models.Author).where(models.Author.email == f"{name}@example.com").values(role=role)
+                    )
+                    await session.commit()
+
+            asyncio.run(set_role())
+
+        response = client.post("/api/auth/login", data={"username": f"{name}@example.com", "password": "Passw0rd!"})
+        assert response.status_code == 200, response.text
+
+        return {"Authorization": f"Bearer {response.json()['access_token']}"}
+
+    return register_author
@@ -0,0 +1,174 @@
+import re
+from collections import Counter
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+from src.core.database.db_settings import db_helper
+
+# The table of the first selected column is the loaded entity (the eager loads of its relations come first)
+SELECTED_TABLE_PATTERN = re.compile(r"^\s*SELECT\s+(?:DISTINCT\s+)?(\w+)\.", re.IGNORECASE)
+POSTS_TABLE_PATTERN = re.compile(r"\b(?:FROM|JOIN)\s+posts\b", re.IGNORECASE)
+
+
+@contextmanager
+def record_statements():
+    """
+    Records the SQL statements of the block.
+    """
+    statements: list[str] = []
+
+    def record_statement(conn, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    engine = db_helper.async_engine.sync_engine
+    event.listen(engine, "before_cursor_execute", record_statement)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", record_statement)
+
+
+@contextmanager
+def count_selects():
+    """
+    Counts the SELECT statements of the block by the entity they load.
+    """
+    selects: Counter[str] = Counter()
+
+    with record_statements() as statements:
+        yield selects
+
+    for statement in statements:
+        match = SELECTED_TABLE_PATTERN.match(statement)
+        if match:
+            selects[match.group(1)] += 1
+
+
+def posts_statements(statements: list[str]) -> list[str]:
+    return [statement for statement in statements if POSTS_TABLE_PATTERN.search(statement)]
+
+
+def create_post(client, register) -> tuple[dict[str, str], int]:
+    admin = register("admin", role="admin")
+    response = client.post("/api/v1/categories/", json={"name": "News"}, headers=admin)
+    assert response.status_code == 201, response.text
+
+    response = client.post(
+        "/api/v1/posts/",
+        params={"category_id": response.json()["id"]},
+        json={"title": "First post", "content": "Some content"},
+        headers=admin,
+    )
+    assert response.status_code == 201, response.text
+
+    return admin, response.json()["id"]
+
+
+def create_profile(client, register) -> dict[str, str]:
+    author = register("author")
+    response = client.post("/api/authors/me/profile", json={"first_name": "Ann"}, headers=author)
+    assert response.status_code == 201, response.text
+
+    return author
+
+
+def test_update_post_selects_the_post_once(client, register):
+    admin, post_id = create_post(client, register)
+
+    with count_selects() as selects:
+        response = client.patch(f"/api/v1/posts/{post_id}", json={"title": "Updated post"}, headers=admin)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["title"] == "Updated post"
+    assert selects["posts"] <= 1
+    assert selects["authors"] <= 1
+
+
+def test_delete_post_selects_the_post_once(client, register):
+    admin, post_id = create_post(client, register)
+
+    with count_selects() as selects:
+        response = client.delete(f"/api/v1/posts/{post_id}", headers=admin)
+
+    assert response.status_code == 204, response.text
+    assert selects["posts"] <= 1
+    assert selects["authors"] <= 1
+
+
+def test_change_password_selects_the_author_once(client, register):
+    author = register("author")
+
+    with count_selects() as selects:
+        response = client.post(
+            "/api/authors/me/change_password",
+            json={"old_password": "Passw0rd!", "new_password": "N3wPassw0rd!", "new_password_confirm": "N3wPassw0rd!"},
+            headers=author,
+        )
+
+    assert response.status_code == 200, response.text
+    assert selects["authors"] <= 1
+
+
+def test_partial_update_profile_selects_the_profile_once(client, register):
+    author = create_profile(client, register)
+
+    with count_selects() as selects:
+        response = client.patch("/api/authors/me/profile", json={"bio": "About me"}, headers=author)
+
+    assert response.status_code == 200, response.text
+    assert response.json()["bio"] == "About me"
+    assert selects["profiles"] <= 1
+    assert selects["authors"] <= 1
+
+
+def test_delete_profile_selects_the_profile_once(client, register):
+    author = create_profile(client, register)
+
+    with count_selects() as selects:
+        response = client.delete("/api/authors/me/profile", headers=author)
+
+    assert response.status_code == 204, response.text
+    assert selects["profiles"] <= 1
+    assert selects["authors"] <= 1
+
+
+def test_list_categories_does_not_load_their_posts(client, register):
+    admin, _ = create_post(client, register)
+
+    with record_statements() as statements:
+        response = client.get("/api/v1/categories/", headers=admin)
+
+    assert response.status_code == 200, response.text
+    assert [category["post_count"] for category in response.json()] == [1]
+    assert posts_statements(statements) == []
+
+
+def create_tagged_post(client, register) -> dict[str, str]:
+    admin, post_id = create_post(client, register)
+    response = client.post(f"/api/v1/posts/{post_id}/add_tags", json=["news", "events"], headers=admin)
+    assert response.status_code == 200, response.text
+
+    return admin
+
+
+def test_update_tag_does_not_load_its_posts(client, register):
+    admin = create_tagged_post(client, register)
+
+    with record_statements() as statements:
+        response = client.put("/api/v1/tags/1", json={"name": "updates"}, headers=admin)
+
+    assert response.status_code == 200, response.text
+    assert response.json() == {"id": 1, "name": "#updates", "post_count": 1}
+    assert posts_statements(statements) == []
+
+
+def test_merge_tags_does_not_load_their_posts(client, register):
+    admin = create_tagged_post(client, register)
+
+    with record_statements() as statements:
+        response = client.post("/api/v1/tags/merge", json={"name": "news", "tag_ids": [2]}, headers=admin)
+
+    assert response.status_code == 200, response.text
+    assert response.json() == {"id": 1, "name": "#news", "merged_tags": 1, "posts": 1}
+    assert posts_statements(statements) == []
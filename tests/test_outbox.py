@@ -0,0 +1,95 @@
+import asyncio
+from collections import defaultdict
+from datetime import datetime
+
+from sqlalchemy import select, update
+
+from src.core.database import models
+from src.core.database.db_settings.db_helper import async_session
+from src.repositories import outbox as repository_outbox
+from src.services import outbox as outbox_service
+
+
+async def add_event() -> int:
+    async with async_session() as session:
+        repository_outbox.add_event(
+            session=session, aggregate_type="post", aggregate_id=1, event_type="post.created", payload={}
+        )
+        await session.commit()
+
+        return (await session.execute(select(models.OutboxEvent.id))).scalar_one()
+
+
+async def get_event(event_id: int) -> models.OutboxEvent:
+    async with async_session() as session:
+        return await session.get(models.OutboxEvent, event_id)
+
+
+async def make_due(event_id: int) -> None:
+    async with async_session() as session:
+        await session.execute(
+            update(models.OutboxEvent).where(models.OutboxEvent.id == event_id).values(next_attempt_at=datetime.utcnow())
+        )
+        await session.commit()
+
+
+def test_event_with_failed_subscriber_is_retried_for_that_subscriber_only(monkeypatch):
+    monkeypatch.setattr(outbox_service, "subscribers", defaultdict(list))
+    calls = {"stable": 0, "flaky": 0}
+
+    async def on_stable(session, event):
+        calls["stable"] += 1
+
+    async def on_flaky(session, event):
+        calls["flaky"] += 1
+        if calls["flaky"] == 1:
+            raise RuntimeError("redis timeout")
+
+    outbox_service.subscribe("post.created", on_stable)
+    outbox_service.subscribe("post.created", on_flaky)
+
+    relay = outbox_service.OutboxRelay()
+    event_id = asyncio.run(add_event())
+
+    assert asyncio.run(relay.relay_batch()) == 1
+
+    event = asyncio.run(get_event(event_id))
+    assert event.published_at is None
+    assert event.attempts == 1
+    assert "redis timeout" in event.last_error
+    assert event.handled == [outbox_service.get_subscriber_name(on_stable)]
+    assert event.next_attempt_at > datetime.utcnow()
+
+    # Not due yet
+    assert asyncio.run(relay.relay_batch()) == 0
+
+    asyncio.run(make_due(event_id))
+    assert asyncio.run(relay.relay_batch()) == 1
+
+    event = asyncio.run(get_event(event_id))
+    assert event.published_at is not None
+    assert calls == {"stable": 1, "flaky": 2}
+
+
+def test_event_is_given_up_after_max_attempts(monkeypatch):
+    monkeypatch.setattr(outbox_service, "subscribers", defaultdict(list))
+    monkeypatch.setattr(outbox_service.settings, "outbox_max_attempts", 2)
+
+    async def on_broken(session, event):
+        raise RuntimeError("broken")
+
+    outbox_service.subscribe("post.created", on_broken)
+
+    relay = outbox_service.OutboxRelay()
+    event_id = asyncio.run(add_event())
+
+    for _ in range(2):
+        asyncio.run(make_due(event_id))
+        assert asyncio.run(relay.relay_batch()) == 1
+
+    asyncio.run(make_due(event_id))
+    assert asyncio.run(relay.relay_batch()) == 0
+
+    event = asyncio.run(get_event(event_id))
+    assert event.published_at is None
+    assert event.attempts == 2
@@ -0,0 +1,58 @@
+import asyncio
+
+from sqlalchemy import insert
+
+from src.core.conf.caching import get_redis_data
+from src.core.database import models
+from src.core.database.db_settings.db_helper import async_session
+from src.core.database.models.post_tag_association import post_tag_association_table
+from src.schemas.tags import TagWindow
+from src.services import popular_tags
+
+
+async def add_tagged_posts(post_tags: dict[int, list[int]]) -> None:
+    async with async_session() as session:
+        await session.execute(
+            insert(models.Author).values(id=1, username="author", email="author@example.com", hashed_password="-")
+        )
+        await session.execute(insert(models.Category).values(id=1, name="Main", slug="main"))
+        await session.execute(insert(models.Tag), [{"id": tag_id, "name": f"tag-{tag_id}"} for tag_id in range(1, 4)])
+        await session.execute(
+            insert(models.Post),
+            [
+                {"id": post_id, "title": f"Post {post_id}", "slug": f"post-{post_id}", "author_id": 1, "category_id": 1}
+                for post_id in post_tags
+            ],
+        )
+        await session.execute(
+            insert(post_tag_association_table),
+            [{"post_id": post_id, "tag_id": tag_id} for post_id, tags in post_tags.items() for tag_id in tags],
+        )
+        await session.commit()
+
+
+async def get_popular_tags(limit: int) -> list[dict]:
+    async with async_session() as session:
+        return await popular_tags.get_popular_tags(session=session, window=TagWindow.all, limit=limit)
+
+
+EXPECTED = [{"id": 1, "name": "tag-1", "post_count": 3}, {"id": 2, "name": "tag-2", "post_count": 2}]
+
+
+def test_missing_aggregates_are_rebuilt_once_under_the_lock():
+    asyncio.run(add_tagged_posts({1: [1, 2, 3], 2: [1, 2], 3: [1]}))
+    redis_client = get_redis_data()
+
+    assert asyncio.run(get_popular_tags(limit=2)) == EXPECTED
+    assert redis_client.exists(popular_tags.BUILT_KEY)
+    assert not redis_client.exists(popular_tags.REBUILD_LOCK_KEY)
+
+
+def test_top_tags_are_counted_in_the_database_while_another_worker_rebuilds():
+    asyncio.run(add_tagged_posts({1: [1, 2, 3], 2: [1, 2], 3: [1]}))
+    redis_client = get_redis_data()
+    redis_client.set(popular_tags.REBUILD_LOCK_KEY, "other-worker")
+
+    assert asyncio.run(get_popular_tags(limit=2)) == EXPECTED
+    assert not redis_client.exists(popular_tags.BUILT_KEY)
+    assert redis_client.get(popular_tags.REBUILD_LOCK_KEY) == b"other-worker"
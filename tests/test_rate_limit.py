@@ -0,0 +1,89 @@
+import pytest
+from fastapi import HTTPException
+from starlette.requests import Request
+
+from src.core.conf.caching import get_redis_data
+from src.services import rate_limit
+
+IP_KEY = "ratelimit:login:ip:testclient"
+GLOBAL_KEY = "ratelimit:login:global:all"
+
+
+def bucket_tokens(key: str) -> float:
+    return float(get_redis_data().hget(key, "tokens"))
+
+
+def login(client, username: str):
+    return client.post("/api/auth/login", data={"username": username, "password": "Wr0ngPassw0rd!"})
+
+
+def make_request(host: str) -> Request:
+    return Request(
+        {"type": "http", "method": "POST", "path": "/api/auth/login", "headers": [], "query_string": b"",
+         "client": (host, 50000)}
+    )
+
+
+def test_register_over_the_ip_budget_is_rejected_with_retry_after(client):
+    for number in range(5):
+        response = client.post(
+            "/api/auth/register",
+            json={"username": f"author{number}", "email": f"author{number}@example.com", "password": "Passw0rd!"},
+        )
+        assert response.status_code == 201, response.text
+
+    response = client.post(
+        "/api/auth/register", json={"username": "author5", "email": "author5@example.com", "password": "Passw0rd!"}
+    )
+
+    assert response.status_code == 429, response.text
+    # The IP budget is 5 per hour: one token is refilled in 720 seconds
+    assert 700 <= int(response.headers["Retry-After"]) <= 720
+
+
+def test_login_takes_a_token_of_every_bucket_only_if_all_have_one(client):
+    for _ in range(5):
+        assert login(client, "Victim@example.com").status_code == 403
+
+    ip_tokens, global_tokens = bucket_tokens(IP_KEY), bucket_tokens(GLOBAL_KEY)
+
+    # The account budget (5 per 5 minutes) is spent, the account is the lowercased username
+    response = login(client, "victim@example.com")
+    assert response.status_code == 429, response.text
+    assert 1 <= int(response.headers["Retry-After"]) <= 60
+
+    # The rejected request did not take the tokens of the IP and global buckets
+    assert bucket_tokens(IP_KEY) >= ip_tokens
+    assert bucket_tokens(GLOBAL_KEY) >= global_tokens
+
+    # Another account from the same IP is still let through and takes one token of the IP bucket
+    assert login(client, "other@example.com").status_code == 403
+    assert bucket_tokens(IP_KEY) < ip_tokens
+
+
+def test_in_process_buckets_limit_the_requests_while_redis_is_down(fake_redis_server, monkeypatch):
+    buckets = rate_limit.InProcessTokenBuckets()
+    monkeypatch.setattr(rate_limit, "in_process_buckets", buckets)
+
+    limiter = rate_limit.LoginRateLimiter("login")
+    request = make_request("10.0.0.1")
+    ip_key = "ratelimit:login:ip:10.0.0.1"
+
+    fake_redis_server.connected = False
+    try:
+        for _ in range(5):
+            limiter.check(request=request, account="victim@example.com")
+
+        with pytest.raises(HTTPException) as error:
+            limiter.check(request=request, account="victim@example.com")
+
+        ip_tokens = buckets.buckets[ip_key][0]
+        limiter.check(request=request, account="other@example.com")
+    finally:
+        fake_redis_server.connected = True
+
+    assert error.value.status_code == 429
+    assert 1 <= int(error.value.headers["Retry-After"]) <= 60
+    assert ip_tokens == pytest.approx(5, abs=0.1)
+    assert buckets.buckets[ip_key][0] == pytest.approx(4, abs=0.1)
+    assert not get_redis_data().keys("ratelimit:*")
@@ -0,0 +1,77 @@
+import asyncio
+
+from sqlalchemy import event, insert
+
+from src.core.conf.caching import get_redis_data
+from src.core.database import models
+from src.core.database.db_settings import db_helper
+from src.core.database.db_settings.db_helper import async_session
+from src.core.database.models.post_tag_association import post_tag_association_table
+from src.services import related_posts
+
+
+async def add_posts(post_tags: dict[int, list[int]]) -> None:
+    async with async_session() as session:
+        await session.execute(
+            insert(models.Author).values(id=1, username="author", email="author@example.com", hashed_password="-")
+        )
+        await session.execute(insert(models.Category).values(id=1, name="Main", slug="main"))
+        await session.execute(insert(models.Category).values(id=2, name="Other", slug="other"))
+        await session.execute(insert(models.Tag), [{"id": tag_id, "name": f"tag-{tag_id}"} for tag_id in range(1, 4)])
+        await session.execute(
+            insert(models.Post),
+            [
+                # Only the first post is in its category, the candidates come from the shared tags
+                {"id": post_id, "title": f"Post {post_id}", "slug": f"post-{post_id}", "author_id": 1,
+                 "category_id": 1 if post_id == 1 else 2}
+                for post_id in post_tags
+            ],
+        )
+        await session.execute(
+            insert(post_tag_association_table),
+            [{"post_id": post_id, "tag_id": tag_id} for post_id, tags in post_tags.items() for tag_id in tags],
+        )
+        await session.commit()
+
+
+async def refresh(post_id: int) -> None:
+    async with async_session() as session:
+        await related_posts.refresh_related_posts(session=session, post_id=post_id)
+
+
+def test_refresh_keeps_the_candidates_sharing_the_most_tags(monkeypatch):
+    monkeypatch.setattr(related_posts, "TAG_CANDIDATES_LIMIT", 3)
+
+    # The post 1 shares three tags with the posts 2-3, one tag with the posts 4-40
+    post_tags = {1: [1, 2, 3], 2: [1, 2, 3], 3: [1, 2, 3]}
+    post_tags.update({post_id: [1] for post_id in range(4, 41)})
+    asyncio.run(add_posts(post_tags))
+
+    parameters = []
+    statements = []
+
+    def record_parameters(conn, cursor, statement, params, context, executemany):
+        parameters.append(len(params or ()))
+        statements.append(statement)
+
+    event.listen(db_helper.async_engine.sync_engine, "before_cursor_execute", record_parameters)
+    try:
+        asyncio.run(refresh(1))
+    finally:
+        event.remove(db_helper.async_engine.sync_engine, "before_cursor_execute", record_parameters)
+
+    related_ids = related_posts.get_related_post_ids(1)
+
+    assert set(related_ids[:2]) == {2, 3}
+    assert len(related_ids) == 3
+    # The candidates are bounded, not every post with a common tag
+    assert max(parameters) <= 10
+    # Only the columns the scores need are read, never the content of the posts
+    assert not [statement for statement in statements if "posts.content" in statement]
+    assert get_redis_data().zscore(related_posts.related_key(2), 1) is not None
+
+
+def test_refresh_of_a_missing_post_does_nothing():
+    asyncio.run(refresh(1))
+
+    assert related_posts.get_related_post_ids(1) == []
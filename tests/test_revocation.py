@@ -0,0 +1,44 @@
+import time
+
+from src.services.revocation import RevocationList
+
+
+def wait_for(condition, timeout: float = 5) -> bool:
+    deadline = time.monotonic() + timeout
+
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.05)
+
+    return False
+
+
+def test_lost_subscription_is_detected_and_restored(fake_redis_server):
+    worker = RevocationList()
+    other_worker = RevocationList()
+
+    worker.start()
+    assert worker.is_synced()
+
+    try:
+        fake_redis_server.connected = False
+        assert wait_for(lambda: not worker.pubsub_thread.is_alive())
+        assert not worker.ready
+
+        fake_redis_server.connected = True
+        # Published while this worker was not subscribed
+        other_worker.revoke_author(author_id=7)
+
+        # Not trusted while unsynced: checked in Redis
+        assert worker.is_revoked(jti="a", author_id=7, issued_at=time.time() - 60) is True
+
+        worker.resync()
+        assert worker.is_synced()
+        assert "author:7" in worker.bloom
+
+        other_worker.revoke_token(jti="b", expires_at=int(time.time()) + 60)
+        assert wait_for(lambda: "jti:b" in worker.bloom)
+    finally:
+        fake_redis_server.connected = True
+        worker.stop()
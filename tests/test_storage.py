@@ -0,0 +1,59 @@
+import asyncio
+import time
+from urllib.parse import parse_qs, urlparse
+
+import boto3
+import pytest
+from moto import mock_aws
+
+from src.core.conf.config import settings
+from src.services.storage import S3Storage
+
+BUCKET = "blog-media"
+
+
+@pytest.fixture
+def storage(monkeypatch):
+    monkeypatch.setenv("AWS_ACCESS_KEY_ID", "testing")
+    monkeypatch.setenv("AWS_SECRET_ACCESS_KEY", "testing")
+    monkeypatch.setenv("AWS_DEFAULT_REGION", "us-east-1")
+
+    with mock_aws():
+        boto3.client("s3", region_name="us-east-1").create_bucket(Bucket=BUCKET)
+        yield S3Storage(bucket=BUCKET, prefix="/media/", region="us-east-1")
+
+
+def test_s3_storage_saves_lists_and_deletes_objects(storage):
+    asyncio.run(storage.save("posts/1/image.webp", b"image", content_type="image/webp"))
+    asyncio.run(storage.save("posts/10/image.webp", b"other", content_type="image/webp"))
+
+    assert asyncio.run(storage.exists("posts/1/image.webp"))
+    assert not asyncio.run(storage.exists("posts/2/image.webp"))
+
+    stored = storage.client.get_object(Bucket=BUCKET, Key="media/posts/1/image.webp")
+    assert stored["Body"].read() == b"image"
+    assert stored["ContentType"] == "image/webp"
+
+    # The listing is of the "directory", the keys are returned without the prefix of the storage
+    assert [key for key, _ in asyncio.run(storage.list("posts/1"))] == ["posts/1/image.webp"]
+
+    asyncio.run(storage.delete("posts/1/image.webp"))
+
+    assert not asyncio.run(storage.exists("posts/1/image.webp"))
+    assert asyncio.run(storage.list("posts/1")) == []
+    assert storage.get_path("posts/10/image.webp") is None
+
+
+def test_s3_storage_urls(storage, monkeypatch):
+    monkeypatch.setattr(settings, "storage_s3_public_url", "")
+    monkeypatch.setattr(settings, "storage_s3_url_expire_seconds", 600)
+
+    # Without a public URL the object is served by a presigned URL
+    url = urlparse(storage.get_url("posts/1/image.webp"))
+    query = parse_qs(url.query)
+    assert url.path == "/media/posts/1/image.webp"
+    assert "Signature" in query
+    assert 0 < int(query["Expires"][0]) - time.time() <= 600
+
+    monkeypatch.setattr(settings, "storage_s3_public_url", "https://cdn.example.com/")
+    assert storage.get_url("posts/1/image.webp") == "https://cdn.example.com/media/posts/1/image.webp"
@@ -0,0 +1,137 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from sqlalchemy import insert, select
+
+from src.core.conf.caching import get_redis_data
+from src.core.database import models
+from src.core.database.db_settings.db_helper import async_session
+from src.services import outbox_subscribers
+from src.services.timeline import timeline_service
+
+CREATED_AT = datetime(2026, 10, 19, 12, 0, 0, 123456)
+
+
+async def get_author(username: str) -> models.Author:
+    async with async_session() as session:
+        return (await session.execute(select(models.Author).where(models.Author.username == username))).scalar_one()
+
+
+async def add_posts(author_id: int, post_ids: list[int], created_at: datetime) -> None:
+    async with async_session() as session:
+        if await session.get(models.Category, 1) is None:
+            await session.execute(insert(models.Category).values(id=1, name="Main", slug="main"))
+
+        await session.execute(
+            insert(models.Post),
+            [
+                {"id": post_id, "title": f"Post {post_id}", "slug": f"post-{post_id}", "author_id": author_id,
+                 "category_id": 1, "created_at": created_at}
+                for post_id in post_ids
+            ],
+        )
+        await session.commit()
+
+
+async def fan_out(post_ids: list[int]) -> None:
+    async with async_session() as session:
+        for post_id in post_ids:
+            await timeline_service.fan_out_post(session=session, post=await session.get(models.Post, post_id))
+
+
+async def handle_post_deleted(post_id: int) -> None:
+    async with async_session() as session:
+        event = (await session.execute(
+            select(models.OutboxEvent).where(
+                models.OutboxEvent.event_type == "post.deleted", models.OutboxEvent.aggregate_id == post_id
+            )
+        )).scalar_one()
+        await outbox_subscribers.on_post_deleted(session=session, event=event)
+
+
+def read_timeline(client, headers: dict[str, str], limit: int) -> list[int]:
+    post_ids = []
+    cursor = None
+
+    while True:
+        params = {"limit": limit} if cursor is None else {"limit": limit, "cursor": cursor}
+        response = client.get("/api/authors/me/timeline", params=params, headers=headers)
+        assert response.status_code == 200, response.text
+
+        page = response.json()
+        post_ids.extend(post["id"] for post in page["items"])
+        cursor = page["next_cursor"]
+
+        if cursor is None:
+            return post_ids
+
+
+def test_fan_out_and_paged_read_of_posts_created_at_the_same_time(client, register, monkeypatch):
+    register("writer")
+    reader = register("reader")
+    writer = asyncio.run(get_author("writer"))
+
+    response = client.post(f"/api/authors/{writer.id}/follow", headers=reader)
+    assert response.status_code == 201, response.text
+    assert asyncio.run(get_author("writer")).follower_count == 1
+
+    # Five posts of one batch share their creation time, the pages are split inside the batch
+    asyncio.run(add_posts(author_id=writer.id, post_ids=[1, 2, 3, 4, 5], created_at=CREATED_AT))
+    assert read_timeline(client, headers=reader, limit=2) == [5, 4, 3, 2, 1]
+
+    # The timeline is built now, the new posts are pushed to it
+    asyncio.run(add_posts(author_id=writer.id, post_ids=[6, 7, 8], created_at=CREATED_AT + timedelta(seconds=1)))
+    asyncio.run(fan_out([6, 7, 8]))
+
+    assert read_timeline(client, headers=reader, limit=2) == [8, 7, 6, 5, 4, 3, 2, 1]
+    assert read_timeline(client, headers=reader, limit=3) == [8, 7, 6, 5, 4, 3, 2, 1]
+
+    # Without redis the pages are read from the database in the same order
+    monkeypatch.setattr(timeline_service, "get_client", lambda: None)
+    assert read_timeline(client, headers=reader, limit=2) == [8, 7, 6, 5, 4, 3, 2, 1]
+
+    response = client.delete(f"/api/authors/{writer.id}/follow", headers=reader)
+    assert response.status_code == 204, response.text
+    assert asyncio.run(get_author("writer")).follower_count == 0
+
+
+def test_authors_over_the_fan_out_limit_are_merged_in_on_read(client, register, monkeypatch):
+    monkeypatch.setattr(timeline_service, "fanout_max_followers", 0)
+
+    register("writer")
+    reader = register("reader")
+    writer = asyncio.run(get_author("writer"))
+
+    response = client.post(f"/api/authors/{writer.id}/follow", headers=reader)
+    assert response.status_code == 201, response.text
+
+    asyncio.run(add_posts(author_id=writer.id, post_ids=[1, 2, 3], created_at=CREATED_AT))
+    assert read_timeline(client, headers=reader, limit=2) == [3, 2, 1]
+
+    asyncio.run(add_posts(author_id=writer.id, post_ids=[4], created_at=CREATED_AT))
+    asyncio.run(fan_out([4]))
+
+    assert read_timeline(client, headers=reader, limit=2) == [4, 3, 2, 1]
+
+    response = client.get("/api/authors/me/timeline", params={"cursor": "1760875200.5"}, headers=reader)
+    assert response.status_code == 422
+
+
+def test_deleted_post_is_removed_from_the_followers_timelines(client, register):
+    writer_headers = register("writer")
+    reader = register("reader")
+    writer = asyncio.run(get_author("writer"))
+    reader_id = asyncio.run(get_author("reader")).id
+
+    response = client.post(f"/api/authors/{writer.id}/follow", headers=reader)
+    assert response.status_code == 201, response.text
+
+    asyncio.run(add_posts(author_id=writer.id, post_ids=[1, 2, 3, 4, 5], created_at=CREATED_AT))
+    assert read_timeline(client, headers=reader, limit=2) == [5, 4, 3, 2, 1]
+
+    response = client.delete("/api/v1/posts/3", headers=writer_headers)
+    assert response.status_code == 204, response.text
+    asyncio.run(handle_post_deleted(3))
+
+    assert get_redis_data().zscore(timeline_service.timeline_key(reader_id), 3) is None
+    assert read_timeline(client, headers=reader, limit=2) == [5, 4, 2, 1]
@@ -0,0 +1,64 @@
+from src.services.token_store import refresh_token_store
+
+
+def login(client, name: str):
+    client.cookies.clear()
+    return client.post("/api/auth/login", data={"username": f"{name}@example.com", "password": "Passw0rd!"})
+
+
+def refresh(client, token: str):
+    client.cookies.clear()
+    return client.get("/api/auth/refresh_token", headers={"Cookie": f"refresh_token={token}"})
+
+
+def test_rotated_token_reused_revokes_the_session(client, register):
+    headers = register("author")
+    token = login(client, "author").cookies["refresh_token"]
+
+    response = refresh(client, token)
+    assert response.status_code == 200, response.text
+    rotated_token = response.cookies["refresh_token"]
+
+    # The token was already rotated: the session is revoked, its current token too
+    assert refresh(client, token).status_code == 401
+    assert refresh(client, rotated_token).status_code == 401
+
+    # Only the session of the registration login is left
+    response = client.get("/api/auth/sessions", headers=headers)
+    assert response.status_code == 200, response.text
+    assert len(response.json()) == 1
+
+
+def test_logged_out_session_cannot_be_refreshed(client, register):
+    register("author")
+    token = login(client, "author").cookies["refresh_token"]
+
+    response = client.post("/api/auth/logout", headers={"Cookie": f"refresh_token={token}"})
+    assert response.status_code == 204, response.text
+
+    assert refresh(client, token).status_code == 401
+
+
+def test_password_change_revokes_every_refresh_token(client, register):
+    headers = register("author")
+    tokens = [login(client, "author").cookies["refresh_token"] for _ in range(2)]
+
+    response = client.post(
+        "/api/authors/me/change_password",
+        json={"old_password": "Passw0rd!", "new_password": "N3wPassw0rd!", "new_password_confirm": "N3wPassw0rd!"},
+        headers=headers,
+    )
+    assert response.status_code == 200, response.text
+
+    for token in tokens:
+        assert refresh(client, token).status_code == 401
+
+
+def test_routes_answer_503_while_the_store_is_unavailable(client, register, monkeypatch):
+    register("author")
+    token = login(client, "author").cookies["refresh_token"]
+
+    monkeypatch.setattr(refresh_token_store, "get_client", lambda: None)
+
+    assert login(client, "author").status_code == 503
+    assert refresh(client, token).status_code == 503
@@ -0,0 +1,57 @@
+import asyncio
+import time
+
+from sqlalchemy import insert
+
+from src.core.conf.caching import get_redis_data
+from src.core.database import models
+from src.core.database.db_settings.db_helper import async_session
+from src.services import views
+
+
+async def add_post() -> None:
+    async with async_session() as session:
+        await session.execute(
+            insert(models.Author).values(id=1, username="author", email="author@example.com", hashed_password="-")
+        )
+        await session.execute(insert(models.Category).values(id=1, name="Main", slug="main"))
+        await session.execute(
+            insert(models.Post).values(id=1, title="Post", slug="post", author_id=1, category_id=1, views=10)
+        )
+        await session.commit()
+
+
+async def flush() -> int:
+    async with async_session() as session:
+        return await views.flush_views(session=session)
+
+
+async def get_views() -> int:
+    async with async_session() as session:
+        return (await session.get(models.Post, 1)).views
+
+
+def test_flush_requeues_the_claim_of_a_dead_worker():
+    asyncio.run(add_post())
+    redis_client = get_redis_data()
+
+    abandoned_key = f"{views.FLUSHING_KEY_PREFIX}{int(time.time()) - 3600}:dead"
+    redis_client.hset(abandoned_key, 1, 3)
+    redis_client.hset(views.PENDING_KEY, 1, 2)
+
+    assert asyncio.run(flush()) == 1
+    assert asyncio.run(get_views()) == 15
+    assert not list(redis_client.scan_iter(match=f"{views.FLUSHING_KEY_PREFIX}*"))
+    assert not redis_client.exists(views.PENDING_KEY)
+
+
+def test_flush_leaves_the_claim_of_a_running_flush():
+    asyncio.run(add_post())
+    redis_client = get_redis_data()
+
+    running_key = f"{views.FLUSHING_KEY_PREFIX}{int(time.time())}:running"
+    redis_client.hset(running_key, 1, 3)
+
+    assert asyncio.run(flush()) == 0
+    assert asyncio.run(get_views()) == 10
+    assert redis_client.hget(running_key, 1) == b"3"